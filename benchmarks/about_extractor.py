@@ -0,0 +1,82 @@
+"""
+Compares parse_about against the previous implementation, which built a
+BeautifulSoup tree for the description and ran every regex over the whole page.
+Run from the repository root: python -m benchmarks.about_extractor
+"""
+from pathlib import Path
+from time import perf_counter
+
+from bs4 import BeautifulSoup
+
+from enums import GroupInfoKeys
+from fb_scrape_lib.mutual import PUBLIC, number_string_2_int
+from fb_scrape_lib.scrape_about import (
+    CREATION_DATE_REGEX,
+    MEMBERS_REGEX,
+    MONTH,
+    NEW_MEMBERS_THIS_WEEK_REGEX,
+    POSTS_LAST_MONTH_REGEX,
+    parse_about,
+)
+
+EXAMPLES = Path(__file__).parent.parent / "tests" / "example_groups"
+FIXTURES = ["makeupartistsgroup", "cheapmealideas"]
+REPEATS = 10
+
+
+def legacy_description(html: str) -> str:
+    soup = BeautifulSoup(html, features="html.parser")
+    options = []
+    for option in [{"name": "description"}, {"property": "og:image:alt"}]:
+        if x := soup.find("meta", option):
+            options.append(x.get("content", ""))
+        else:
+            options.append("")
+    return max(options, key=len)
+
+
+def legacy_scans(html: str) -> dict:
+    members = MEMBERS_REGEX.search(html)
+    posts = POSTS_LAST_MONTH_REGEX.search(html)
+    new_members = NEW_MEMBERS_THIS_WEEK_REGEX.search(html)
+    return {
+        GroupInfoKeys.DESCRIPTION: legacy_description(html),
+        GroupInfoKeys.IS_PRIVATE: PUBLIC not in html,
+        GroupInfoKeys.MEMBERS: number_string_2_int(members.group("number")),
+        "creation_date_text": CREATION_DATE_REGEX.search(html).group("date"),
+        GroupInfoKeys.POSTS_FREQUENCY: number_string_2_int(posts.group("posts"))
+        / MONTH,
+        "weekly_new_text": new_members.group("text"),
+    }
+
+
+def time_ms(func, html: str) -> float:
+    start = perf_counter()
+    for _ in range(REPEATS):
+        func(html)
+    return (perf_counter() - start) / REPEATS * 1000
+
+
+def main():
+    for name in FIXTURES:
+        with open(EXAMPLES / f"{name}.html", "r") as f:
+            html = f.read()
+        legacy, new = legacy_scans(html), parse_about(html)
+        for key in (
+            GroupInfoKeys.DESCRIPTION,
+            GroupInfoKeys.IS_PRIVATE,
+            GroupInfoKeys.MEMBERS,
+            GroupInfoKeys.POSTS_FREQUENCY,
+        ):
+            assert legacy[key] == new[key], f"{name}: {key} differs"
+        parse_about(html)  # warm up the date parser
+        legacy_ms = time_ms(legacy_scans, html)
+        new_ms = time_ms(parse_about, html)
+        print(
+            f"{name:<20} {len(html) / 1e3:7.0f} KB  legacy scans: {legacy_ms:7.2f} ms"
+            f"  parse_about: {new_ms:7.2f} ms  speedup: {legacy_ms / new_ms:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
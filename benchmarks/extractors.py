@@ -0,0 +1,187 @@
+"""
+Time per page, throughput and peak python allocations of every extractor,
+over the fixture pages and over pinned posts pages with 10x and 100x the posts.
+The results are compared to a baseline of the same machine, and the run fails
+if an extractor got slower than the baseline by more than --threshold, or if
+there is no baseline. The baseline is only saved with --save-baseline.
+Run from the repository root: python -m benchmarks.extractors
+"""
+import json
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+import typer
+from bs4 import BeautifulSoup
+
+from fb_scrape_lib.advanced_scrape import (
+    DIV,
+    POST_CLASS,
+    parse_admin,
+    parse_featured,
+    parse_topics,
+)
+from fb_scrape_lib.mutual import ADMINS_KEY, extract_first_json_object_in_string
+from fb_scrape_lib.post_collector import wrap_posts
+from fb_scrape_lib.scrape_about import parse_about
+from group_filter import filter_json_2_filter_function
+
+EXAMPLES = Path(__file__).parent.parent / "tests" / "example_groups"
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+THRESHOLD = 0.25
+# sub-millisecond cases jitter by more than the threshold
+MIN_REGRESSION_MS = 0.1
+SCALES = [10, 100]
+MIN_REPEATS = 3
+MIN_SECONDS = 0.5
+FILTER_RECORDS = 10_000
+FILTER_JSON = [
+    {"info_key": "n_members", "min_val": 1000},
+    {"info_key": "creation_date", "min_val": "2010-01-01"},
+    {"info_key": "description", "value": "recipe", "should_include": False},
+]
+MB = 2**20
+
+
+def read_fixture(name: str) -> str:
+    with open(EXAMPLES / f"{name}.html", "r") as f:
+        return f.read()
+
+
+def get_outermost_posts(html: str) -> list[str]:
+    """The html of the posts of a pinned posts page, without the nested ones"""
+    posts = BeautifulSoup(html, features="html.parser").find_all(DIV, POST_CLASS)
+    ids = {id(x) for x in posts}
+    return [str(x) for x in posts if not any(id(p) in ids for p in x.parents)]
+
+
+def get_scaled_featured(html: str, scale: int) -> str:
+    """A collected pinned posts document with scale copies of every post"""
+    return wrap_posts(get_outermost_posts(html) * scale)
+
+
+def get_filter_records() -> list[dict]:
+    records = [
+        parse_about(read_fixture(x)) for x in ("cheapmealideas", "makeupartistsgroup")
+    ]
+    return [dict(x) for x in records * (FILTER_RECORDS // len(records))]
+
+
+def get_cases() -> dict[str, tuple[Callable, object, int]]:
+    """Maps every case to its function, its input and the input's size in bytes"""
+    about = read_fixture("cheapmealideas")
+    featured = read_fixture("cheapmealideas_featured")
+    admins_ix = about.find(ADMINS_KEY)
+    records = get_filter_records()
+    filter_func = filter_json_2_filter_function(FILTER_JSON)
+    cases = {
+        "get_info_from_about": (parse_about, about, len(about)),
+        "get_featured": (parse_featured, featured, len(featured)),
+    }
+    for scale in SCALES:
+        html = get_scaled_featured(featured, scale)
+        cases[f"get_featured_{scale}x"] = (parse_featured, html, len(html))
+    topics = read_fixture("cheapmealideas_topics")
+    admin = read_fixture("makeupartistsgroup_admin")
+    cases |= {
+        "get_topics": (parse_topics, topics, len(topics)),
+        "enrich_admin": (parse_admin, admin, len(admin)),
+        "extract_first_json_object_in_string": (
+            lambda x: extract_first_json_object_in_string(x, True, admins_ix),
+            about,
+            len(about) - admins_ix,
+        ),
+        "filter_json_2_filter_function": (
+            lambda x: [filter_func(r) for r in x],
+            records,
+            len(json.dumps(records, default=str)),
+        ),
+    }
+    return cases
+
+
+def measure(func: Callable, arg) -> tuple[float, float]:
+    """Returns the best time of a call in ms and the peak python allocations in MB"""
+    func(arg)  # warm up lazy imports and memoized parsers
+    times = []
+    start = perf_counter()
+    while len(times) < MIN_REPEATS or perf_counter() - start < MIN_SECONDS:
+        t = perf_counter()
+        func(arg)
+        times.append(perf_counter() - t)
+    tracemalloc.start()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times) * 1000, peak / MB
+
+
+def run() -> dict[str, dict[str, float]]:
+    results = {}
+    for name, (func, arg, size) in get_cases().items():
+        ms, peak_mb = measure(func, arg)
+        results[name] = {
+            "ms": round(ms, 3),
+            "mb_per_s": round(size / MB / (ms / 1000), 1),
+            "peak_mb": round(peak_mb, 2),
+        }
+    return results
+
+
+def compare(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    """Prints the results next to the baseline and returns the regressed cases"""
+    regressed = []
+    print(
+        f"{'case':<38}{'ms':>10}{'MB/s':>9}{'peak MB':>9}{'baseline':>10}{'change':>9}"
+    )
+    for name, x in results.items():
+        line = f"{name:<38}{x['ms']:10.2f}{x['mb_per_s']:9.1f}{x['peak_mb']:9.2f}"
+        if name in baseline:
+            old_ms = baseline[name]["ms"]
+            change = x["ms"] / old_ms - 1
+            line += f"{old_ms:10.2f}{change:+9.0%}"
+            if change > threshold and x["ms"] - old_ms > MIN_REGRESSION_MS:
+                regressed.append(name)
+                line += "  REGRESSED"
+        print(line)
+    return regressed
+
+
+def main(
+    threshold: float = typer.Option(THRESHOLD),
+    baseline_path: Path = typer.Option(BASELINE_PATH),
+    save_baseline: bool = False,
+):
+    results = run()
+    baseline = {}
+    if baseline_path.exists():
+        with open(baseline_path, "r") as f:
+            baseline = json.load(f)["results"]
+    regressed = compare(results, baseline, threshold)
+    if save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(
+                {"created": datetime.now().isoformat(), "results": results},
+                f,
+                indent=2,
+            )
+        print(f"saved the baseline to {baseline_path}")
+    elif not baseline:
+        # a gate that passes without a baseline would never fail in CI
+        print(f"no baseline at {baseline_path}, save one with --save-baseline")
+        raise typer.Exit(1)
+    elif regressed:
+        print(
+            f"{len(regressed)} cases are over {threshold:.0%} slower than the baseline"
+        )
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,213 @@
+"""
+A local stand-in for facebook that serves the fixture pages at the addresses
+get_html builds, for load testing the scraper end to end without a network.
+Every group gets one of the about fixtures, the topics fixture and a pinned
+posts feed that appends posts while it's scrolled. Responses are delayed by
+--latency-ms +- --jitter-ms, and --login-wall-rate of them redirect to a
+login page, like facebook does to scrapers.
+Run from the repository root:
+    python -m benchmarks.fake_facebook links 1000 links.txt
+    python -m benchmarks.fake_facebook serve --port 8000
+    FB_SCRAPER_BASE_URL=http://127.0.0.1:8000/ python main.py scrape out links.txt
+"""
+import random
+import re
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from time import sleep
+from urllib.parse import parse_qs, urlparse
+from zlib import crc32
+
+import typer
+
+from benchmarks.extractors import get_outermost_posts, read_fixture
+from enums import Sections
+from normalization import BASE_URL_ENV, DEFAULT_FB_PREFIX
+
+ABOUT_FIXTURES = ["cheapmealideas", "makeupartistsgroup"]
+TOPICS_FIXTURE = "cheapmealideas_topics"
+FEATURED_FIXTURE = "cheapmealideas_featured"
+ADMIN_FIXTURE = "makeupartistsgroup_admin"
+GROUPS = "groups"
+LOGIN = "login"
+MORE = "more"
+OFFSET = "offset"
+POSTS_PER_GROUP = 50
+POSTS_PER_LOAD = 5
+HOST = "127.0.0.1"
+PORT = 8000
+# the fixtures' scripts and stylesheets are on facebook's cdn
+EXTERNAL_RESOURCE_REGEX = re.compile(
+    r'<(script|link)\b[^>]*\b(src|href)="https?://[^"]*"[^>]*>(</script>)?'
+)
+LOGIN_PAGE = "<html><body><form id='login_form'>Log in</form></body></html>"
+FEED_PAGE = """<html><body><div id="feed">{posts}</div><script>
+let offset = {offset};
+let loading = false;
+let done = false;
+window.addEventListener("scroll", async () => {{
+    const bottom = window.innerHeight + window.scrollY;
+    if (loading || done || bottom < document.body.scrollHeight - 1000) return;
+    loading = true;
+    const res = await fetch("{section}/{more}?{offset_key}=" + offset);
+    const html = await res.text();
+    if (html) {{
+        document.getElementById("feed").insertAdjacentHTML("beforeend", html);
+        offset += {per_load};
+    }} else {{
+        done = true;
+    }}
+    loading = false;
+}});
+</script></body></html>"""
+# posts are given a height so the feed is scrolled like facebook's
+POST_WRAPPER = '<div style="min-height: 600px">{}</div>'
+
+
+def strip_external_resources(html: str) -> str:
+    return EXTERNAL_RESOURCE_REGEX.sub("", html)
+
+
+class FakeFacebook:
+    """The pages of the stand-in, loaded once and shared by all the requests"""
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        login_wall_rate: float = 0.0,
+        posts_per_group: int = POSTS_PER_GROUP,
+        seed: int | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.login_wall_rate = login_wall_rate
+        self.posts_per_group = posts_per_group
+        self.random = random.Random(seed)
+        self.about_pages = [
+            strip_external_resources(read_fixture(x)) for x in ABOUT_FIXTURES
+        ]
+        self.topics_page = strip_external_resources(read_fixture(TOPICS_FIXTURE))
+        self.admin_page = strip_external_resources(read_fixture(ADMIN_FIXTURE))
+        posts = get_outermost_posts(read_fixture(FEATURED_FIXTURE))
+        self.posts = [POST_WRAPPER.format(x) for x in posts]
+
+    def get_posts(self, offset: int, n: int) -> str:
+        end = min(offset + n, self.posts_per_group)
+        return "".join(self.posts[i % len(self.posts)] for i in range(offset, end))
+
+    def get_about_page(self, name: str) -> str:
+        return self.about_pages[crc32(name.encode()) % len(self.about_pages)]
+
+    def get_feed_page(self) -> str:
+        return FEED_PAGE.format(
+            posts=self.get_posts(0, POSTS_PER_LOAD),
+            offset=POSTS_PER_LOAD,
+            per_load=POSTS_PER_LOAD,
+            section=Sections.FEATURED.value,
+            more=MORE,
+            offset_key=OFFSET,
+        )
+
+    def delay(self):
+        jitter = self.random.uniform(-self.jitter_ms, self.jitter_ms)
+        seconds = max(0.0, self.latency_ms + jitter) / 1000
+        if seconds > 0:
+            sleep(seconds)
+
+    def is_login_wall(self, path: str) -> bool:
+        """Only navigations are walled, not the feed's requests for more posts"""
+        parts = path.strip("/").split("/")
+        if parts[0] == LOGIN or parts[-1] == MORE:
+            return False
+        return self.random.random() < self.login_wall_rate
+
+    def get_page(self, path: str, query: dict[str, list[str]]) -> str | None:
+        """Returns the page at path, or None when there's no such page"""
+        match path.strip("/").split("/"):
+            case [GROUPS, name, Sections.ABOUT.value]:
+                return self.get_about_page(name)
+            case [GROUPS, _, Sections.TOPICS.value]:
+                return self.topics_page
+            case [GROUPS, _, Sections.FEATURED.value]:
+                return self.get_feed_page()
+            case [GROUPS, _, Sections.FEATURED.value, MORE]:
+                return self.get_posts(int(query.get(OFFSET, ["0"])[0]), POSTS_PER_LOAD)
+            case [LOGIN]:
+                return LOGIN_PAGE
+            case [_, Sections.ABOUT.value]:
+                return self.admin_page
+        return None
+
+
+class FakeFacebookHandler(BaseHTTPRequestHandler):
+    server: "FakeFacebookServer"
+
+    def do_GET(self):
+        site = self.server.site
+        url = urlparse(self.path)
+        site.delay()
+        if site.is_login_wall(url.path):
+            self.send_response(HTTPStatus.FOUND)
+            self.send_header("Location", f"/{LOGIN}/?next={url.path}")
+            self.end_headers()
+            return
+        page = site.get_page(url.path, parse_qs(url.query))
+        if page is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        body = page.encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        pass
+
+
+class FakeFacebookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], site: FakeFacebook):
+        super().__init__(address, FakeFacebookHandler)
+        self.site = site
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/"
+
+
+app = typer.Typer()
+
+
+@app.command()
+def serve(
+    host: str = typer.Option(HOST),
+    port: int = typer.Option(PORT),
+    latency_ms: float = typer.Option(0.0),
+    jitter_ms: float = typer.Option(0.0),
+    login_wall_rate: float = typer.Option(0.0),
+    posts_per_group: int = typer.Option(POSTS_PER_GROUP),
+):
+    site = FakeFacebook(latency_ms, jitter_ms, login_wall_rate, posts_per_group)
+    with FakeFacebookServer((host, port), site) as server:
+        print(
+            f"serving on {server.base_url}, scrape with {BASE_URL_ENV}={server.base_url}"
+        )
+        server.serve_forever()
+
+
+@app.command()
+def links(n_groups: int, output_path: Path):
+    """Writes an input list of n_groups facebook links"""
+    with open(output_path, "w") as f:
+        lines = (f"{DEFAULT_FB_PREFIX}{GROUPS}/group{i}/\n" for i in range(n_groups))
+        f.write("".join(lines))
+
+
+if __name__ == "__main__":
+    app()
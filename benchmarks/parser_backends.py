@@ -0,0 +1,55 @@
+"""
+Parse time and peak memory of parse_featured and parse_admin per parser backend.
+Every backend runs in a fresh process so that its peak RSS isn't hidden by the
+previous one. tracemalloc only sees the python heap, so for the C backends the
+RSS column is the one to look at.
+Run from the repository root: python -m benchmarks.parser_backends
+"""
+import multiprocessing
+import resource
+import tracemalloc
+from pathlib import Path
+from time import perf_counter
+
+from fb_scrape_lib.advanced_scrape import parse_admin, parse_featured
+from fb_scrape_lib.parser_backend import PARSER_BACKENDS, set_parser_backend
+
+EXAMPLES = Path(__file__).parent.parent / "tests" / "example_groups"
+CASES = [
+    ("cheapmealideas_featured", parse_featured),
+    ("makeupartistsgroup_admin", parse_admin),
+]
+REPEATS = 5
+KB = 2**10
+
+
+def measure(backend: str, name: str) -> tuple[float, float, float]:
+    func = dict(CASES)[name]
+    with open(EXAMPLES / f"{name}.html", "r") as f:
+        html = f.read()
+    set_parser_backend(backend)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = perf_counter()
+    for _ in range(REPEATS):
+        func(html)
+    ms = (perf_counter() - start) / REPEATS * 1000
+    rss_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / KB
+    tracemalloc.start()
+    func(html)
+    heap_mb = tracemalloc.get_traced_memory()[1] / KB**2
+    tracemalloc.stop()
+    return ms, rss_mb, heap_mb
+
+
+def main():
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'page':<26}{'backend':<9}{'ms':>9}{'rss +MB':>10}{'py heap MB':>12}")
+    for name, _ in CASES:
+        for backend in PARSER_BACKENDS:
+            with ctx.Pool(1) as pool:
+                ms, rss_mb, heap_mb = pool.apply(measure, (backend, name))
+            print(f"{name:<26}{backend:<9}{ms:9.1f}{rss_mb:10.1f}{heap_mb:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -50,3 +50,52 @@ class PostData(StrEnum):
     COMMENTS = "n_comments"
     SHARES = "n_shares"
     LIKES = "n_likes"
+
+
+class JobState(StrEnum):
+    PENDING = "pending"
+    IN_PROGRESS = "in_progress"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class CacheMode(StrEnum):
+    READ_WRITE = "read-write"
+    READ_ONLY = "read-only"
+    REFRESH = "refresh"
+    BYPASS = "bypass"
+
+
+class SinkMode(StrEnum):
+    JSON = "json"
+    JSONL = "jsonl"
+
+
+class Stage(StrEnum):
+    BASIC = "basic"
+    ADVANCED = "advanced"
+    SAVE = "save"
+
+
+class DedupeMode(StrEnum):
+    EXACT = "exact"
+    BLOOM = "bloom"
+
+
+class BlockReason(StrEnum):
+    LOGIN_WALL = "login_wall"
+    CHECKPOINT = "checkpoint"
+    EMPTY_PAGE = "empty_page"
+
+
+class Timing(StrEnum):
+    BROWSER_LAUNCH = "browser_launch"
+    RATE_LIMIT = "rate_limit_wait"
+    NAVIGATION = "navigation"
+    SCROLL = "scroll"
+    PAGE_CONTENT = "page_content"
+    PARSE = "parse"
+    EXTRACT = "extract"
+    FILTER = "filter"
+    SAVE = "save"
+    GROUP = "group"
@@ -0,0 +1,313 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime
+from hashlib import sha256
+from json import loads
+from logging import getLogger
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from enums import AdminInfo, GroupInfoKeys, PostData, TopicsInfo
+from group_filter import DATETIME_UNIT, ResultColumns
+from result_sink import DATE_FORMAT, JSONL_NAME
+
+LOGGER = getLogger("export")
+BATCH_SIZE = 500
+JSON_SUFFIX = ".json"
+ISO_DATE_FORMAT = "%Y-%m-%d"
+NEW = "new"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    group_name TEXT PRIMARY KEY,
+    link TEXT,
+    is_private INTEGER,
+    n_members INTEGER,
+    description TEXT,
+    creation_date TEXT,
+    weekly_new REAL,
+    daily_posts_frequency REAL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_locations (
+    group_name TEXT NOT NULL REFERENCES groups (group_name),
+    location TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS admins (
+    group_name TEXT NOT NULL REFERENCES groups (group_name),
+    id TEXT NOT NULL,
+    name TEXT,
+    average_score REAL,
+    n_reviews INTEGER
+);
+CREATE TABLE IF NOT EXISTS admin_contacts (
+    group_name TEXT NOT NULL REFERENCES groups (group_name),
+    admin_id TEXT NOT NULL,
+    contact_type TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS topics (
+    group_name TEXT NOT NULL REFERENCES groups (group_name),
+    tag TEXT NOT NULL,
+    tagged_post_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS featured_posts (
+    group_name TEXT NOT NULL REFERENCES groups (group_name),
+    user_name TEXT,
+    date_posted TEXT,
+    text TEXT,
+    n_comments INTEGER,
+    n_shares INTEGER,
+    n_likes INTEGER
+);
+CREATE INDEX IF NOT EXISTS groups_n_members ON groups (n_members);
+CREATE INDEX IF NOT EXISTS groups_creation_date ON groups (creation_date);
+CREATE INDEX IF NOT EXISTS group_locations_location ON group_locations (location);
+CREATE INDEX IF NOT EXISTS group_locations_group ON group_locations (group_name);
+CREATE INDEX IF NOT EXISTS admins_id ON admins (id);
+CREATE INDEX IF NOT EXISTS admins_group ON admins (group_name);
+CREATE INDEX IF NOT EXISTS admin_contacts_group ON admin_contacts (group_name);
+CREATE INDEX IF NOT EXISTS topics_tag_count ON topics (tag, tagged_post_count);
+CREATE INDEX IF NOT EXISTS topics_group ON topics (group_name);
+CREATE INDEX IF NOT EXISTS featured_posts_group ON featured_posts (group_name);
+"""
+CHILD_TABLES = (
+    "group_locations",
+    "admins",
+    "admin_contacts",
+    "topics",
+    "featured_posts",
+)
+
+
+def to_iso_date(s: str | None) -> str | None:
+    """Dates are exported as YYYY-MM-DD so they sort and compare as strings"""
+    if not s:
+        return None
+    try:
+        return datetime.strptime(s, DATE_FORMAT).strftime(ISO_DATE_FORMAT)
+    except ValueError:
+        return s
+
+
+def iso_date_to_datetime64(s: str | None) -> np.datetime64:
+    """NaT for a missing date, or one that to_iso_date couldn't convert"""
+    try:
+        return np.datetime64(s or "NaT", "s")
+    except ValueError:
+        return np.datetime64("NaT", "s")
+
+
+def get_digest(data: bytes) -> str:
+    return sha256(data).hexdigest()
+
+
+def iter_json_files(results_path: Path) -> Iterator[tuple[str, str, Path]]:
+    for path in sorted(results_path.glob("*" + JSON_SUFFIX)):
+        if not path.name.startswith("."):
+            yield path.stem, get_digest(path.read_bytes()), path
+
+
+def iter_jsonl_lines(path: Path) -> Iterator[tuple[str, str, int]]:
+    """Yields the name, digest and offset of the last line of every group"""
+    last = {}
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                name = loads(line)[GroupInfoKeys.NAME]
+            except (ValueError, KeyError):
+                LOGGER.warning(f"ignoring a truncated line in {path}")
+            else:
+                last[name] = (get_digest(line.rstrip(b"\n")), offset)
+            offset += len(line)
+    for name, (digest, offset) in last.items():
+        yield name, digest, offset
+
+
+def read_jsonl_line(path: Path, offset: int) -> dict:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return loads(f.readline())
+
+
+def iter_records(results_path: Path) -> Iterator[tuple[str, str, Any]]:
+    """
+    Yields (group name, digest, loader) once for every group in a scrape's
+    dest_dir, from its json files and its results.jsonl. A group that is in
+    both (e.g. the output format was switched between runs) is read from its
+    line. The json is only loaded by the loader, so unchanged groups are never
+    parsed twice.
+    """
+    jsonl_path = results_path / JSONL_NAME
+    lines = {}
+    if jsonl_path.exists():
+        # the name is derived from the link, so it's unique per group
+        lines = {name: x for name, *x in iter_jsonl_lines(jsonl_path)}
+    for name, digest, path in iter_json_files(results_path):
+        if name not in lines:
+            yield name, digest, lambda path=path: loads(path.read_bytes())
+    for name, (digest, offset) in lines.items():
+        yield name, digest, lambda offset=offset: read_jsonl_line(jsonl_path, offset)
+
+
+def get_group_row(name: str, json: dict, digest: str) -> tuple:
+    return (
+        name,
+        json.get(GroupInfoKeys.LINK),
+        json.get(GroupInfoKeys.IS_PRIVATE),
+        json.get(GroupInfoKeys.MEMBERS),
+        json.get(GroupInfoKeys.DESCRIPTION),
+        to_iso_date(json.get(GroupInfoKeys.CREATION_DATE)),
+        json.get(GroupInfoKeys.WEEKLY_NEW),
+        json.get(GroupInfoKeys.POSTS_FREQUENCY),
+        digest,
+    )
+
+
+class SqliteExporter:
+    """
+    Exports the groups of a scrape into a SQLite database, with the admins,
+    topics, featured posts and locations in child tables. Every group keeps
+    the digest of its json, so exporting again only writes new or changed
+    groups.
+    """
+
+    def __init__(self, path: str | Path, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get_digests(self) -> dict[str, str]:
+        return dict(self._conn.execute("SELECT group_name, digest FROM groups"))
+
+    def _delete_group(self, name: str):
+        for table in CHILD_TABLES:
+            self._conn.execute(f"DELETE FROM {table} WHERE group_name = ?", (name,))
+
+    def _insert_group(self, name: str, json: dict, digest: str):
+        c = self._conn
+        c.execute(
+            "INSERT OR REPLACE INTO groups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            get_group_row(name, json, digest),
+        )
+        c.executemany(
+            "INSERT INTO group_locations VALUES (?, ?)",
+            ((name, x) for x in json.get(GroupInfoKeys.LOCATIONS) or []),
+        )
+        admins = json.get(GroupInfoKeys.ADMINS) or []
+        c.executemany(
+            "INSERT INTO admins VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    name,
+                    x[AdminInfo.ID],
+                    x.get(AdminInfo.NAME),
+                    x.get(AdminInfo.SCORE),
+                    x.get(AdminInfo.N_REVIEWS),
+                )
+                for x in admins
+            ),
+        )
+        c.executemany(
+            "INSERT INTO admin_contacts VALUES (?, ?, ?, ?)",
+            (
+                (name, x[AdminInfo.ID], contact_type, value)
+                for x in admins
+                for contact_type, values in (
+                    x.get(AdminInfo.CONTACT_INFO) or {}
+                ).items()
+                for value in values
+            ),
+        )
+        c.executemany(
+            "INSERT INTO topics VALUES (?, ?, ?)",
+            (
+                (name, x[TopicsInfo.TEXT], x.get(TopicsInfo.COUNT))
+                for x in json.get(GroupInfoKeys.TOPICS) or []
+            ),
+        )
+        c.executemany(
+            "INSERT INTO featured_posts VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    name,
+                    x.get(PostData.USER),
+                    to_iso_date(x.get(PostData.DATE)),
+                    x.get(PostData.TEXT),
+                    x.get(PostData.COMMENTS),
+                    x.get(PostData.SHARES),
+                    x.get(PostData.LIKES),
+                )
+                for x in json.get(GroupInfoKeys.FEATURED) or []
+            ),
+        )
+
+    def export(self, records: Iterable[tuple[str, str, Any]]) -> Counter:
+        """Writes the new and changed records, batch_size groups per transaction"""
+        digests = self.get_digests()
+        counts = Counter()
+        n_pending = 0
+        for name, digest, loader in records:
+            old_digest = digests.get(name)
+            if old_digest == digest:
+                counts[UNCHANGED] += 1
+                continue
+            if old_digest is not None:
+                self._delete_group(name)
+            self._insert_group(name, loader(), digest)
+            digests[name] = digest
+            counts[CHANGED if old_digest else NEW] += 1
+            n_pending += 1
+            if n_pending >= self.batch_size:
+                self._conn.commit()
+                n_pending = 0
+        self._conn.commit()
+        return counts
+
+
+def export_dir(results_path: Path, db_path: str | Path) -> Counter:
+    exporter = SqliteExporter(db_path)
+    try:
+        return exporter.export(iter_records(results_path))
+    finally:
+        exporter.close()
+
+
+def read_result_columns(db_path: str | Path) -> ResultColumns:
+    """Reads the filtered fields of every exported group, for batch filtering"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            "SELECT group_name, link, is_private, n_members, creation_date, "
+            "description FROM groups ORDER BY group_name"
+        ).fetchall()
+        names, links, is_private, n_members, creation_date, description = (
+            zip(*rows) if rows else ([],) * 6
+        )
+        ixs = {name: i for i, name in enumerate(names)}
+        locations = [set() for _ in names]
+        for name, location in conn.execute(
+            "SELECT group_name, location FROM group_locations"
+        ):
+            locations[ixs[name]].add(location)
+    finally:
+        conn.close()
+    return ResultColumns(
+        links=list(links),
+        # a group without is_private is treated as private
+        is_private=np.array([x != 0 for x in is_private], bool),
+        n_members=np.array(n_members, float),
+        creation_date=np.array(
+            [iso_date_to_datetime64(x) for x in creation_date], DATETIME_UNIT
+        ),
+        locations=locations,
+        description=list(description),
+    )
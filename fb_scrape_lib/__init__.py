@@ -1,3 +1,9 @@
-from .advanced_scrape import get_advanced_json
+from .advanced_scrape import get_advanced_json, get_advanced_json_async
+from .browser_pool import (
+    close_async_browser_pool,
+    close_browser_pool,
+    get_async_browser_pool,
+    get_browser_pool,
+)
 from .mutual import GroupInfoKeys
-from .scrape_about import get_info_from_about
+from .scrape_about import get_info_from_about, get_info_from_about_async
@@ -0,0 +1,91 @@
+import sqlite3
+from json import dumps, loads
+from logging import getLogger
+from pathlib import Path
+from time import time
+from typing import Any
+
+from enums import AdminInfo
+
+LOGGER = getLogger("admin_cache")
+TTL_SECONDS = 7 * 24 * 60 * 60
+IN_MEMORY = ":memory:"
+BUSY_TIMEOUT_SECONDS = 60
+# personal profiles are served under a pseudonymous id and never show a
+# "Contact info" section. Pages and some profiles use numeric ids, and the
+# facepile's __typename is "User" for both, so numeric ids are always fetched
+PERSONAL_PROFILE_ID_PREFIX = "pfbid"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS admins (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    created REAL NOT NULL
+);
+"""
+
+
+def is_personal_profile(admin: dict[str, Any]) -> bool:
+    return admin[AdminInfo.ID].startswith(PERSONAL_PROFILE_ID_PREFIX)
+
+
+class AdminCache:
+    """
+    Keeps the enriched data of every admin by AdminInfo.ID, so an admin that
+    runs several groups is visited once per ttl_seconds. The default path
+    keeps the cache in memory for the current run only.
+    """
+
+    def __init__(self, path: str | Path = IN_MEMORY, ttl_seconds: float = TTL_SECONDS):
+        self.path = str(path)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._conn = sqlite3.connect(
+            self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None
+        )
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, admin_id: str) -> dict[str, Any] | None:
+        row = self._conn.execute(
+            "SELECT data, created FROM admins WHERE id = ?", (admin_id,)
+        ).fetchone()
+        if row is None or row[1] + self.ttl_seconds < time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return loads(row[0])
+
+    def put(self, admin_id: str, data: dict[str, Any]):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO admins (id, data, created) VALUES (?, ?, ?)",
+            (admin_id, dumps(data), time()),
+        )
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "skipped": self.skipped}
+
+
+ADMIN_CACHE = AdminCache()
+
+
+def configure_admin_cache(
+    path: str | Path | None, ttl_seconds: float = TTL_SECONDS
+) -> AdminCache:
+    global ADMIN_CACHE
+    ADMIN_CACHE.close()
+    ADMIN_CACHE = AdminCache(path or IN_MEMORY, ttl_seconds)
+    return ADMIN_CACHE
+
+
+def get_admin_cache() -> AdminCache:
+    return ADMIN_CACHE
+
+
+def close_admin_cache():
+    LOGGER.info(f"admin cache stats: {ADMIN_CACHE.stats()}")
+    configure_admin_cache(None)
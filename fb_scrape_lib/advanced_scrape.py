@@ -1,13 +1,21 @@
+import asyncio
 import re
-from datetime import datetime, timedelta
+from collections import Counter
 from typing import Any, Callable
 
-from bs4 import BeautifulSoup
-from dateparser import parse
-
 from normalization import FB_PREFIX
 
+from .admin_cache import get_admin_cache, is_personal_profile
+from .dates import parse_date
+from .metrics import get_metrics, timed
 from .mutual import *
+from .parse_pool import parse_async
+from .parser_backend import (
+    ParserBackend,
+    class_selector,
+    get_parser_backend,
+    select_exact_class,
+)
 
 RATING_REGEX = re.compile(
     r"Rating · (?P<rating>\d(\.\d+)?) \((?P<n_reviews>(\d+|\d{1,3}(,\d{3})*)) Reviews\)"
@@ -22,14 +30,18 @@ CONTACT_INFO_CLASS = "x193iq5w xeuugli x13faqbe x1vvkbs xlh3980 xvmahel x1n0sxbx
 CLASS = "class"
 NONE_TEXT_CONTENT = "xi81zsa"
 SHARED_A_LINK = " shared a link"
+ADMIN_FETCH_CONCURRENCY = 4
 DIV = "div"
 
+FEATURED_SCROLLS = 50
+# the seconds each page of the asyncio advanced stage may take, not counting
+# its waits for the rate limiter. A late page fails the stage, to be retried
+TOPICS_DEADLINE_SECONDS = 60
+FEATURED_DEADLINE_SECONDS = 180
+ADMIN_DEADLINE_SECONDS = 120
 DATE_IX = 1
 USER_NAME_IX = 0
 
-POST_CLASS_DICT = {CLASS: POST_CLASS}
-LIKES_CLASS_DICT = {CLASS: LIKES_CLASS}
-CONTACT_INFO_CLASS_DICT = {CLASS: CONTACT_INFO_CLASS}
 POST_CLASSES = [
     "x193iq5w",
     "xeuugli",
@@ -39,6 +51,9 @@ POST_CLASSES = [
     "xvmahel",
     "x1n0sxbx",
 ]
+POST_SELECTOR = class_selector(DIV, POST_CLASS)
+POST_TEXT_SELECTOR = class_selector(SPAN, " ".join(POST_CLASSES))
+LIKES_SELECTOR = class_selector(SPAN, LIKES_CLASS)
 
 
 def get_topic_data(item: dict) -> dict[str, object]:
@@ -46,8 +61,20 @@ def get_topic_data(item: dict) -> dict[str, object]:
     return {TopicsInfo.TEXT: d[TopicsInfo.TEXT], TopicsInfo.COUNT: d[TopicsInfo.COUNT]}
 
 
-def get_topics(link: str, sleep_time: int) -> list[dict[str, object]]:
-    html = get_html(link, Sections.TOPICS, sleep_time)
+def get_topics(link: str) -> list[dict[str, object]]:
+    html = get_html(link, Sections.TOPICS)
+    return parse_topics(html)
+
+
+async def get_topics_async(
+    link: str, deadline: float | None = None
+) -> list[dict[str, object]]:
+    html = await get_html_async(link, Sections.TOPICS, deadline=deadline)
+    return await parse_async(parse_topics, html)
+
+
+@timed(Timing.EXTRACT, GroupInfoKeys.TOPICS)
+def parse_topics(html: str) -> list[dict[str, object]]:
     j = get_json_from_text_after(html, TOPICS_STR, True)
     if j:
         topics = j["hashtag_query"]["edges"]
@@ -58,24 +85,19 @@ def get_topics(link: str, sleep_time: int) -> list[dict[str, object]]:
 def parse_post_date(text: str):
     if "·" not in text:
         return None
-    text = text.split("·")[1]
-    if "d" in text:
-        delta = int(text.replace("d", ""))
-        today = datetime.now()
-        d = timedelta(days=delta)
-        return (today - d).strftime("%d/%m/%Y")
-    return parse(text).strftime("%d/%m/%Y")
-
-
-def post_2_text(element):
-    spans = element.find_all(SPAN)
-    for cls in POST_CLASSES:
-        spans = [span for span in spans if cls in span.attrs.get(CLASS, [])]
-    texts = [x.get_text() for x in spans]
+    date = parse_date(text.split("·")[1])
+    if date is None:
+        return None
+    return date.strftime("%d/%m/%Y")
+
+
+def post_2_text(element, backend: ParserBackend):
+    spans = backend.select(element, POST_TEXT_SELECTOR)
+    texts = [backend.text(x) for x in spans]
     content = [
         text
         for i, text in enumerate(texts)
-        if NONE_TEXT_CONTENT not in spans[i].attrs["class"]
+        if NONE_TEXT_CONTENT not in backend.classes(spans[i])
     ]
     return [x for x in texts if x], content
 
@@ -93,8 +115,8 @@ def get_comments_and_shares_indices_from_element_texts(
     return None, None
 
 
-def extract_post_data(element) -> dict[str, object]:
-    texts, assumed_text = post_2_text(element)
+def extract_post_data(element, backend: ParserBackend) -> dict[str, object]:
+    texts, assumed_text = post_2_text(element, backend)
     if len(texts) == 0:
         return {}
     date_ix = DATE_IX
@@ -121,9 +143,9 @@ def extract_post_data(element) -> dict[str, object]:
         content = " ".join(assumed_text)
         n_comments = 0
         n_shares = 0
-    likes_span = element.find(SPAN, LIKES_CLASS)
+    likes_span = backend.select_first(element, LIKES_SELECTOR)
     if likes_span:
-        n_likes = number_string_2_int(likes_span.get_text())
+        n_likes = number_string_2_int(backend.text(likes_span))
     else:
         n_likes = 0
     return {
@@ -136,14 +158,39 @@ def extract_post_data(element) -> dict[str, object]:
     }
 
 
-def get_featured(link: str, sleep_time: int) -> list[dict[str, object]]:
-    html = get_html(link, Sections.FEATURED, sleep_time, n_scrolls=50)
-    soup = BeautifulSoup(html, features="html.parser")
-    elements = soup.find_all(DIV, POST_CLASS)
+def get_featured(link: str) -> list[dict[str, object]]:
+    html = get_html(
+        link,
+        Sections.FEATURED,
+        n_scrolls=FEATURED_SCROLLS,
+        collect=POST_SELECTOR,
+    )
+    return parse_featured(html)
+
+
+async def get_featured_async(
+    link: str, deadline: float | None = None
+) -> list[dict[str, object]]:
+    html = await get_html_async(
+        link,
+        Sections.FEATURED,
+        n_scrolls=FEATURED_SCROLLS,
+        collect=POST_SELECTOR,
+        deadline=deadline,
+    )
+    return await parse_async(parse_featured, html)
+
+
+@timed(Timing.EXTRACT, GroupInfoKeys.FEATURED)
+def parse_featured(html: str) -> list[dict[str, object]]:
+    backend = get_parser_backend()
+    with get_metrics().timer(Timing.PARSE, GroupInfoKeys.FEATURED):
+        root = backend.parse(html)
+    elements = select_exact_class(backend, root, DIV, POST_CLASS)
     res = []
     for i, elm in enumerate(elements):
         try:
-            post_data = extract_post_data(elm)
+            post_data = extract_post_data(elm, backend)
             if post_data:
                 res.append(post_data)
         except:
@@ -209,30 +256,143 @@ def get_rating(span_texts: list[str]) -> dict[AdminInfo, Any] | None:
     return {AdminInfo.SCORE: 0.0, AdminInfo.N_REVIEWS: 0}
 
 
-def enrich_admin(link: str, sleep_time: int) -> dict[AdminInfo, Any]:
-    html = get_html(link, Sections.ABOUT, sleep_time)
+def enrich_admin(link: str) -> dict[AdminInfo, Any]:
+    html = get_html(link, Sections.ABOUT)
+    return parse_admin(html)
+
+
+async def enrich_admin_async(
+    link: str, deadline: float | None = None
+) -> dict[AdminInfo, Any]:
+    html = await get_html_async(link, Sections.ABOUT, deadline=deadline)
+    return await parse_async(parse_admin, html)
+
+
+@timed(Timing.EXTRACT, GroupInfoKeys.ADMINS)
+def parse_admin(html: str) -> dict[AdminInfo, Any]:
     res = {}
     if html.find("Contact info") > 0:
-        soup = BeautifulSoup(html, features="html.parser")
-        contact_spans = soup.find_all(SPAN, CONTACT_INFO_CLASS_DICT)
-        span_texts = [" ".join(x.get_text().split()) for x in contact_spans]
+        backend = get_parser_backend()
+        with get_metrics().timer(Timing.PARSE, GroupInfoKeys.ADMINS):
+            root = backend.parse(html)
+        contact_spans = select_exact_class(backend, root, SPAN, CONTACT_INFO_CLASS)
+        span_texts = [" ".join(backend.text(x).split()) for x in contact_spans]
         res[AdminInfo.CONTACT_INFO] = get_admin_contact_info(span_texts)
         res |= get_rating(span_texts)
     return res
 
 
-def enrich(admins_lst: list[dict[str, Any]], sleep_time: int):
-    links = [FB_PREFIX + x[AdminInfo.ID] + "/" for x in admins_lst]
-    enriched_data = [enrich_admin(link, sleep_time) for link in links]
+def get_admin_link(admin: dict[str, Any]) -> str:
+    return FB_PREFIX + admin[AdminInfo.ID] + "/"
+
+
+def get_cached_admin(admin: dict[str, Any]) -> dict[AdminInfo, Any] | None:
+    """Returns the admin's enriched data if no browser load is needed"""
+    cache = get_admin_cache()
+    if is_personal_profile(admin):
+        cache.skipped += 1
+        return {}
+    return cache.get(admin[AdminInfo.ID])
+
+
+def enrich_admin_cached(admin: dict[str, Any]) -> dict[AdminInfo, Any]:
+    res = get_cached_admin(admin)
+    if res is None:
+        res = enrich_admin(get_admin_link(admin))
+        get_admin_cache().put(admin[AdminInfo.ID], res)
+    return res
+
+
+def enrich(admins_lst: list[dict[str, Any]]):
+    enriched_data = [enrich_admin_cached(x) for x in admins_lst]
     return [x | enriched_data[i] for i, x in enumerate(admins_lst)]
 
 
-def get_advanced_json(
-    link: str, sleep_time: int, admins_list: list[dict[str, Any]]
-) -> dict:
-    topics = get_topics(link, sleep_time)
-    feat = get_featured(link, sleep_time)
-    enriched_admins_list = enrich(admins_list, sleep_time)
+# admins being fetched right now, so groups scraped concurrently that share an
+# admin wait for the same fetch, and the amount of groups waiting for each
+ADMIN_FETCHES: dict[str, asyncio.Task] = {}
+ADMIN_WAITERS: Counter[str] = Counter()
+
+
+async def __fetch_admin(
+    admin: dict[str, Any], semaphore: asyncio.Semaphore, deadline: float | None
+) -> dict[AdminInfo, Any]:
+    async with semaphore:
+        res = await enrich_admin_async(get_admin_link(admin), deadline)
+    get_admin_cache().put(admin[AdminInfo.ID], res)
+    return res
+
+
+async def enrich_admin_cached_async(
+    admin: dict[str, Any], semaphore: asyncio.Semaphore, deadline: float | None
+) -> dict[AdminInfo, Any]:
+    admin_id = admin[AdminInfo.ID]
+    if admin_id not in ADMIN_FETCHES:
+        res = get_cached_admin(admin)
+        if res is not None:
+            return res
+        task = asyncio.create_task(__fetch_admin(admin, semaphore, deadline))
+        task.add_done_callback(lambda _: ADMIN_FETCHES.pop(admin_id, None))
+        ADMIN_FETCHES[admin_id] = task
+    task = ADMIN_FETCHES[admin_id]
+    ADMIN_WAITERS[admin_id] += 1
+    try:
+        # a group that is cancelled doesn't cancel the fetch of the others
+        return await asyncio.shield(task)
+    finally:
+        ADMIN_WAITERS[admin_id] -= 1
+        if ADMIN_WAITERS[admin_id] == 0:
+            del ADMIN_WAITERS[admin_id]
+            # no group waits for it anymore, e.g. they were all blocked
+            task.cancel()
+
+
+async def enrich_async(
+    admins_lst: list[dict[str, Any]],
+    max_concurrent: int = ADMIN_FETCH_CONCURRENCY,
+    deadline: float | None = None,
+):
+    """Enriches the admins concurrently, each admin's page gets deadline seconds"""
+    semaphore = asyncio.Semaphore(max_concurrent)
+    enriched_data = await gather_or_cancel(
+        *[enrich_admin_cached_async(x, semaphore, deadline) for x in admins_lst]
+    )
+    return [x | enriched_data[i] for i, x in enumerate(admins_lst)]
+
+
+def get_advanced_json(link: str, admins_list: list[dict[str, Any]]) -> dict:
+    topics = get_topics(link)
+    feat = get_featured(link)
+    enriched_admins_list = enrich(admins_list)
+    return {
+        GroupInfoKeys.TOPICS: topics,
+        GroupInfoKeys.FEATURED: feat,
+        GroupInfoKeys.ADMINS: enriched_admins_list,
+    }
+
+
+async def gather_or_cancel(*coroutines) -> list:
+    """Like asyncio.gather, but the rest are cancelled once one of them fails"""
+    tasks = [asyncio.ensure_future(x) for x in coroutines]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+async def get_advanced_json_async(link: str, admins_list: list[dict[str, Any]]) -> dict:
+    """
+    Loads the topics, the pinned posts and the admins' pages at the same time,
+    so a group takes about as long as its slowest page. A page that misses its
+    deadline fails the group like a blocked page, rather than leaving it out.
+    """
+    topics, feat, enriched_admins_list = await gather_or_cancel(
+        get_topics_async(link, TOPICS_DEADLINE_SECONDS),
+        get_featured_async(link, FEATURED_DEADLINE_SECONDS),
+        enrich_async(admins_list, deadline=ADMIN_DEADLINE_SECONDS),
+    )
     return {
         GroupInfoKeys.TOPICS: topics,
         GroupInfoKeys.FEATURED: feat,
@@ -0,0 +1,305 @@
+import asyncio
+from contextlib import asynccontextmanager
+from logging import getLogger
+
+from playwright.async_api import Browser as AsyncBrowser
+from playwright.async_api import BrowserContext as AsyncBrowserContext
+from playwright.async_api import Page as AsyncPage
+from playwright.async_api import Playwright as AsyncPlaywright
+from playwright.async_api import async_playwright
+from playwright.sync_api import (
+    Browser,
+    BrowserContext,
+    Page,
+    Playwright,
+    sync_playwright,
+)
+
+from enums import Sections, Timing
+
+from .metrics import get_metrics
+from .resource_policy import ResourcePolicy, ResourceTracker, sum_resource_stats
+
+LOGGER = getLogger("browser_pool")
+LOCALE = "us-EN"
+MAX_NAVIGATIONS_PER_CONTEXT = 100
+MAX_JS_HEAP_MB = 512
+JS_HEAP_SIZE_SCRIPT = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+MB = 2**20
+ROUTE_ALL = "**/*"
+
+
+class BrowserPool:
+    """
+    Keeps a single chromium instance alive for the whole run and hands out a
+    reusable page. The context behind the page is recycled after
+    max_navigations navigations or once its JS heap grows over max_heap_mb.
+    When a resource_policy is set, the page's requests are routed through it.
+    """
+
+    def __init__(
+        self,
+        max_navigations: int = MAX_NAVIGATIONS_PER_CONTEXT,
+        max_heap_mb: int = MAX_JS_HEAP_MB,
+        resource_policy: ResourcePolicy | None = None,
+    ):
+        self.max_navigations = max_navigations
+        self.max_heap_mb = max_heap_mb
+        self.resource_policy = resource_policy
+        self._trackers: list[ResourceTracker] = []
+        self.launches = 0
+        self.contexts = 0
+        self.reuses = 0
+        self.recycles = 0
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._context: BrowserContext | None = None
+        self._page: Page | None = None
+        self._navigations = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _launch(self):
+        with get_metrics().timer(Timing.BROWSER_LAUNCH):
+            if self._playwright is None:
+                self._playwright = sync_playwright().start()
+            try:
+                self._browser = self._playwright.chromium.launch()
+            except Exception:
+                # playwright runs an event loop in this thread until stopped
+                self._playwright.stop()
+                self._playwright = None
+                raise
+        self.launches += 1
+        LOGGER.debug(f"launched browser #{self.launches}")
+
+    def _new_context(self):
+        self._close_context()
+        self._context = self._browser.new_context(locale=LOCALE)
+        self._page = self._context.new_page()
+        if self.resource_policy is not None:
+            self._trackers.append(ResourceTracker(self.resource_policy))
+            self._page.route(ROUTE_ALL, self._trackers[-1].handle)
+        self._navigations = 0
+        self.contexts += 1
+
+    def _close_context(self):
+        if self._trackers:
+            self._trackers[-1].report_page()
+        if self._context is not None:
+            self._context.close()
+        self._context = None
+        self._page = None
+
+    def _heap_mb(self) -> float:
+        try:
+            return self._page.evaluate(JS_HEAP_SIZE_SCRIPT) / MB
+        except Exception:
+            return 0.0
+
+    def _should_recycle(self) -> bool:
+        if self._navigations >= self.max_navigations:
+            return True
+        return self._heap_mb() > self.max_heap_mb
+
+    def get_page(self, section: Sections | None = None) -> Page:
+        if self._browser is None or not self._browser.is_connected():
+            self._launch()
+            self._new_context()
+        elif self._page is None or self._page.is_closed():
+            self._new_context()
+        elif self._should_recycle():
+            LOGGER.debug(f"recycling context after {self._navigations} navigations")
+            self.recycles += 1
+            self._new_context()
+        else:
+            self.reuses += 1
+        self._navigations += 1
+        if self.resource_policy is not None:
+            self._trackers[-1].start_page(section)
+        return self._page
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "launches": self.launches,
+            "contexts": self.contexts,
+            "reuses": self.reuses,
+            "recycles": self.recycles,
+        } | sum_resource_stats(self._trackers)
+
+    def close(self):
+        self._close_context()
+        if self._browser is not None:
+            self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            self._playwright.stop()
+            self._playwright = None
+
+
+class AsyncBrowserPool:
+    """
+    The asyncio counterpart of BrowserPool. A single browser context serves
+    many pages at once; at most max_inflight navigations run at the same time
+    and idle pages are handed to the next navigation instead of being closed.
+    A page is replaced after max_navigations navigations or once its JS heap
+    grows over max_heap_mb.
+    """
+
+    def __init__(
+        self,
+        max_navigations: int = MAX_NAVIGATIONS_PER_CONTEXT,
+        max_heap_mb: int = MAX_JS_HEAP_MB,
+        resource_policy: ResourcePolicy | None = None,
+    ):
+        self.max_navigations = max_navigations
+        self.max_heap_mb = max_heap_mb
+        self.resource_policy = resource_policy
+        self.max_inflight = 1
+        self.launches = 0
+        self.contexts = 0
+        self.reuses = 0
+        self.recycles = 0
+        self._playwright: AsyncPlaywright | None = None
+        self._browser: AsyncBrowser | None = None
+        self._context: AsyncBrowserContext | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._lock: asyncio.Lock | None = None
+        self._idle_pages: list[AsyncPage] = []
+        self._navigations: dict[AsyncPage, int] = {}
+        self._trackers: dict[AsyncPage, ResourceTracker] = {}
+        self._retired_trackers: list[ResourceTracker] = []
+
+    async def start(self, max_inflight: int):
+        self.max_inflight = max_inflight
+        self._semaphore = asyncio.Semaphore(max_inflight)
+        self._lock = asyncio.Lock()
+
+    async def _ensure_context(self):
+        async with self._lock:
+            if self._browser is None or not self._browser.is_connected():
+                with get_metrics().timer(Timing.BROWSER_LAUNCH):
+                    if self._playwright is None:
+                        self._playwright = await async_playwright().start()
+                    try:
+                        self._browser = await self._playwright.chromium.launch()
+                    except Exception:
+                        await self._playwright.stop()
+                        self._playwright = None
+                        raise
+                self.launches += 1
+                self._idle_pages = []
+                self._navigations = {}
+                for page in list(self._trackers):
+                    self._retire_tracker(page)
+                self._context = await self._browser.new_context(locale=LOCALE)
+                self.contexts += 1
+
+    async def _heap_mb(self, page: AsyncPage) -> float:
+        try:
+            return await page.evaluate(JS_HEAP_SIZE_SCRIPT) / MB
+        except Exception:
+            return 0.0
+
+    async def _should_recycle(self, page: AsyncPage) -> bool:
+        if self._navigations.get(page, 0) >= self.max_navigations:
+            return True
+        return await self._heap_mb(page) > self.max_heap_mb
+
+    async def _acquire_page(self) -> AsyncPage:
+        await self._ensure_context()
+        while self._idle_pages:
+            page = self._idle_pages.pop()
+            if page.is_closed():
+                self._navigations.pop(page, None)
+                self._retire_tracker(page)
+            elif await self._should_recycle(page):
+                self.recycles += 1
+                self._navigations.pop(page, None)
+                self._retire_tracker(page)
+                await page.close()
+            else:
+                self.reuses += 1
+                return page
+        page = await self._context.new_page()
+        self._navigations[page] = 0
+        if self.resource_policy is not None:
+            self._trackers[page] = ResourceTracker(self.resource_policy)
+            await page.route(ROUTE_ALL, self._trackers[page].handle_async)
+        return page
+
+    def _retire_tracker(self, page: AsyncPage):
+        if tracker := self._trackers.pop(page, None):
+            tracker.report_page()
+            self._retired_trackers.append(tracker)
+
+    @asynccontextmanager
+    async def page(self, section: Sections | None = None):
+        if self._semaphore is None:
+            await self.start(self.max_inflight)
+        async with self._semaphore:
+            page = await self._acquire_page()
+            self._navigations[page] = self._navigations.get(page, 0) + 1
+            if tracker := self._trackers.get(page):
+                tracker.start_page(section)
+            try:
+                yield page
+            finally:
+                if tracker:
+                    tracker.report_page()
+                self._idle_pages.append(page)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "launches": self.launches,
+            "contexts": self.contexts,
+            "reuses": self.reuses,
+            "recycles": self.recycles,
+        } | sum_resource_stats(self._retired_trackers + list(self._trackers.values()))
+
+    async def close(self):
+        self._idle_pages = []
+        self._navigations = {}
+        for page in list(self._trackers):
+            self._retire_tracker(page)
+        if self._context is not None:
+            await self._context.close()
+            self._context = None
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        self._semaphore = None
+        self._lock = None
+
+
+BROWSER_POOL = BrowserPool()
+ASYNC_BROWSER_POOL = AsyncBrowserPool()
+
+
+def get_browser_pool() -> BrowserPool:
+    return BROWSER_POOL
+
+
+def close_browser_pool() -> dict[str, int]:
+    stats = BROWSER_POOL.stats()
+    BROWSER_POOL.close()
+    LOGGER.info(f"browser pool stats: {stats}")
+    return stats
+
+
+def get_async_browser_pool() -> AsyncBrowserPool:
+    return ASYNC_BROWSER_POOL
+
+
+async def close_async_browser_pool() -> dict[str, int]:
+    stats = ASYNC_BROWSER_POOL.stats()
+    await ASYNC_BROWSER_POOL.close()
+    LOGGER.info(f"async browser pool stats: {stats}")
+    return stats
@@ -0,0 +1,135 @@
+import re
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from logging import getLogger
+
+LOGGER = getLogger("dates")
+MEMO_SIZE = 4096
+FAST_PATH = "fast_path"
+FALLBACK = "fallback"
+MEMO_HITS = "memo_hits"
+MONTHS = {
+    name: i
+    for i, name in enumerate(
+        (
+            "January",
+            "February",
+            "March",
+            "April",
+            "May",
+            "June",
+            "July",
+            "August",
+            "September",
+            "October",
+            "November",
+            "December",
+        ),
+        start=1,
+    )
+}
+MONTHS |= {name[:3]: i for name, i in MONTHS.items()}
+TIME = r"(?: at (?P<hour>\d{1,2}):(?P<minute>\d{2})\s*(?P<period>[AP]M))?"
+# "April 8, 2014", "March 2", "Feb 26 at 3:15 PM"
+ABSOLUTE_DATE_REGEX = re.compile(
+    r"(?P<month>[A-Z][a-z]+) (?P<day>\d{1,2})(?:, (?P<year>\d{4}))?" + TIME
+)
+# "3d", "5h", "12m", "1w"
+RELATIVE_DATE_REGEX = re.compile(r"(?P<n>\d+)\s?(?P<unit>[mhdw])")
+# "Yesterday at 3:15 PM"
+YESTERDAY_REGEX = re.compile("Yesterday" + TIME)
+UNITS = {
+    "m": timedelta(minutes=1),
+    "h": timedelta(hours=1),
+    "d": timedelta(days=1),
+    "w": timedelta(weeks=1),
+}
+
+DATE_PARSER_STATS = Counter()
+# the stats of the dates parsed by the parse pool's worker processes
+WORKER_DATE_PARSER_STATS = Counter()
+
+
+def __get_time(match: re.Match) -> tuple[int, int]:
+    if match.group("hour") is None:
+        return 0, 0
+    hour = int(match.group("hour")) % 12
+    if match.group("period") == "PM":
+        hour += 12
+    return hour, int(match.group("minute"))
+
+
+def __parse_absolute(match: re.Match, year: int) -> datetime | None:
+    month = MONTHS.get(match.group("month"))
+    if month is None:
+        return None
+    if match.group("year"):
+        year = int(match.group("year"))
+    try:
+        return datetime(year, month, int(match.group("day")), *__get_time(match))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=MEMO_SIZE)
+def __parse_absolute_with_year(text: str) -> datetime | None:
+    match = ABSOLUTE_DATE_REGEX.fullmatch(text)
+    return __parse_absolute(match, 0) if match else None
+
+
+def parse_fast(text: str, now: datetime) -> datetime | None:
+    """
+    Parses the few formats Facebook shows, or returns None. Dates that have a
+    year don't depend on now, so only those are memoized.
+    """
+    if match := RELATIVE_DATE_REGEX.fullmatch(text):
+        return now - int(match.group("n")) * UNITS[match.group("unit")]
+    if match := YESTERDAY_REGEX.fullmatch(text):
+        yesterday = now - UNITS["d"]
+        hour, minute = __get_time(match)
+        return datetime(yesterday.year, yesterday.month, yesterday.day, hour, minute)
+    if match := ABSOLUTE_DATE_REGEX.fullmatch(text):
+        if match.group("year"):
+            return __parse_absolute_with_year(text)
+        return __parse_absolute(match, now.year)
+    return None
+
+
+def parse_fallback(text: str) -> datetime | None:
+    # dateparser takes about a second to import, most runs never need it
+    from dateparser import parse
+
+    return parse(text)
+
+
+def parse_date(text: str, now: datetime | None = None) -> datetime | None:
+    """Like dateparser.parse, with fast paths for Facebook's date formats"""
+    text = " ".join(text.split())
+    res = parse_fast(text, now or datetime.now())
+    if res is not None:
+        DATE_PARSER_STATS[FAST_PATH] += 1
+        return res
+    DATE_PARSER_STATS[FALLBACK] += 1
+    LOGGER.debug(f"falling back to dateparser for {text!r}")
+    return parse_fallback(text)
+
+
+def get_local_date_parser_stats() -> dict[str, int]:
+    """The stats of the dates parsed by this process"""
+    return {
+        FAST_PATH: DATE_PARSER_STATS[FAST_PATH],
+        FALLBACK: DATE_PARSER_STATS[FALLBACK],
+        MEMO_HITS: __parse_absolute_with_year.cache_info().hits,
+    }
+
+
+def merge_date_parser_stats(stats: dict[str, int]):
+    WORKER_DATE_PARSER_STATS.update(stats)
+
+
+def get_date_parser_stats() -> dict[str, int]:
+    return {
+        k: v + WORKER_DATE_PARSER_STATS[k]
+        for k, v in get_local_date_parser_stats().items()
+    }
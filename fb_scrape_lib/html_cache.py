@@ -0,0 +1,196 @@
+import sqlite3
+import zlib
+from hashlib import sha256
+from logging import getLogger
+from os import getpid, replace
+from pathlib import Path
+from time import time
+
+from enums import CacheMode, Sections
+
+LOGGER = getLogger("html_cache")
+TTL_SECONDS = 7 * 24 * 60 * 60
+MAX_BYTES = 10 * 2**30
+INDEX_NAME = "index.db"
+SUFFIX = ".html.z"
+BUSY_TIMEOUT_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+"""
+
+
+def get_cache_key(
+    link: str, section: Sections, n_scrolls: int, collect: str | None = None
+) -> str:
+    key = f"{link}\0{section.value}\0{n_scrolls}"
+    if collect:
+        # the collected posts of a page are a different document than the page
+        key += f"\0{collect}"
+    return sha256(key.encode()).hexdigest()
+
+
+class HtmlCache:
+    """
+    An on-disk cache of the raw HTML returned by get_html. Pages are stored
+    compressed under the hash of (link, section, n_scrolls, collect), entries
+    older than ttl_seconds are ignored and the least recently used pages are
+    evicted once the cache grows over max_bytes. The size is kept as a running
+    total, that is re-read from the index (which other processes may share)
+    only when it crosses max_bytes.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        mode: CacheMode = CacheMode.READ_WRITE,
+        ttl_seconds: float = TTL_SECONDS,
+        max_bytes: int = MAX_BYTES,
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(
+            self.directory / INDEX_NAME,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            isolation_level=None,
+        )
+        self._conn.executescript(SCHEMA)
+        self._size = self.size()
+
+    def close(self):
+        self._conn.close()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + SUFFIX)
+
+    def _get_size(self, key: str) -> int:
+        row = self._conn.execute(
+            "SELECT size FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def _delete(self, key: str, size: int | None = None):
+        if size is None:
+            size = self._get_size(key)
+        self._conn.execute("DELETE FROM pages WHERE key = ?", (key,))
+        self._path(key).unlink(missing_ok=True)
+        self._size -= size
+
+    def get(
+        self,
+        link: str,
+        section: Sections,
+        n_scrolls: int,
+        collect: str | None = None,
+    ) -> str | None:
+        if self.mode in (CacheMode.BYPASS, CacheMode.REFRESH):
+            return None
+        key = get_cache_key(link, section, n_scrolls, collect)
+        row = self._conn.execute(
+            "SELECT created FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        now = time()
+        if row is None or row[0] + self.ttl_seconds < now:
+            self.misses += 1
+            return None
+        try:
+            with open(self._path(key), "rb") as f:
+                html = zlib.decompress(f.read()).decode()
+        except (OSError, zlib.error):
+            LOGGER.warning(f"dropping unreadable cache entry for {link}{section}")
+            self._delete(key)
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE pages SET last_access = ? WHERE key = ?", (now, key))
+        self.hits += 1
+        return html
+
+    def put(
+        self,
+        link: str,
+        section: Sections,
+        n_scrolls: int,
+        html: str,
+        collect: str | None = None,
+    ):
+        if self.mode in (CacheMode.BYPASS, CacheMode.READ_ONLY):
+            return
+        key = get_cache_key(link, section, n_scrolls, collect)
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = zlib.compress(html.encode())
+        tmp_path = path.with_name(f"{path.name}.{getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        replace(tmp_path, path)
+        now = time()
+        replaced_size = self._get_size(key)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO pages (key, size, created, last_access) "
+            "VALUES (?, ?, ?, ?)",
+            (key, len(data), now, now),
+        )
+        self._size += len(data) - replaced_size
+        if self._size > self.max_bytes:
+            self._evict()
+
+    def size(self) -> int:
+        return self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM pages"
+        ).fetchone()[0]
+
+    def _evict(self):
+        self._size = self.size()
+        excess = self._size - self.max_bytes
+        if excess <= 0:
+            return
+        rows = self._conn.execute(
+            "SELECT key, size FROM pages ORDER BY last_access"
+        ).fetchall()
+        for key, size in rows:
+            if excess <= 0:
+                break
+            self._delete(key, size)
+            excess -= size
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self.size()}
+
+
+HTML_CACHE: HtmlCache | None = None
+
+
+def configure_html_cache(
+    directory: str | Path | None,
+    mode: CacheMode = CacheMode.READ_WRITE,
+    ttl_seconds: float = TTL_SECONDS,
+    max_bytes: int = MAX_BYTES,
+) -> HtmlCache | None:
+    global HTML_CACHE
+    close_html_cache()
+    if directory is not None and mode != CacheMode.BYPASS:
+        HTML_CACHE = HtmlCache(directory, mode, ttl_seconds, max_bytes)
+    return HTML_CACHE
+
+
+def get_html_cache() -> HtmlCache | None:
+    return HTML_CACHE
+
+
+def close_html_cache():
+    global HTML_CACHE
+    if HTML_CACHE is not None:
+        LOGGER.info(f"html cache stats: {HTML_CACHE.stats()}")
+        HTML_CACHE.close()
+    HTML_CACHE = None
@@ -0,0 +1,278 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from json import dumps
+from logging import getLogger
+from os import getpid, replace
+from pathlib import Path
+from sys import platform
+from time import perf_counter, time
+from typing import Callable, TextIO
+
+from enums import Timing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LOGGER = getLogger("metrics")
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+METRIC_NAME = "fb_scraper_seconds"
+FLUSH_EVERY_GROUPS = 50
+INF = "+Inf"
+RSS_METRIC_NAME = "fb_scraper_peak_rss_bytes"
+MAIN_PROCESS = "main"
+KB = 2**10
+MB = 2**20
+
+# the timings of the group being scraped by the current thread or asyncio task
+CURRENT_GROUP: ContextVar[dict[str, float] | None] = ContextVar(
+    "current_group", default=None
+)
+
+
+class Histogram:
+    """Counts of the observed seconds per bucket, like a prometheus histogram"""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other: "Histogram"):
+        self.counts = [x + y for x, y in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def bounds(self) -> list[str]:
+        return [str(x) for x in self.buckets] + [INF]
+
+    def quantile(self, q: float) -> float:
+        """The upper bound of the bucket holding the q-th observation"""
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "mean": round(self.sum / self.count, 4) if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 3),
+        }
+
+
+def get_peak_rss_mb() -> float:
+    """The peak resident memory of this process, 0 where it isn't available"""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macos, kilobytes elsewhere
+    return peak / (MB if platform == "darwin" else KB)
+
+
+def get_key(timing: Timing, detail: str) -> str:
+    return f"{timing}:{detail}" if detail else str(timing)
+
+
+def get_labels(timing: Timing, detail: str) -> str:
+    labels = f'stage="{timing}"'
+    if detail:
+        labels += f',detail="{detail}"'
+    return labels
+
+
+class Metrics:
+    """
+    Aggregates the time spent in every stage of the scrape into a histogram
+    per (timing, detail), e.g. (extract, n_members). The timings observed
+    inside group() are also summed per group, and every group is written as
+    a line to jsonl_path. prometheus_path is rewritten every flush_every
+    groups in the prometheus text format, for a node exporter's textfile
+    collector. The peak RSS of this process and of the worker processes that
+    reported theirs is exported too.
+    """
+
+    def __init__(
+        self,
+        prometheus_path: str | Path | None = None,
+        jsonl_path: str | Path | None = None,
+        flush_every: int = FLUSH_EVERY_GROUPS,
+    ):
+        self.prometheus_path = (
+            None if prometheus_path is None else Path(prometheus_path)
+        )
+        self.flush_every = flush_every
+        self.histograms: dict[tuple[Timing, str], Histogram] = {}
+        self.worker_peak_rss_mb: dict[str, float] = {}
+        self.n_groups = 0
+        self._stream: TextIO | None = None
+        if jsonl_path is not None:
+            self._stream = open(jsonl_path, "a", encoding="utf-8")
+
+    def observe(self, timing: Timing, seconds: float, detail: str = ""):
+        key = (timing, detail)
+        if key not in self.histograms:
+            self.histograms[key] = Histogram()
+        self.histograms[key].observe(seconds)
+        group = CURRENT_GROUP.get()
+        if group is not None:
+            key = get_key(timing, detail)
+            group[key] = group.get(key, 0.0) + seconds
+
+    def merge(self, histograms: dict[tuple[Timing, str], Histogram]):
+        """Adds the histograms of another process, e.g. a parse worker"""
+        group = CURRENT_GROUP.get()
+        for (timing, detail), x in histograms.items():
+            key = (timing, detail)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(x.buckets)
+            self.histograms[key].merge(x)
+            if group is not None:
+                key = get_key(timing, detail)
+                group[key] = group.get(key, 0.0) + x.sum
+
+    def observe_peak_rss(self, process: str, mb: float):
+        old = self.worker_peak_rss_mb.get(process, 0.0)
+        self.worker_peak_rss_mb[process] = max(old, mb)
+
+    def peak_rss_mb(self) -> dict[str, float]:
+        return {MAIN_PROCESS: get_peak_rss_mb()} | self.worker_peak_rss_mb
+
+    @contextmanager
+    def timer(self, timing: Timing, detail: str = ""):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(timing, perf_counter() - start, detail)
+
+    @contextmanager
+    def group(self, link: str):
+        """Attributes the timings observed inside it to the group"""
+        timings = {}
+        token = CURRENT_GROUP.set(timings)
+        start = perf_counter()
+        try:
+            yield timings
+        finally:
+            CURRENT_GROUP.reset(token)
+            seconds = perf_counter() - start
+            self.observe(Timing.GROUP, seconds)
+            self._end_group(link, seconds, timings)
+
+    def _end_group(self, link: str, seconds: float, timings: dict[str, float]):
+        self.n_groups += 1
+        if self._stream is not None:
+            stages = {k: round(v, 4) for k, v in timings.items()}
+            line = {"link": link, "time": time(), "seconds": round(seconds, 4)}
+            self._stream.write(dumps(line | {"stages": stages}) + "\n")
+            self._stream.flush()
+        if self.prometheus_path is not None and self.n_groups % self.flush_every == 0:
+            self.write_prometheus()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {
+            get_key(timing, detail): x.summary()
+            for (timing, detail), x in sorted(self.histograms.items())
+        }
+
+    def to_prometheus(self) -> str:
+        lines = [
+            f"# HELP {METRIC_NAME} Seconds spent in each stage of the scrape",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for (timing, detail), x in sorted(self.histograms.items()):
+            labels = get_labels(timing, detail)
+            cumulative = 0
+            for bound, n in zip(x.bounds(), x.counts):
+                cumulative += n
+                lines.append(
+                    f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {x.sum}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {x.count}")
+        lines += [
+            f"# HELP {RSS_METRIC_NAME} Peak resident memory of each kind of process",
+            f"# TYPE {RSS_METRIC_NAME} gauge",
+        ]
+        for process, mb in self.peak_rss_mb().items():
+            lines.append(f'{RSS_METRIC_NAME}{{process="{process}"}} {round(mb * MB)}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        path = self.prometheus_path
+        tmp_path = path.with_name(f"{path.name}.{getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(self.to_prometheus())
+        replace(tmp_path, path)
+
+    def close(self):
+        if self.prometheus_path is not None:
+            self.write_prometheus()
+        if self._stream is not None:
+            line = {"time": time(), "summary": self.summary()}
+            line["peak_rss_mb"] = self.peak_rss_mb()
+            self._stream.write(dumps(line) + "\n")
+            self._stream.close()
+            self._stream = None
+
+
+METRICS = Metrics()
+
+
+def configure_metrics(
+    prometheus_path: str | Path | None = None,
+    jsonl_path: str | Path | None = None,
+    flush_every: int = FLUSH_EVERY_GROUPS,
+) -> Metrics:
+    global METRICS
+    METRICS.close()
+    METRICS = Metrics(prometheus_path, jsonl_path, flush_every)
+    return METRICS
+
+
+def get_metrics() -> Metrics:
+    return METRICS
+
+
+def close_metrics():
+    """Logs the aggregated timings and writes the final exports"""
+    global METRICS
+    for key, summary in METRICS.summary().items():
+        LOGGER.info(f"{key}: {summary}")
+    peak_rss = {k: round(v, 1) for k, v in METRICS.peak_rss_mb().items()}
+    LOGGER.info(f"peak rss in MB: {peak_rss}")
+    METRICS.close()
+    METRICS = Metrics()
+
+
+def timed(timing: Timing, detail: str = "") -> Callable[[Callable], Callable]:
+    """Decorates a function so every call is observed"""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_metrics().timer(timing, detail):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
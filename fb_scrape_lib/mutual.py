@@ -1,11 +1,24 @@
-from json import loads
-from time import sleep
+import asyncio
+from json import JSONDecodeError, JSONDecoder
+from typing import Awaitable, Callable
 
-from playwright.sync_api import Page, sync_playwright
+from playwright.async_api import Page as AsyncPage
+from playwright.sync_api import Page
 
 from enums import *
 
-SCROLL_SIZE = 1e3
+from .browser_pool import ASYNC_BROWSER_POOL, BROWSER_POOL
+from .html_cache import get_html_cache
+from .metrics import get_metrics
+from .page_buffer import PageBuffer
+from .post_collector import (
+    SCROLL_SIZE,
+    collect_posts_while_scrolling,
+    collect_posts_while_scrolling_async,
+)
+from .rate_limiter import MIN_SCROLL_WAIT_SECONDS, SCROLL_COST, get_rate_limiter
+
+JSON_DECODER = JSONDecoder()
 DATE = "date"
 NUMBER = "number"
 ADMINS_KEY = "facepile_admin_profiles"
@@ -15,33 +28,138 @@ TEXT = "text"
 NO_NEW_MEMBERS = "No new members in the last week"
 TOPICS_STR = '"group_hashtags_with_filter":{"hashtag_query"'
 LOCATIONS_KEY = "group_locations"
+# bump whenever a parse_* function starts returning different output
+EXTRACTOR_VERSION = 2
+# the first window a json object is decoded from in a PageBuffer
+JSON_WINDOW = 2**16
 
 
 def __scroll_till_html_does_not_change(
-    page: Page, address: str, n: int, sleep_time: int
+    page: Page, address: str, n: int, pace: Callable[[], None]
 ):
-    page.goto(address)
+    metrics = get_metrics()
+    with metrics.timer(Timing.NAVIGATION):
+        page.goto(address)
     html = ""
     i = 0
     old_length = -1
     while i < n and len(html) > old_length:
         old_length = len(html)
-        page.mouse.wheel(0, SCROLL_SIZE)
-        sleep(sleep_time)
-        html = page.content()
+        with metrics.timer(Timing.SCROLL):
+            page.mouse.wheel(0, SCROLL_SIZE)
+        pace()
+        with metrics.timer(Timing.PAGE_CONTENT):
+            html = page.content()
+        i += 1
     return html
 
 
-def get_html(link: str, section: Sections, sleep_time: int, n_scrolls: int = 1) -> str:
+def get_html(
+    link: str,
+    section: Sections,
+    n_scrolls: int = 1,
+    collect: str | None = None,
+) -> str:
+    """
+    Returns the page's html. If collect is a css selector, returns instead an
+    html document of the elements matching it that appeared while scrolling.
+    The navigation and every scroll step are paced by the rate limiter.
+    """
+    cache = get_html_cache()
+    if cache is not None:
+        if (html := cache.get(link, section, n_scrolls, collect)) is not None:
+            return html
     address = f"{link}{section.value}"
-    with sync_playwright() as p:
-        with p.chromium.launch() as browser:
-            context = browser.new_context(locale="us-EN")
-            page = context.new_page()
-            page.goto(address)
-            html = __scroll_till_html_does_not_change(
-                page, address, sleep_time, n_scrolls
-            )
+    limiter = get_rate_limiter()
+
+    def pace():
+        limiter.acquire(link, section, SCROLL_COST, MIN_SCROLL_WAIT_SECONDS)
+
+    limiter.acquire(link, section)
+    page = BROWSER_POOL.get_page(section)
+    if collect:
+        html = collect_posts_while_scrolling(page, address, collect, n_scrolls, pace)
+        # an empty page is told from a group without pinned posts by the page
+        with get_metrics().timer(Timing.PAGE_CONTENT):
+            limiter.report(link, section, page.content(), page.url)
+    else:
+        html = __scroll_till_html_does_not_change(page, address, n_scrolls, pace)
+        limiter.report(link, section, html, page.url)
+    if cache is not None:
+        cache.put(link, section, n_scrolls, html, collect)
+    return html
+
+
+async def __scroll_till_html_does_not_change_async(
+    page: AsyncPage, address: str, n: int, pace: Callable[[], Awaitable[None]]
+):
+    metrics = get_metrics()
+    with metrics.timer(Timing.NAVIGATION):
+        await page.goto(address)
+    html = ""
+    i = 0
+    old_length = -1
+    while i < n and len(html) > old_length:
+        old_length = len(html)
+        with metrics.timer(Timing.SCROLL):
+            await page.mouse.wheel(0, SCROLL_SIZE)
+        await pace()
+        with metrics.timer(Timing.PAGE_CONTENT):
+            html = await page.content()
+        i += 1
+    return html
+
+
+async def get_html_async(
+    link: str,
+    section: Sections,
+    n_scrolls: int = 1,
+    collect: str | None = None,
+    deadline: float | None = None,
+) -> str:
+    """
+    See get_html. Raises TimeoutError when the page took over deadline
+    seconds, not counting the waits for the rate limiter.
+    """
+    cache = get_html_cache()
+    if cache is not None:
+        if (html := cache.get(link, section, n_scrolls, collect)) is not None:
+            return html
+    address = f"{link}{section.value}"
+    limiter = get_rate_limiter()
+    # a throttled host waits without holding a page other hosts could use
+    await limiter.acquire_async(link, section)
+    loop = asyncio.get_running_loop()
+    try:
+        async with asyncio.timeout(deadline) as timeout:
+
+            async def pace():
+                # the deadline is paused while the rate limiter waits
+                when = timeout.when()
+                timeout.reschedule(None)
+                start = loop.time()
+                await limiter.acquire_async(
+                    link, section, SCROLL_COST, MIN_SCROLL_WAIT_SECONDS
+                )
+                if when is not None:
+                    timeout.reschedule(when + loop.time() - start)
+
+            async with ASYNC_BROWSER_POOL.page(section) as page:
+                if collect:
+                    html = await collect_posts_while_scrolling_async(
+                        page, address, collect, n_scrolls, pace
+                    )
+                    with get_metrics().timer(Timing.PAGE_CONTENT):
+                        limiter.report(link, section, await page.content(), page.url)
+                else:
+                    html = await __scroll_till_html_does_not_change_async(
+                        page, address, n_scrolls, pace
+                    )
+                    limiter.report(link, section, html, page.url)
+    except TimeoutError as e:
+        raise TimeoutError(f"{address} took over {deadline}s") from e
+    if cache is not None:
+        cache.put(link, section, n_scrolls, html, collect)
     return html
 
 
@@ -58,29 +176,42 @@ def number_string_2_int(s: str) -> int:
     return int(s.replace(",", ""))
 
 
-def extract_first_json_object_in_string(text: str, curly_brackets: bool) -> dict:
-    bracket_start, bracket_end = "{}" if curly_brackets else "[]"
-    beginning = text.find(bracket_start)
-    if beginning is None:
+def raw_decode_at(text: str | PageBuffer, beginning: int) -> dict | list:
+    if isinstance(text, str):
+        return JSON_DECODER.raw_decode(text, beginning)[0]
+    # a buffer is decoded in growing windows, a cut object doesn't decode
+    window = JSON_WINDOW
+    while True:
+        try:
+            return JSON_DECODER.raw_decode(text[beginning : beginning + window])[0]
+        except JSONDecodeError:
+            if beginning + window >= len(text):
+                raise
+            window *= 4
+
+
+def extract_first_json_object_in_string(
+    text: str | PageBuffer, curly_brackets: bool, start: int = 0
+) -> dict | list:
+    """
+    Decodes the first json object (or list) that begins at or after `start`.
+    The object is decoded in place, so brackets inside json strings are handled
+    and nothing is copied out of text.
+    """
+    bracket_start = "{" if curly_brackets else "["
+    beginning = text.find(bracket_start, start)
+    if beginning == -1:
+        return {}
+    try:
+        return raw_decode_at(text, beginning)
+    except JSONDecodeError:
         return {}
-    s = text[beginning:]
-    count_start = 1
-    count_end = 0
-    pos = 1
-    while count_start > count_end and pos < len(s):
-        if s[pos] == bracket_start:
-            count_start += 1
-        elif s[pos] == bracket_end:
-            count_end += 1
-        pos += 1
-    if count_end == count_start:
-        return loads(s[:pos])
-    return {}
-
-
-def get_json_from_text_after(html: str, x: str, curly_brackets: bool) -> dict | None:
+
+
+def get_json_from_text_after(
+    html: str | PageBuffer, x: str, curly_brackets: bool
+) -> dict | None:
     ix = html.find(x)
     if ix == -1:
         return None
-    s = html[ix:]
-    return extract_first_json_object_in_string(s, curly_brackets)
+    return extract_first_json_object_in_string(html, curly_brackets, ix)
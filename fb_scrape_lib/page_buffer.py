@@ -0,0 +1,86 @@
+from mmap import ACCESS_READ, mmap
+from tempfile import TemporaryFile
+from typing import BinaryIO
+
+# pages up to this size are kept in memory, larger ones in a temp file
+SPOOL_BYTES = 2**18
+ENCODING = "utf-8"
+
+
+class PageBuffer:
+    """
+    A page's html kept once, encoded. Up to spool_bytes it's kept in memory,
+    above it's moved to a temp file that is memory-mapped for scanning, so a
+    large page that is kept for a while isn't held on the heap. find returns
+    byte offsets, and slicing with them decodes only the window in between:
+    a character split by a window's edge is dropped.
+    """
+
+    def __init__(self, html: str = "", spool_bytes: int = SPOOL_BYTES):
+        self.spool_bytes = spool_bytes
+        self.size = 0
+        self._memory = bytearray()
+        self._file: BinaryIO | None = None
+        self._map: mmap | None = None
+        if html:
+            self.append(html)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def is_spooled(self) -> bool:
+        return self._file is not None
+
+    def append(self, text: str):
+        data = text.encode(ENCODING)
+        self.size += len(data)
+        self._unmap()
+        if self._file is None and self.size > self.spool_bytes:
+            self._file = TemporaryFile()
+            self._file.write(self._memory)
+            self._memory = bytearray()
+        if self._file is None:
+            self._memory += data
+        else:
+            self._file.write(data)
+
+    def _view(self) -> bytearray | mmap:
+        if self._file is None:
+            return self._memory
+        if self._map is None:
+            self._file.flush()
+            self._map = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        return self._map
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def find(self, sub: str, start: int = 0, end: int | None = None) -> int:
+        end = self.size if end is None else end
+        return self._view().find(sub.encode(ENCODING), start, end)
+
+    def __getitem__(self, key: slice) -> str:
+        return self._view()[key].decode(ENCODING, errors="ignore")
+
+    def __contains__(self, sub: str) -> bool:
+        return self.find(sub) != -1
+
+    def __len__(self) -> int:
+        return self.size
+
+    def text(self) -> str:
+        return self[:]
+
+    def close(self):
+        self._unmap()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._memory = bytearray()
+        self.size = 0
@@ -0,0 +1,124 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from logging import getLogger
+from multiprocessing import get_context
+from os import cpu_count
+from typing import Any, Callable
+
+from .dates import get_local_date_parser_stats, merge_date_parser_stats
+from .metrics import configure_metrics, get_metrics, get_peak_rss_mb
+from .parser_backend import DEFAULT_PARSER_BACKEND, set_parser_backend
+
+LOGGER = getLogger("parse_pool")
+PARSE_WORKER = "parse_worker"
+# pages handed to the workers at once, per worker, before fetching waits
+PENDING_PER_WORKER = 2
+# forking would copy the browser's threads and the open metrics files
+START_METHOD = "spawn"
+
+
+def init_worker(parser_backend: str):
+    set_parser_backend(parser_backend)
+
+
+def parse_in_worker(
+    func: Callable[[str], Any], html: str
+) -> tuple[Any, dict, dict[str, int], float]:
+    """
+    Runs in a worker process, returns the result, the timings and the date
+    parser stats it observed, and the worker's peak RSS in MB
+    """
+    metrics = configure_metrics()
+    date_stats = get_local_date_parser_stats()
+    res = func(html)
+    date_stats = {
+        k: v - date_stats[k] for k, v in get_local_date_parser_stats().items()
+    }
+    return res, metrics.histograms, date_stats, get_peak_rss_mb()
+
+
+class ParsePool:
+    """
+    Runs the extractors of the fetched pages in worker processes, so parsing
+    uses every core and never blocks the event loop the browser is driven by.
+    At most max_pending pages are parsed or queued at once, a fetch that
+    would add another waits until one of them is parsed.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        parser_backend: str = DEFAULT_PARSER_BACKEND,
+        max_pending: int | None = None,
+    ):
+        self.max_workers = max_workers or cpu_count()
+        self.max_pending = max_pending or PENDING_PER_WORKER * self.max_workers
+        self.parsed = 0
+        self.waits = 0
+        self.worker_peak_rss_mb = 0.0
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=get_context(START_METHOD),
+            initializer=init_worker,
+            initargs=(parser_backend,),
+        )
+        self._semaphore: asyncio.Semaphore | None = None
+
+    async def parse(self, func: Callable[[str], Any], html: str) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        if self._semaphore.locked():
+            self.waits += 1
+        async with self._semaphore:
+            future = self._executor.submit(parse_in_worker, func, html)
+            res, histograms, date_stats, peak_rss_mb = await asyncio.wrap_future(future)
+        get_metrics().merge(histograms)
+        merge_date_parser_stats(date_stats)
+        get_metrics().observe_peak_rss(PARSE_WORKER, peak_rss_mb)
+        self.worker_peak_rss_mb = max(self.worker_peak_rss_mb, peak_rss_mb)
+        self.parsed += 1
+        return res
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "workers": self.max_workers,
+            "parsed": self.parsed,
+            "waits": self.waits,
+            "worker_peak_rss_mb": round(self.worker_peak_rss_mb, 1),
+        }
+
+    def close(self):
+        self._executor.shutdown(cancel_futures=True)
+
+
+PARSE_POOL: ParsePool | None = None
+
+
+def configure_parse_pool(
+    max_workers: int | None = None,
+    parser_backend: str = DEFAULT_PARSER_BACKEND,
+    max_pending: int | None = None,
+) -> ParsePool:
+    global PARSE_POOL
+    close_parse_pool()
+    PARSE_POOL = ParsePool(max_workers, parser_backend, max_pending)
+    return PARSE_POOL
+
+
+def get_parse_pool() -> ParsePool | None:
+    return PARSE_POOL
+
+
+def close_parse_pool():
+    global PARSE_POOL
+    if PARSE_POOL is not None:
+        LOGGER.info(f"parse pool stats: {PARSE_POOL.stats()}")
+        PARSE_POOL.close()
+        PARSE_POOL = None
+
+
+async def parse_async(func: Callable[[str], Any], html: str) -> Any:
+    """Runs func(html) in the parse pool if one is configured, inline otherwise"""
+    if PARSE_POOL is None:
+        return func(html)
+    return await PARSE_POOL.parse(func, html)
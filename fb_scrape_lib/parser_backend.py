@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+from logging import getLogger
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+LOGGER = getLogger("parser_backend")
+TEXT_NODE = "-text"
+CLASS = "class"
+
+
+class ParserBackend(ABC):
+    """
+    The few DOM operations the extractors need. Text is returned like bs4's
+    get_text, which collapses whitespace-only strings to a newline or a space.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def parse(self, html: str):
+        ...
+
+    @abstractmethod
+    def select(self, node, css: str) -> list:
+        ...
+
+    @abstractmethod
+    def select_first(self, node, css: str):
+        ...
+
+    @abstractmethod
+    def text(self, node) -> str:
+        ...
+
+    @abstractmethod
+    def classes(self, node) -> list[str]:
+        ...
+
+
+class Bs4Backend(ParserBackend):
+    name = "bs4"
+
+    def parse(self, html: str):
+        return BeautifulSoup(html, features="html.parser")
+
+    def select(self, node, css: str) -> list:
+        return node.select(css)
+
+    def select_first(self, node, css: str):
+        return node.select_one(css)
+
+    def text(self, node) -> str:
+        return node.get_text()
+
+    def classes(self, node) -> list[str]:
+        return node.attrs.get(CLASS, [])
+
+
+def collapse_whitespace_string(s: str) -> str:
+    if s.isspace():
+        return "\n" if "\n" in s else " "
+    return s
+
+
+class LexborBackend(ParserBackend):
+    name = "lexbor"
+
+    def parse(self, html: str):
+        return LexborHTMLParser(html)
+
+    def select(self, node, css: str) -> list:
+        return node.css(css)
+
+    def select_first(self, node, css: str):
+        return node.css_first(css)
+
+    def text(self, node) -> str:
+        return "".join(
+            collapse_whitespace_string(x.text_content)
+            for x in node.traverse(include_text=True)
+            if x.tag == TEXT_NODE
+        )
+
+    def classes(self, node) -> list[str]:
+        return (node.attributes.get(CLASS) or "").split()
+
+
+PARSER_BACKENDS = {Bs4Backend.name: Bs4Backend}
+if LexborHTMLParser is not None:
+    PARSER_BACKENDS[LexborBackend.name] = LexborBackend
+# lexbor is opt-in, so installing selectolax doesn't change which parser runs
+DEFAULT_PARSER_BACKEND = Bs4Backend.name
+
+PARSER_BACKEND: ParserBackend = PARSER_BACKENDS[DEFAULT_PARSER_BACKEND]()
+
+
+def set_parser_backend(name: str) -> ParserBackend:
+    global PARSER_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise RuntimeError(
+            f"parser backend {name} is unavailable, use one of {list(PARSER_BACKENDS)}"
+        )
+    PARSER_BACKEND = PARSER_BACKENDS[name]()
+    LOGGER.debug(f"using the {name} parser backend")
+    return PARSER_BACKEND
+
+
+def get_parser_backend() -> ParserBackend:
+    return PARSER_BACKEND
+
+
+def class_selector(tag: str, classes: str) -> str:
+    """A css selector of the elements of type tag that have all of classes"""
+    return tag + "".join(f".{x}" for x in classes.split())
+
+
+def select_exact_class(backend: ParserBackend, node, tag: str, classes: str) -> list:
+    """Like bs4's find_all(tag, classes): the class attribute must equal classes"""
+    return [
+        x
+        for x in backend.select(node, class_selector(tag, classes))
+        if " ".join(backend.classes(x)) == classes
+    ]
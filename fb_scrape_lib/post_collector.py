@@ -0,0 +1,135 @@
+from time import monotonic
+from typing import Awaitable, Callable
+
+from playwright.async_api import Page as AsyncPage
+from playwright.sync_api import Page
+
+from enums import Timing
+
+from .metrics import get_metrics
+
+SCROLL_SIZE = 1e3
+NO_NEW_POSTS_DEADLINE_SECONDS = 6
+
+# Installs a MutationObserver that keeps every element matching the selector
+# (but not the ones nested in an already collected element). drain(false)
+# serializes the elements that were added before the previous drain, so a post
+# gets a whole scroll step to finish rendering before it's sent. drain(true)
+# sends the rest.
+COLLECTOR_SCRIPT = """
+(selector) => {
+    const pending = [];
+    const seen = new WeakSet();
+    let step = 0;
+    let total = 0;
+    const isNested = (element) => {
+        for (let p = element.parentElement; p; p = p.parentElement) {
+            if (seen.has(p)) return true;
+        }
+        return false;
+    };
+    const add = (node) => {
+        if (!(node instanceof Element)) return;
+        const matches = node.matches(selector) ? [node] : [];
+        matches.push(...node.querySelectorAll(selector));
+        for (const element of matches) {
+            if (seen.has(element)) continue;
+            const nested = isNested(element);
+            seen.add(element);
+            if (!nested) {
+                pending.push([step, element]);
+                total += 1;
+            }
+        }
+    };
+    add(document.documentElement);
+    new MutationObserver((records) => {
+        for (const record of records) record.addedNodes.forEach(add);
+    }).observe(document.documentElement, {childList: true, subtree: true});
+    window.__postCollector = {
+        drain: (all) => {
+            const ready = [];
+            while (pending.length && (all || pending[0][0] < step)) {
+                ready.push(pending.shift()[1].outerHTML);
+            }
+            step += 1;
+            return {total: total, html: ready};
+        },
+    };
+}
+"""
+DRAIN_SCRIPT = "(all) => window.__postCollector.drain(all)"
+
+
+def wrap_posts(chunks: list[str]) -> str:
+    return "<html><body>" + "".join(chunks) + "</body></html>"
+
+
+def collect_posts_while_scrolling(
+    page: Page,
+    address: str,
+    selector: str,
+    n: int,
+    pace: Callable[[], None],
+    deadline: float = NO_NEW_POSTS_DEADLINE_SECONDS,
+) -> str:
+    """
+    Scrolls up to n times and returns an html document made only of the
+    elements matching selector. Instead of serializing the whole page after
+    every scroll, only the newly added elements are sent back from the page.
+    pace is called after every scroll step.
+    Stops early once no new element arrived for `deadline` seconds.
+    """
+    metrics = get_metrics()
+    with metrics.timer(Timing.NAVIGATION):
+        page.goto(address)
+    page.evaluate(COLLECTOR_SCRIPT, selector)
+    chunks = []
+    total = 0
+    last_new = monotonic()
+    for _ in range(n):
+        with metrics.timer(Timing.SCROLL):
+            page.mouse.wheel(0, SCROLL_SIZE)
+        pace()
+        with metrics.timer(Timing.PAGE_CONTENT):
+            res = page.evaluate(DRAIN_SCRIPT, False)
+        chunks += res["html"]
+        if res["total"] > total:
+            total = res["total"]
+            last_new = monotonic()
+        elif monotonic() - last_new > deadline:
+            break
+    chunks += page.evaluate(DRAIN_SCRIPT, True)["html"]
+    return wrap_posts(chunks)
+
+
+async def collect_posts_while_scrolling_async(
+    page: AsyncPage,
+    address: str,
+    selector: str,
+    n: int,
+    pace: Callable[[], Awaitable[None]],
+    deadline: float = NO_NEW_POSTS_DEADLINE_SECONDS,
+) -> str:
+    """See collect_posts_while_scrolling"""
+    metrics = get_metrics()
+    with metrics.timer(Timing.NAVIGATION):
+        await page.goto(address)
+    await page.evaluate(COLLECTOR_SCRIPT, selector)
+    chunks = []
+    total = 0
+    last_new = monotonic()
+    for _ in range(n):
+        with metrics.timer(Timing.SCROLL):
+            await page.mouse.wheel(0, SCROLL_SIZE)
+        await pace()
+        with metrics.timer(Timing.PAGE_CONTENT):
+            res = await page.evaluate(DRAIN_SCRIPT, False)
+        chunks += res["html"]
+        if res["total"] > total:
+            total = res["total"]
+            last_new = monotonic()
+        elif monotonic() - last_new > deadline:
+            break
+    chunks += (await page.evaluate(DRAIN_SCRIPT, True))["html"]
+    return wrap_posts(chunks)
@@ -0,0 +1,203 @@
+import asyncio
+from collections import Counter, defaultdict
+from logging import getLogger
+from threading import Lock
+from time import monotonic, sleep
+from urllib.parse import urlparse
+
+from enums import BlockReason, Sections, Timing
+
+from .metrics import get_metrics
+
+LOGGER = getLogger("rate_limiter")
+INITIAL_RATE = 0.5
+MIN_RATE = 1 / 60
+MAX_RATE = 2.0
+BURST = 2.0
+INCREASE_STEP = 0.01
+DECREASE_FACTOR = 0.5
+BLOCK_COOLDOWN_SECONDS = 60.0
+NAVIGATION_COST = 1.0
+SCROLL_COST = 0.25
+# a scroll step waits at least this long, so the new posts have time to render
+MIN_SCROLL_WAIT_SECONDS = 0.5
+EMPTY_PAGE_BYTES = 2**10
+LOGIN_PATH = "/login"
+CHECKPOINT_PATH = "/checkpoint"
+
+
+def get_host(link: str) -> str:
+    return urlparse(link).netloc
+
+
+def detect_block(html: str, url: str) -> BlockReason | None:
+    """Returns why the page looks like facebook refused to serve it"""
+    path = urlparse(url).path
+    if path.startswith(LOGIN_PATH):
+        return BlockReason.LOGIN_WALL
+    if path.startswith(CHECKPOINT_PATH):
+        return BlockReason.CHECKPOINT
+    if len(html) < EMPTY_PAGE_BYTES:
+        return BlockReason.EMPTY_PAGE
+    return None
+
+
+class BlockedError(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    """
+    Tokens refill at `rate` per second up to `burst`. A request takes its
+    cost upfront and waits until the bucket is back to zero, so callers that
+    arrive together are spaced out instead of all waking at once.
+    """
+
+    def __init__(self, rate: float, burst: float = BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = monotonic()
+
+    def reserve(self, cost: float, now: float) -> float:
+        """Takes cost tokens and returns the seconds to wait before using them"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= cost
+        return max(0.0, -self.tokens / self.rate)
+
+    def drain(self, seconds: float):
+        """Makes the following requests wait at least `seconds`"""
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class RateLimiter:
+    """
+    Paces every navigation and scroll step through a token bucket per host.
+    The rate adapts AIMD-style: every healthy page raises it by
+    increase_step up to max_rate, and a blocked page (login wall, checkpoint
+    or empty page) halves it down to min_rate and pauses the host for
+    cooldown_seconds. section_costs sets the budget a navigation to each
+    section takes, sections that aren't in it cost NAVIGATION_COST.
+    """
+
+    def __init__(
+        self,
+        initial_rate: float = INITIAL_RATE,
+        min_rate: float = MIN_RATE,
+        max_rate: float = MAX_RATE,
+        increase_step: float = INCREASE_STEP,
+        decrease_factor: float = DECREASE_FACTOR,
+        cooldown_seconds: float = BLOCK_COOLDOWN_SECONDS,
+        section_costs: dict[Sections, float] | None = None,
+    ):
+        self.initial_rate = min(max(initial_rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.cooldown_seconds = cooldown_seconds
+        self.section_costs = section_costs or {}
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = Lock()
+        self.requests = Counter()
+        self.wait_seconds = defaultdict(float)
+        self.blocks = Counter()
+
+    def get_rate(self, host: str) -> float:
+        bucket = self._buckets.get(host)
+        return self.initial_rate if bucket is None else bucket.rate
+
+    def _reserve(self, link: str, section: Sections, cost: float | None) -> float:
+        if cost is None:
+            cost = self.section_costs.get(section, NAVIGATION_COST)
+        host = get_host(link)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.initial_rate)
+            wait = bucket.reserve(cost, monotonic())
+            self.requests[section] += 1
+            self.wait_seconds[section] += wait
+        return wait
+
+    def _wait_seconds(
+        self, link: str, section: Sections, cost: float | None, min_wait: float
+    ) -> float:
+        wait = max(self._reserve(link, section, cost), min_wait)
+        get_metrics().observe(Timing.RATE_LIMIT, wait, section.name.lower())
+        return wait
+
+    def acquire(
+        self,
+        link: str,
+        section: Sections,
+        cost: float | None = None,
+        min_wait: float = 0.0,
+    ):
+        """Sleeps until the host's budget allows the request"""
+        wait = self._wait_seconds(link, section, cost, min_wait)
+        if wait > 0:
+            sleep(wait)
+
+    async def acquire_async(
+        self,
+        link: str,
+        section: Sections,
+        cost: float | None = None,
+        min_wait: float = 0.0,
+    ):
+        """See acquire"""
+        wait = self._wait_seconds(link, section, cost, min_wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def report(self, link: str, section: Sections, html: str, url: str):
+        """
+        Adapts the host's rate to the page that was returned. Raises
+        BlockedError when the page was blocked, so it's neither parsed nor
+        cached.
+        """
+        host = get_host(link)
+        reason = detect_block(html, url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.initial_rate)
+            if reason is None:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase_step)
+                return
+            bucket.rate = max(self.min_rate, bucket.rate * self.decrease_factor)
+            bucket.drain(self.cooldown_seconds)
+            self.blocks[reason] += 1
+        LOGGER.warning(
+            f"{link}{section.value} looks blocked ({reason}), slowing {host}"
+            f" down to {bucket.rate:.3f} requests per second"
+        )
+        raise BlockedError(f"{reason}: {url}")
+
+    def stats(self) -> dict:
+        return {
+            "rates": {host: round(x.rate, 3) for host, x in self._buckets.items()},
+            "blocks": dict(self.blocks),
+            "sections": {
+                section.name.lower(): {
+                    "requests": n,
+                    "wait_seconds": round(self.wait_seconds[section], 1),
+                }
+                for section, n in self.requests.items()
+            },
+        }
+
+
+RATE_LIMITER = RateLimiter()
+
+
+def configure_rate_limiter(**kwargs) -> RateLimiter:
+    global RATE_LIMITER
+    RATE_LIMITER = RateLimiter(**kwargs)
+    return RATE_LIMITER
+
+
+def get_rate_limiter() -> RateLimiter:
+    return RATE_LIMITER
@@ -0,0 +1,135 @@
+import re
+from collections import Counter
+from logging import getLogger
+
+from enums import Sections
+
+LOGGER = getLogger("resource_policy")
+
+BLOCKED_RESOURCE_TYPES = frozenset(
+    {"image", "media", "font", "stylesheet", "texttrack", "manifest", "other"}
+)
+BLOCKED_URL_PATTERNS = (
+    r"facebook\.com/tr[/?]",
+    r"facebook\.com/ajax/bz",
+    r"facebook\.com/security/hsts-pixel",
+    r"connect\.facebook\.net",
+    r"google-analytics\.com",
+    r"googletagmanager\.com",
+    r"doubleclick\.net",
+)
+# resource types a section still needs, infinite scroll relies on the layout
+SECTION_ALLOWED_TYPES = {
+    Sections.FEATURED: frozenset({"stylesheet"}),
+}
+# rough average transfer sizes, only used to estimate the saved bandwidth
+ESTIMATED_BYTES = {
+    "image": 30_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 20_000,
+    "script": 50_000,
+}
+DEFAULT_ESTIMATED_BYTES = 5_000
+
+
+class ResourcePolicy:
+    """
+    Decides which requests of a page are aborted, by resource type and by url
+    pattern. A section can allow back some of the blocked resource types.
+    Note that Playwright disables the HTTP cache for routed requests.
+    """
+
+    def __init__(
+        self,
+        blocked_types: frozenset[str] = BLOCKED_RESOURCE_TYPES,
+        blocked_url_patterns: tuple[str, ...] = BLOCKED_URL_PATTERNS,
+        section_allowed_types: dict[Sections, frozenset[str]] | None = None,
+    ):
+        self.blocked_types = blocked_types
+        self.blocked_url_regex = (
+            re.compile("|".join(blocked_url_patterns)) if blocked_url_patterns else None
+        )
+        self.section_allowed_types = (
+            SECTION_ALLOWED_TYPES
+            if section_allowed_types is None
+            else section_allowed_types
+        )
+
+    def should_block(
+        self, resource_type: str, url: str, section: Sections | None
+    ) -> bool:
+        if self.blocked_url_regex and self.blocked_url_regex.search(url):
+            return True
+        if resource_type not in self.blocked_types:
+            return False
+        return resource_type not in self.section_allowed_types.get(section, ())
+
+
+class ResourceTracker:
+    """
+    Routes a page's requests through a ResourcePolicy and counts the blocked
+    requests of the current navigation and of the whole run.
+    """
+
+    def __init__(self, policy: ResourcePolicy):
+        self.policy = policy
+        self.section: Sections | None = None
+        self.page_blocked: Counter[str] = Counter()
+        self.total_blocked: Counter[str] = Counter()
+        self.allowed = 0
+
+    def start_page(self, section: Sections | None):
+        self.report_page()
+        self.section = section
+
+    def report_page(self):
+        """Logs the savings of the current page once, when the page is released"""
+        if self.page_blocked:
+            LOGGER.info(
+                f"{self.section}: blocked {sum(self.page_blocked.values())} requests,"
+                f" ~{estimate_bytes(self.page_blocked) / 1e3:.0f} KB saved"
+            )
+        self.page_blocked = Counter()
+
+    def _should_block(self, request) -> bool:
+        resource_type = request.resource_type
+        if self.policy.should_block(resource_type, request.url, self.section):
+            self.page_blocked[resource_type] += 1
+            self.total_blocked[resource_type] += 1
+            return True
+        self.allowed += 1
+        return False
+
+    def handle(self, route):
+        if self._should_block(route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    async def handle_async(self, route):
+        if self._should_block(route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "blocked_requests": sum(self.total_blocked.values()),
+            "allowed_requests": self.allowed,
+            "estimated_bytes_saved": estimate_bytes(self.total_blocked),
+        }
+
+
+def estimate_bytes(blocked: Counter[str]) -> int:
+    return sum(
+        ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES) * n
+        for resource_type, n in blocked.items()
+    )
+
+
+def sum_resource_stats(trackers: list[ResourceTracker]) -> dict[str, int]:
+    res = Counter()
+    for tracker in trackers:
+        res.update(tracker.stats())
+    return dict(res)
@@ -1,13 +1,15 @@
 import datetime
 import re
+from html import unescape
 from typing import Any
 
-from bs4 import BeautifulSoup
-from dateparser import parse
-
 from enums import *
 
+from .dates import parse_date
+from .metrics import timed
 from .mutual import *
+from .page_buffer import PageBuffer
+from .parse_pool import get_parse_pool, parse_async
 
 # regexes
 
@@ -19,6 +21,22 @@ POSTS_LAST_MONTH_REGEX = re.compile(
 NEW_MEMBERS_THIS_WEEK_REGEX = re.compile(
     r"\"group_new_members_info_text\":\"(?P<text>.*?)\""
 )
+META_TAG_REGEX = re.compile(r"<meta\b[^>]*>", re.IGNORECASE)
+ATTRIBUTE_REGEX = re.compile(
+    r"([^\s=/>]+)\s*=\s*(?:\"(?P<dq>[^\"]*)\"|'(?P<sq>[^']*)'|(?P<bare>[^\s>]+))"
+)
+
+# literal anchors that every regex match must contain. The regexes are only
+# run on a window around an anchor occurrence, which is found with str.find.
+MEMBERS_ANCHOR = " total members"
+CREATION_DATE_ANCHOR = "Group created on "
+POSTS_LAST_MONTH_ANCHOR = " in the last month"
+NEW_MEMBERS_THIS_WEEK_ANCHOR = '"group_new_members_info_text":"'
+META_ANCHOR = "<meta"
+WINDOW = 256
+
+# json keys and whether their value is an object (or a list)
+ABOUT_JSON_ISLANDS = {ADMINS_KEY: True, LOCATIONS_KEY: False}
 
 
 LINK = "a"
@@ -27,32 +45,77 @@ CONTENT = "content"
 MONTH = 30
 
 DESCRIPTION_COMPONENT_OPTIONS = [
-    ["meta", {"name": "description"}],
-    ["meta", {"property": "og:image:alt"}],
+    ("name", "description"),
+    ("property", "og:image:alt"),
 ]
 
 
+def search_around_anchor(
+    html: str | PageBuffer, anchor: str, regex: re.Pattern, before: int, after: int
+) -> re.Match | None:
+    """
+    Returns the first match of regex in html, given that every match contains
+    anchor and spans at most `before` characters before it and `after` after it.
+    The match is made on a copy of the window, its positions are relative to it.
+    """
+    ix = html.find(anchor)
+    while ix != -1:
+        start = max(0, ix - before)
+        if match := regex.search(html[start : ix + len(anchor) + after]):
+            return match
+        ix = html.find(anchor, ix + 1)
+    return None
+
+
+def get_attribute_value(match: re.Match) -> str:
+    value = match.group("dq") or match.group("sq") or match.group("bare") or ""
+    return unescape(value)
+
+
+def get_meta_tags_attributes(html: str | PageBuffer):
+    ix = html.find(META_ANCHOR)
+    while ix != -1:
+        end = html.find(">", ix)
+        if end == -1:
+            return
+        if tag := META_TAG_REGEX.match(html[ix : end + 1]):
+            yield {
+                m.group(1).lower(): get_attribute_value(m)
+                for m in ATTRIBUTE_REGEX.finditer(tag.group())
+            }
+            ix = end
+        ix = html.find(META_ANCHOR, ix + 1)
+
+
+@timed(Timing.EXTRACT, GroupInfoKeys.MEMBERS)
 def __get_members(html: str) -> int:
-    amount = MEMBERS_REGEX.search(html)
+    amount = search_around_anchor(html, MEMBERS_ANCHOR, MEMBERS_REGEX, WINDOW, 0)
     if amount:
         return number_string_2_int(amount.group(NUMBER))
     return 0
 
 
-def __get_full_description(soup: BeautifulSoup) -> str | None:
-    options = []
-    for option in DESCRIPTION_COMPONENT_OPTIONS:
-        if x := soup.find(*option):
-            options.append(x.get(CONTENT, ""))
-            options.append(x.attrs.get(CONTENT, ""))
-        else:
-            options.append("")
-    return max(options, key=len)
+@timed(Timing.EXTRACT, GroupInfoKeys.DESCRIPTION)
+def __get_full_description(html: str) -> str | None:
+    options = {option: "" for option in DESCRIPTION_COMPONENT_OPTIONS}
+    missing = set(options)
+    for attributes in get_meta_tags_attributes(html):
+        for option in list(missing):
+            key, value = option
+            if attributes.get(key) == value:
+                options[option] = attributes.get(CONTENT, "")
+                missing.remove(option)
+        if not missing:
+            break
+    return max(options.values(), key=len)
 
 
+@timed(Timing.EXTRACT, GroupInfoKeys.CREATION_DATE)
 def __get_date(html: str) -> datetime.datetime:
-    date = CREATION_DATE_REGEX.search(html).group(DATE)
-    return parse(date)
+    date = search_around_anchor(
+        html, CREATION_DATE_ANCHOR, CREATION_DATE_REGEX, 0, WINDOW
+    ).group(DATE)
+    return parse_date(date)
 
 
 def get_details(admin_dict: dict):
@@ -60,8 +123,9 @@ def get_details(admin_dict: dict):
     return {AdminInfo.ID: node[AdminInfo.ID], AdminInfo.NAME: node[AdminInfo.NAME]}
 
 
-def __get_admins(html) -> list[dict[str, str]]:
-    j = get_json_from_text_after(html, ADMINS_KEY, True)
+@timed(Timing.EXTRACT, GroupInfoKeys.ADMINS)
+def __get_admins(html: str) -> list[dict[str, str]]:
+    j = __get_json_island(html, ADMINS_KEY)
     if j:
         admin_details = [get_details(x) for x in j["edges"]]
         admin_details.sort(key=lambda x: x[AdminInfo.ID])
@@ -69,20 +133,27 @@ def __get_admins(html) -> list[dict[str, str]]:
     return []
 
 
+@timed(Timing.EXTRACT, GroupInfoKeys.IS_PRIVATE)
 def __is_public(html) -> bool:
     return PUBLIC in html
 
 
+@timed(Timing.EXTRACT, GroupInfoKeys.POSTS_FREQUENCY)
 def __get_monthly_posts_frequency(html: str) -> float:
-    amount_match = POSTS_LAST_MONTH_REGEX.search(html)
+    amount_match = search_around_anchor(
+        html, POSTS_LAST_MONTH_ANCHOR, POSTS_LAST_MONTH_REGEX, WINDOW, 0
+    )
     if amount_match is None:
         return 0.0
     amount = number_string_2_int(amount_match.group(POSTS))
     return amount / MONTH
 
 
+@timed(Timing.EXTRACT, GroupInfoKeys.WEEKLY_NEW)
 def __get_weekly_new_members(html: str) -> float:
-    amount_match = NEW_MEMBERS_THIS_WEEK_REGEX.search(html)
+    amount_match = search_around_anchor(
+        html, NEW_MEMBERS_THIS_WEEK_ANCHOR, NEW_MEMBERS_THIS_WEEK_REGEX, 0, WINDOW
+    )
     if amount_match is None:
         return 0.0
     amount_string = amount_match.group(TEXT)
@@ -91,6 +162,10 @@ def __get_weekly_new_members(html: str) -> float:
     return float(amount_string)
 
 
+def __get_json_island(html: str, key: str) -> Any:
+    return get_json_from_text_after(html, key, ABOUT_JSON_ISLANDS[key])
+
+
 def __get_more_info_from_about_for_public_group(
     html: str,
 ) -> dict[GroupInfoKeys, Any]:
@@ -104,8 +179,9 @@ def __get_more_info_from_about_for_public_group(
     }
 
 
+@timed(Timing.EXTRACT, GroupInfoKeys.LOCATIONS)
 def __get_locations(html: str) -> list[str]:
-    j = get_json_from_text_after(html, LOCATIONS_KEY, False)
+    j = __get_json_island(html, LOCATIONS_KEY)
     if j:
         locations = [item["name"] for item in j]
         locations.sort()
@@ -113,10 +189,22 @@ def __get_locations(html: str) -> list[str]:
     return []
 
 
-def get_info_from_about(link: str, sleep_time: int) -> dict[GroupInfoKeys, Any]:
-    html = get_html(link, Sections.ABOUT, sleep_time)
-    soup = BeautifulSoup(html, features="html.parser")
-    description = __get_full_description(soup)
+def get_info_from_about(link: str) -> dict[GroupInfoKeys, Any]:
+    with PageBuffer(get_html(link, Sections.ABOUT)) as html:
+        return parse_about(html)
+
+
+async def get_info_from_about_async(link: str) -> dict[GroupInfoKeys, Any]:
+    html = await get_html_async(link, Sections.ABOUT)
+    if get_parse_pool() is None:
+        with PageBuffer(html) as buffer:
+            return parse_about(buffer)
+    return await parse_async(parse_about, html)
+
+
+def parse_about(html: str | PageBuffer) -> dict[GroupInfoKeys, Any]:
+    """Returns the group's about fields, every extraction is timed"""
+    description = __get_full_description(html)
     result = {GroupInfoKeys.DESCRIPTION: description}
     if not __is_public(html):
         result[GroupInfoKeys.IS_PRIVATE] = True
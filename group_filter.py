@@ -1,104 +1,224 @@
+from abc import ABC, abstractmethod
 from datetime import datetime
-from functools import partial
 from json import loads
 from pathlib import Path
 from typing import Callable
 
+import numpy as np
+
 from fb_scrape_lib.mutual import GroupInfoKeys
 
 MAX = "max_val"
 MIN = "min_val"
 FB_LAUNCH_DATE = "2004-02-04"
+MAX_MEMBERS = 3e9
+DATETIME_UNIT = "datetime64[s]"
 
 
 def check_if_public(json: dict) -> bool:
     return not json[GroupInfoKeys.IS_PRIVATE]
 
 
-def check_all(value: dict, func_list: list[Callable[[dict], bool]]) -> bool:
-    for func in func_list:
-        if not func(value):
-            return False
-    return True
+class ResultColumns:
+    """
+    The filtered fields of many stored results, a numpy array per numeric
+    field. Missing numbers are nan and missing dates are NaT, so they fail
+    every range check.
+    """
+
+    def __init__(
+        self,
+        links: list[str],
+        is_private: np.ndarray,
+        n_members: np.ndarray,
+        creation_date: np.ndarray,
+        locations: list[set[str]],
+        description: list[str],
+    ):
+        self.links = links
+        self.is_private = is_private
+        self.n_members = n_members
+        self.creation_date = creation_date
+        self.locations = locations
+        self.description = description
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+
+class Check(ABC):
+    """One condition of a filter, cost orders the checks cheapest-first"""
+
+    cost = 0
+
+    @abstractmethod
+    def __call__(self, json: dict) -> bool:
+        ...
+
+    @abstractmethod
+    def batch(self, columns: ResultColumns, rows: np.ndarray) -> np.ndarray:
+        """Returns the mask of the given row indices that pass the check"""
+        ...
+
+
+class PublicCheck(Check):
+    cost = 0
+
+    def __call__(self, json: dict) -> bool:
+        return check_if_public(json)
+
+    def batch(self, columns: ResultColumns, rows: np.ndarray) -> np.ndarray:
+        return ~columns.is_private[rows]
+
+
+class RangeCheck(Check):
+    cost = 1
+
+    def __init__(self, key: GroupInfoKeys, min_val, max_val):
+        self.key = key
+        self.min_val = min_val
+        self.max_val = max_val
+
+    def __call__(self, json: dict) -> bool:
+        return self.min_val < json[self.key] < self.max_val
+
+    def batch(self, columns: ResultColumns, rows: np.ndarray) -> np.ndarray:
+        if self.key == GroupInfoKeys.CREATION_DATE:
+            values = columns.creation_date[rows]
+            min_val, max_val = np.datetime64(self.min_val), np.datetime64(self.max_val)
+        else:
+            values = columns.n_members[rows]
+            min_val, max_val = self.min_val, self.max_val
+        return (min_val < values) & (values < max_val)
+
+
+class LocationsCheck(Check):
+    cost = 2
+
+    def __init__(self, relevant_locations: list[str]):
+        self.relevant_locations = frozenset(relevant_locations or ())
+
+    def __call__(self, json: dict) -> bool:
+        return not self.relevant_locations.isdisjoint(
+            json[GroupInfoKeys.LOCATIONS] or ()
+        )
+
+    def batch(self, columns: ResultColumns, rows: np.ndarray) -> np.ndarray:
+        locations = columns.locations
+        relevant = self.relevant_locations
+        return np.fromiter(
+            (not relevant.isdisjoint(locations[i]) for i in rows), bool, len(rows)
+        )
 
 
-def only_from_locations(
-    json: dict, relevant_locations: list[str], strict: bool
-) -> bool:
-    if locations := json[GroupInfoKeys.LOCATIONS]:
-        for location in locations:
-            if location in relevant_locations:
-                return True
-    return not strict
+class DescriptionCheck(Check):
+    cost = 3
 
+    def __init__(self, substring: str, should_include: bool):
+        self.substring = substring
+        self.should_include = should_include
 
-def key_within_range(json: dict, key: GroupInfoKeys, value_range: (object, object)):
-    return value_range[0] < json[key] < value_range[1]
+    def __call__(self, json: dict) -> bool:
+        return (
+            self.substring in json[GroupInfoKeys.DESCRIPTION]
+        ) == self.should_include
 
+    def batch(self, columns: ResultColumns, rows: np.ndarray) -> np.ndarray:
+        description = columns.description
+        substring = self.substring
+        included = np.fromiter(
+            (substring in (description[i] or "") for i in rows), bool, len(rows)
+        )
+        return included if self.should_include else ~included
 
-def check_substring_existence(json, substring, should_include):
-    if should_include:
-        return substring in json[GroupInfoKeys.DESCRIPTION]
-    return substring not in json[GroupInfoKeys.DESCRIPTION]
 
+def get_date_range(item: dict) -> tuple[datetime, datetime]:
+    max_val = item.get(MAX)
+    max_val = datetime.fromisoformat(max_val) if max_val else datetime.today()
+    min_val = datetime.fromisoformat(item.get(MIN) or FB_LAUNCH_DATE)
+    return min_val, max_val
 
-def match_item_func(item):
+
+def match_item_func(item) -> Check | None:
+    """Returns the check of a filter item, or None if it never filters a group"""
     match item["info_key"]:
         case GroupInfoKeys.LOCATIONS.value:
-            relevant_locations = item.get("relevant_locations", None)
-            strict = item.get("strict", False)
-            return partial(
-                only_from_locations,
-                relevant_locations=relevant_locations,
-                strict=strict,
-            )
+            # a group whose locations don't match only fails in strict mode
+            if not item.get("strict", False):
+                return None
+            return LocationsCheck(item.get("relevant_locations", None))
         case GroupInfoKeys.MEMBERS.value:
-            max_val = item.get(MAX, 3e9)
-            min_val = item.get(MIN, 0)
-            return partial(
-                key_within_range,
-                value_range=[min_val, max_val],
-                key=GroupInfoKeys.MEMBERS,
+            return RangeCheck(
+                GroupInfoKeys.MEMBERS, item.get(MIN, 0), item.get(MAX, MAX_MEMBERS)
             )
         case GroupInfoKeys.CREATION_DATE.value:
-            if max_val := item.get(MAX):
-                max_val = datetime.fromisoformat(max_val)
-            else:
-                max_val = datetime.today()
-            if min_val := item.get(MIN):
-                min_val = datetime.fromisoformat(min_val)
-            else:
-                min_val = datetime.fromisoformat(FB_LAUNCH_DATE)
-            return partial(
-                key_within_range,
-                value_range=[min_val, max_val],
-                key=GroupInfoKeys.CREATION_DATE,
-            )
+            return RangeCheck(GroupInfoKeys.CREATION_DATE, *get_date_range(item))
         case GroupInfoKeys.DESCRIPTION:
             substring = item.get("value")
             if substring is None:
                 raise ValueError("a description filter without value is not allowed")
-            should_include = item.get("should_include", True)
-            return partial(
-                check_substring_existence,
-                substring=substring,
-                should_include=should_include,
-            )
+            return DescriptionCheck(substring, item.get("should_include", True))
         case _:
-            raise NotImplemented(f"filter not implemented for {item['info_key']}")
+            raise NotImplementedError(f"filter not implemented for {item['info_key']}")
+
+
+def compile_checks(filter_json: list[dict]) -> tuple[Check, ...]:
+    checks = [PublicCheck()] + [match_item_func(item) for item in filter_json]
+    return tuple(sorted((x for x in checks if x is not None), key=lambda x: x.cost))
 
 
 def filter_json_2_filter_function(filter_json: list[dict]) -> Callable[[dict], bool]:
-    func_list = [check_if_public] + [match_item_func(item) for item in filter_json]
-    return partial(check_all, func_list=func_list)
+    checks = compile_checks(filter_json)
 
+    def filter_func(json: dict) -> bool:
+        for check in checks:
+            if not check(json):
+                return False
+        return True
 
-def get_filter_func(group_filter_loc: str | None) -> Callable[[dict], bool]:
+    return filter_func
+
+
+def filter_json_2_batch_filter_function(
+    filter_json: list[dict],
+) -> Callable[[ResultColumns], np.ndarray]:
+    """
+    Like filter_json_2_filter_function, for ResultColumns. Returns a boolean
+    mask of the rows that pass. Every check only looks at the rows that passed
+    the cheaper checks before it.
+    """
+    checks = compile_checks(filter_json)
+
+    def batch_filter_func(columns: ResultColumns) -> np.ndarray:
+        mask = np.zeros(len(columns), bool)
+        rows = np.arange(len(columns))
+        for check in checks:
+            if len(rows) == 0:
+                break
+            rows = rows[check.batch(columns, rows)]
+        mask[rows] = True
+        return mask
+
+    return batch_filter_func
+
+
+def load_filter_json(group_filter_loc: str | None) -> list[dict]:
     if group_filter_loc is None:
-        return check_if_public
+        return []
     path = Path(group_filter_loc)
     if not path.exists():
         raise RuntimeError("could not find filter json")
     with open(group_filter_loc, "r") as f:
-        filter_json = loads(f.read())
-    return filter_json_2_filter_function(filter_json)
+        return loads(f.read())
+
+
+def get_filter_func(group_filter_loc: str | None) -> Callable[[dict], bool]:
+    if group_filter_loc is None:
+        return check_if_public
+    return filter_json_2_filter_function(load_filter_json(group_filter_loc))
+
+
+def get_batch_filter_func(
+    group_filter_loc: str | None,
+) -> Callable[[ResultColumns], np.ndarray]:
+    return filter_json_2_batch_filter_function(load_filter_json(group_filter_loc))
@@ -0,0 +1,171 @@
+import csv
+import gzip
+from hashlib import blake2b
+from logging import getLogger
+from math import ceil, log
+from os import SEEK_END
+from pathlib import Path
+from typing import Iterable, Iterator, TextIO
+
+from enums import DedupeMode
+from normalization import CATEGORY, FB_GROUP_PREFIX, FB_GROUP_REGEX
+
+LOGGER = getLogger("ingest")
+GZIP_MAGIC = b"\x1f\x8b"
+CSV_SUFFIX = ".csv"
+READ_BUFFER_SIZE = 2**20
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 1e-4
+# a lower bound of the bytes a link takes in an input, to size the Bloom filter
+MIN_LINK_BYTES = 32
+# gzip keeps the uncompressed size modulo 4 GB, text compresses at least as well
+MIN_GZIP_RATIO = 4
+
+
+def hash_name(name: str, digest_size: int = 8) -> int:
+    return int.from_bytes(blake2b(name.encode(), digest_size=digest_size).digest())
+
+
+class HashSet:
+    """Remembers 64 bit hashes of the names instead of the names themselves"""
+
+    def __init__(self):
+        self._hashes: set[int] = set()
+
+    def add(self, name: str) -> bool:
+        """Adds name and returns True if it wasn't seen before"""
+        h = hash_name(name)
+        if h in self._hashes:
+            return False
+        self._hashes.add(h)
+        return True
+
+
+class BloomFilter:
+    """
+    A fixed size set that may wrongly report an unseen name as seen, with
+    probability error_rate while it holds up to capacity names
+    """
+
+    def __init__(
+        self, capacity: int = BLOOM_CAPACITY, error_rate: float = BLOOM_ERROR_RATE
+    ):
+        self.n_bits = ceil(-capacity * log(error_rate) / log(2) ** 2)
+        self.n_hashes = max(1, round(self.n_bits / capacity * log(2)))
+        self._bits = bytearray(ceil(self.n_bits / 8))
+
+    def _iter_bits(self, name: str) -> Iterator[tuple[int, int]]:
+        h = hash_name(name, 16)
+        h1, h2 = h >> 64, h & (2**64 - 1)
+        for i in range(self.n_hashes):
+            bit = (h1 + i * h2) % self.n_bits
+            yield bit >> 3, 1 << (bit & 7)
+
+    def __contains__(self, name: str) -> bool:
+        return all(self._bits[byte] & mask for byte, mask in self._iter_bits(name))
+
+    def add(self, name: str) -> bool:
+        """Adds name and returns True if it wasn't seen before"""
+        is_new = False
+        for byte, mask in self._iter_bits(name):
+            if not self._bits[byte] & mask:
+                self._bits[byte] |= mask
+                is_new = True
+        return is_new
+
+
+def open_input(path: Path) -> TextIO:
+    with open(path, "rb") as f:
+        is_gzip = f.read(2) == GZIP_MAGIC
+    if is_gzip:
+        return gzip.open(path, "rt", newline="")
+    return open(path, "r", buffering=READ_BUFFER_SIZE, newline="")
+
+
+def estimate_n_links(path: Path) -> int:
+    """An upper bound of the amount of links in an input file, from its size"""
+    size = path.stat().st_size
+    with open(path, "rb") as f:
+        if f.read(2) == GZIP_MAGIC:
+            f.seek(-4, SEEK_END)
+            size = max(int.from_bytes(f.read(4), "little"), size * MIN_GZIP_RATIO)
+    return size // MIN_LINK_BYTES
+
+
+def is_csv(path: Path) -> bool:
+    suffixes = path.suffixes
+    return CSV_SUFFIX in suffixes[-2:]
+
+
+def iter_tokens(path: Path) -> Iterator[str]:
+    """Yields the words of a plain text input, or the cells of a csv input"""
+    with open_input(path) as f:
+        if is_csv(path):
+            for row in csv.reader(f):
+                yield from row
+        else:
+            for line in f:
+                yield from line.split()
+
+
+def normalize_link(token: str) -> tuple[str, str] | None:
+    """Returns the group's normalized link and name, like fix_link"""
+    match = FB_GROUP_REGEX.search(token)
+    if match is None:
+        return None
+    name = match.group("name")
+    if not name or name == CATEGORY:
+        return None
+    return FB_GROUP_PREFIX + name + "/", name
+
+
+def iter_input_items(
+    input_path: str,
+    results_path: Path,
+    dedupe: DedupeMode = DedupeMode.EXACT,
+) -> Iterator[dict]:
+    """
+    Streams the items of an input file (plain, csv, optionally gzipped), or
+    of a single link when input_path isn't a file. Every link is normalized
+    once and every group is yielded once. The Bloom filter is sized from the
+    input file's size.
+    """
+    path = Path(input_path)
+    if path.is_file():
+        tokens = iter_tokens(path)
+        capacity = max(BLOOM_CAPACITY, estimate_n_links(path))
+    else:
+        LOGGER.warning("path was not found locally, treating it like a webpage path")
+        tokens = [input_path]
+        capacity = BLOOM_CAPACITY
+    seen = BloomFilter(capacity) if dedupe == DedupeMode.BLOOM else HashSet()
+    n_invalid = n_duplicates = n_items = 0
+    for token in tokens:
+        normalized = normalize_link(token)
+        if normalized is None:
+            n_invalid += 1
+            continue
+        link, name = normalized
+        if not seen.add(name):
+            n_duplicates += 1
+            continue
+        n_items += 1
+        yield {"link": link, "local_path": results_path / (name + ".json")}
+    LOGGER.info(
+        f"read {n_items} groups, ignored {n_duplicates} duplicates"
+        f" and {n_invalid} words that aren't group links"
+    )
+
+
+def skip_existing(items: Iterable[dict], override: bool, is_saved) -> Iterator[dict]:
+    """Skips the items that is_saved reports, unless override is set"""
+    n_existing = 0
+    for item in items:
+        if is_saved(item):
+            n_existing += 1
+            if not override:
+                continue
+        yield item
+    if n_existing > 0:
+        action = "overriding" if override else "ignoring"
+        LOGGER.info(f"{action} {n_existing} items")
@@ -1,27 +1,50 @@
-from datetime import date, datetime
-from json import dumps, load
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from json import load
 from logging import getLogger
 from os import mkdir
 from pathlib import Path
-from time import sleep
+from typing import Callable, Iterable, Iterator
 
+import numpy as np
 import typer
 from tqdm import tqdm
 
+from enums import CacheMode, DedupeMode, JobState, SinkMode, Stage, Timing
+from export import export_dir, read_result_columns
 from fb_scrape_lib import *
-from group_filter import get_filter_func
+from fb_scrape_lib.admin_cache import close_admin_cache, configure_admin_cache
+from fb_scrape_lib.browser_pool import MAX_NAVIGATIONS_PER_CONTEXT, MB
+from fb_scrape_lib.dates import get_date_parser_stats
+from fb_scrape_lib.html_cache import (
+    MAX_BYTES,
+    TTL_SECONDS,
+    close_html_cache,
+    configure_html_cache,
+)
+from fb_scrape_lib.metrics import close_metrics, configure_metrics, get_metrics
+from fb_scrape_lib.parse_pool import close_parse_pool, configure_parse_pool
+from fb_scrape_lib.parser_backend import DEFAULT_PARSER_BACKEND, set_parser_backend
+from fb_scrape_lib.rate_limiter import (
+    INITIAL_RATE,
+    MAX_RATE,
+    BlockedError,
+    configure_rate_limiter,
+    get_rate_limiter,
+)
+from fb_scrape_lib.resource_policy import ResourcePolicy
+from group_filter import get_batch_filter_func, get_filter_func
+from ingest import iter_input_items, skip_existing
 from normalization import *
+from replay import get_group_dirs, replay_dir
+from result_sink import ResultSink, get_result_sink, write_json_atomic
+from run_journal import JOURNAL_NAME, RunJournal, report_interrupted
+from work_queue import BATCH_SIZE, LEASE_SECONDS, WorkQueue
 
 LOGGER = getLogger("main_logger")
-SLEEP_TIME_MS = 2
-
-
-def json_serial(obj):
-    """JSON serializer for objects not serializable by default json code"""
-
-    if isinstance(obj, (datetime, date)):
-        return obj.strftime("%d/%m/%Y")
-    raise TypeError("Type %s not serializable" % type(obj))
+HOUR = 60 * 60
+REPLAY_MEMO_NAME = ".replay_memo.json"
 
 
 def load_json(path: Path):
@@ -30,82 +53,419 @@ def load_json(path: Path):
 
 
 def save_json(path: Path, json: dict):
-    with open(path, "w") as f:
-        s = dumps(json, indent=4, default=json_serial)
-        f.write(s)
+    write_json_atomic(path, json)
+    return json
+
+
+def item_to_basic_info_json(link: str, local_path: Path) -> dict:
+    json = get_info_from_about(link)
+    json[GroupInfoKeys.NAME] = get_group_name(link)
+    json[GroupInfoKeys.LINK] = link
     return json
 
 
-def item_to_basic_info_json(link: str, local_path: Path, sleep_time: int) -> dict:
-    json = get_info_from_about(link, sleep_time)
+def item_to_advance_info_json(json: dict):
+    json |= get_advanced_json(json[GroupInfoKeys.LINK], json[GroupInfoKeys.ADMINS])
+
+
+def scrape_item(
+    item: dict,
+    group_filter_func: Callable,
+    advance_scrape: bool,
+    sink: ResultSink,
+    journal: RunJournal,
+):
+    link = item["link"]
+    metrics = get_metrics()
+    with metrics.group(link):
+        json = journal.get_resume_record(link)
+        if json is None:
+            with journal.stage(link, Stage.BASIC):
+                json = item_to_basic_info_json(**item)
+            with metrics.timer(Timing.FILTER):
+                advance_scrape = advance_scrape and group_filter_func(json)
+        if advance_scrape:
+            with journal.stage(link, Stage.ADVANCED, resume_record=json):
+                item_to_advance_info_json(json)
+        # journaled as done by record_saved, once the sink wrote it
+        with journal.stage(link, Stage.SAVE, done=False), metrics.timer(Timing.SAVE):
+            sink.write(item, json)
+
+
+def scrape_queued_item(
+    queue: WorkQueue,
+    item: dict,
+    group_filter_func: Callable,
+    advance_scrape: bool,
+    sink: ResultSink,
+    journal: RunJournal,
+):
+    try:
+        scrape_item(item, group_filter_func, advance_scrape, sink, journal)
+    except Exception as e:
+        LOGGER.exception(f"failed scraping {item['link']}")
+        queue.fail(item["link"], repr(e))
+
+
+def record_saved(sink: ResultSink, journal: RunJournal, queue: WorkQueue | None):
+    """
+    Journals the groups the sink has written to its output as saved, and
+    completes their jobs
+    """
+    for item in sink.pop_saved():
+        journal.record(item["link"], Stage.SAVE, JobState.DONE)
+        if queue is not None:
+            queue.complete(item["link"])
+
+
+def scrape_items(
+    items: Iterable[dict],
+    total: int | None,
+    group_filter_func: Callable,
+    advance_scrape: bool,
+    sink: ResultSink,
+    journal: RunJournal,
+    queue: WorkQueue | None = None,
+):
+    try:
+        for item in tqdm(items, total=total):
+            if queue is None:
+                try:
+                    scrape_item(item, group_filter_func, advance_scrape, sink, journal)
+                except BlockedError:
+                    # journaled as failed, so the next run retries it
+                    LOGGER.warning(f"skipping the blocked group {item['link']}")
+            else:
+                scrape_queued_item(
+                    queue,
+                    item,
+                    group_filter_func,
+                    advance_scrape,
+                    sink,
+                    journal,
+                )
+            record_saved(sink, journal, queue)
+    finally:
+        close_browser_pool()
+
+
+async def write_result_async(
+    writer: ThreadPoolExecutor, sink: ResultSink, item: dict, json: dict
+):
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(writer, sink.write, item, json)
+
+
+async def item_to_basic_info_json_async(link: str, local_path: Path) -> dict:
+    json = await get_info_from_about_async(link)
     json[GroupInfoKeys.NAME] = get_group_name(link)
     json[GroupInfoKeys.LINK] = link
-    save_json(local_path, json)
     return json
 
 
-def item_to_advance_info_json(local_path: Path, json: dict, sleep_tine: int):
-    json |= get_advanced_json(
-        json[GroupInfoKeys.LINK], sleep_tine, json[GroupInfoKeys.ADMINS]
+async def item_to_advance_info_json_async(json: dict):
+    json |= await get_advanced_json_async(
+        json[GroupInfoKeys.LINK], json[GroupInfoKeys.ADMINS]
     )
-    save_json(local_path, json)
 
 
-def get_inputs_list(input_path: str) -> list[str]:
-    if Path(input_path).exists:
-        with open(input_path, "r") as f:
-            return f.read().split()
-    LOGGER.warning("path was not found locally, treating it like a webpage path")
-    return [input_path]
+async def scrape_item_async(
+    item: dict,
+    group_filter_func: Callable,
+    advance_scrape: bool,
+    sink: ResultSink,
+    journal: RunJournal,
+    writer: ThreadPoolExecutor,
+):
+    link = item["link"]
+    metrics = get_metrics()
+    with metrics.group(link):
+        json = journal.get_resume_record(link)
+        if json is None:
+            with journal.stage(link, Stage.BASIC):
+                json = await item_to_basic_info_json_async(**item)
+            with metrics.timer(Timing.FILTER):
+                advance_scrape = advance_scrape and group_filter_func(json)
+        if advance_scrape:
+            with journal.stage(link, Stage.ADVANCED, resume_record=json):
+                await item_to_advance_info_json_async(json)
+        # journaled as done by record_saved, once the sink wrote it
+        with journal.stage(link, Stage.SAVE, done=False), metrics.timer(Timing.SAVE):
+            await write_result_async(writer, sink, item, json)
 
 
-def get_proper_input_list(lst: list[str], results_path: Path) -> list[dict]:
-    links_lst = [fix_link(x) for x in lst]
-    return [
-        {"link": x, "local_path": results_path / (get_group_name(x) + ".json")}
-        for x in links_lst
-        if x
-    ]
+async def scrape_queued_item_async(
+    queue: WorkQueue,
+    item: dict,
+    group_filter_func: Callable,
+    advance_scrape: bool,
+    sink: ResultSink,
+    journal: RunJournal,
+    writer: ThreadPoolExecutor,
+):
+    try:
+        await scrape_item_async(
+            item, group_filter_func, advance_scrape, sink, journal, writer
+        )
+    except Exception as e:
+        LOGGER.exception(f"failed scraping {item['link']}")
+        queue.fail(item["link"], repr(e))
 
 
-def handle_override_for_list(items: list[dict], override: bool) -> list[dict]:
-    existing_files = [x for x in items if x["local_path"].exists()]
-    n_existing = len(existing_files)
-    if n_existing > 0:
-        if override:
-            LOGGER.info(f"overriding {n_existing} files")
-        else:
-            items = [x for x in items if not x["local_path"].exists()]
-            LOGGER.info(f"ignoring {n_existing} items")
-    return items
+async def scrape_items_async(
+    items: Iterable[dict],
+    total: int | None,
+    group_filter_func: Callable,
+    advance_scrape: bool,
+    concurrency: int,
+    max_inflight_navigations: int,
+    sink: ResultSink,
+    journal: RunJournal,
+    queue: WorkQueue | None = None,
+):
+    """
+    Runs `concurrency` workers that share one iterator over the items. The
+    results are written one at a time on a thread of their own, so serializing
+    a group never blocks the event loop the browser is driven by.
+    """
+    await get_async_browser_pool().start(max_inflight_navigations)
+    items_iter = iter(items)
+    progress = tqdm(total=total)
+    writer = ThreadPoolExecutor(1, thread_name_prefix="result_writer")
+
+    async def worker():
+        for item in items_iter:
+            if queue is None:
+                try:
+                    await scrape_item_async(
+                        item, group_filter_func, advance_scrape, sink, journal, writer
+                    )
+                except BlockedError:
+                    LOGGER.warning(f"skipping the blocked group {item['link']}")
+                except TimeoutError as e:
+                    # journaled as failed, so the next run retries it
+                    LOGGER.warning(f"skipping the group {item['link']}: {e}")
+            else:
+                await scrape_queued_item_async(
+                    queue,
+                    item,
+                    group_filter_func,
+                    advance_scrape,
+                    sink,
+                    journal,
+                    writer,
+                )
+            record_saved(sink, journal, queue)
+            progress.update()
+
+    workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        # the pool is closed under the pages of workers that are still running
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # waits for the last write, before the sink is closed
+        writer.shutdown()
+        progress.close()
+        await close_async_browser_pool()
+
+
+def handle_override_for_list(
+    items: Iterable[dict],
+    override: bool,
+    sink: ResultSink,
+    journal: RunJournal,
+) -> Iterator[dict]:
+    """
+    Skips the groups that were already saved. The journal answers this
+    without touching the output, which is only checked for the groups the
+    journal never tried to save (e.g. written before the journal existed).
+    """
+
+    def is_saved(item: dict) -> bool:
+        state = journal.get_state(item["link"], Stage.SAVE)
+        if state is None:
+            return sink.exists(item)
+        return state == JobState.DONE
+
+    return skip_existing(items, override, is_saved)
+
+
+app = typer.Typer()
 
 
+@app.command("scrape")
 def main(
     dest_dir: str,
     input_path: str,
-    sleep_time: Optional[int] = typer.Option(SLEEP_TIME_MS),
+    requests_per_second: float = typer.Option(INITIAL_RATE),
+    max_requests_per_second: float = typer.Option(MAX_RATE),
     group_filter_loc: Optional[str] = typer.Option(None),
     override: bool = False,
     advance_scrape: bool = True,
+    max_navigations_per_context: int = typer.Option(MAX_NAVIGATIONS_PER_CONTEXT),
+    concurrency: int = typer.Option(1),
+    parse_workers: int = typer.Option(0),
+    max_inflight_navigations: Optional[int] = typer.Option(None),
+    queue_db: Optional[str] = typer.Option(None),
+    queue_batch_size: int = typer.Option(BATCH_SIZE),
+    lease_seconds: int = typer.Option(LEASE_SECONDS),
+    cache_dir: Optional[str] = typer.Option(None),
+    cache_mode: CacheMode = typer.Option(CacheMode.READ_WRITE),
+    cache_ttl_hours: float = typer.Option(TTL_SECONDS / HOUR),
+    cache_max_mb: int = typer.Option(MAX_BYTES // MB),
+    admin_cache_db: Optional[str] = typer.Option(None),
+    admin_cache_ttl_hours: float = typer.Option(TTL_SECONDS / HOUR),
+    parser_backend: str = typer.Option(DEFAULT_PARSER_BACKEND),
+    block_resources: bool = True,
+    output_format: SinkMode = typer.Option(SinkMode.JSON),
+    dedupe: DedupeMode = typer.Option(DedupeMode.EXACT),
+    metrics_prometheus: Optional[str] = typer.Option(None),
+    metrics_jsonl: Optional[str] = typer.Option(None),
 ):
     group_filter_func = get_filter_func(group_filter_loc)
+    set_parser_backend(parser_backend)
+    resource_policy = ResourcePolicy() if block_resources else None
     results_path = Path(dest_dir)
     if not results_path.exists():
         LOGGER.info(f"the directory {dest_dir} doesn't exists. creating it")
         mkdir(results_path)
-    lst = get_inputs_list(input_path)
-    if len(lst) > 0:
-        items = get_proper_input_list(lst, results_path)
-        LOGGER.debug(f"found {len(items)} good links")
-        items = handle_override_for_list(items, override)
-        for item in tqdm(items):
-            json = item_to_basic_info_json(**item, sleep_time=sleep_time)
-            if advance_scrape and group_filter_func(json):
-                sleep(sleep_time)
-                item_to_advance_info_json(item["local_path"], json, sleep_time)
+    items = iter_input_items(input_path, results_path, dedupe)
+    first_item = next(items, None)
+    if first_item is not None:
+        items = chain([first_item], items)
+        sink = get_result_sink(output_format, results_path)
+        journal = RunJournal(results_path / JOURNAL_NAME)
+        report_interrupted(journal)
+        items = handle_override_for_list(items, override, sink, journal)
+        queue = None
+        if queue_db:
+            queue = WorkQueue(queue_db, lease_seconds=lease_seconds)
+            LOGGER.info(f"added {queue.add(items)} new jobs to {queue_db}")
+            total = queue.counts()[JobState.PENDING]
+            items = queue.iter_items(queue_batch_size)
+        else:
+            # unknown until the input is read, which is streamed while scraping
+            total = None
+        configure_html_cache(
+            cache_dir, cache_mode, cache_ttl_hours * HOUR, cache_max_mb * MB
+        )
+        configure_admin_cache(admin_cache_db, admin_cache_ttl_hours * HOUR)
+        configure_metrics(metrics_prometheus, metrics_jsonl)
+        if parse_workers > 0:
+            configure_parse_pool(parse_workers, parser_backend)
+        configure_rate_limiter(
+            initial_rate=requests_per_second, max_rate=max_requests_per_second
+        )
+        try:
+            if concurrency > 1 or parse_workers > 0:
+                get_async_browser_pool().max_navigations = max_navigations_per_context
+                get_async_browser_pool().resource_policy = resource_policy
+                coroutine = scrape_items_async(
+                    items,
+                    total,
+                    group_filter_func,
+                    advance_scrape,
+                    concurrency,
+                    max_inflight_navigations or concurrency,
+                    sink,
+                    journal,
+                    queue,
+                )
+                asyncio.run(coroutine)
+            else:
+                get_browser_pool().max_navigations = max_navigations_per_context
+                get_browser_pool().resource_policy = resource_policy
+                scrape_items(
+                    items,
+                    total,
+                    group_filter_func,
+                    advance_scrape,
+                    sink,
+                    journal,
+                    queue,
+                )
+        finally:
+            sink.close()
+            record_saved(sink, journal, queue)
+            LOGGER.info(f"journal state: {journal.summary()}")
+            journal.close()
+            close_html_cache()
+            close_admin_cache()
+            close_parse_pool()
+            LOGGER.info(f"date parser stats: {get_date_parser_stats()}")
+            LOGGER.info(f"rate limiter stats: {get_rate_limiter().stats()}")
+            close_metrics()
+            if queue is not None:
+                LOGGER.info(f"queue state: {queue.counts()}")
+                queue.close()
     else:
         LOGGER.info("no input found")
 
 
+@app.command()
+def replay(
+    dest_dir: str,
+    html_dir: str,
+    max_workers: Optional[int] = typer.Option(None),
+    parser_backend: str = typer.Option(DEFAULT_PARSER_BACKEND),
+):
+    """
+    Re-runs the extractors over saved pages without a browser. html_dir should
+    hold a directory per group with about.html and optionally hashtags.html,
+    announcements.html and admins/<admin id>.html
+    """
+    results_path = Path(dest_dir)
+    results_path.mkdir(parents=True, exist_ok=True)
+    memo_path = results_path / REPLAY_MEMO_NAME
+    memo = load_json(memo_path) if memo_path.exists() else {}
+    memo = {k: v for k, v in memo.items() if (results_path / f"{k}.json").exists()}
+    group_dirs = get_group_dirs(Path(html_dir))
+    n_skipped = 0
+    try:
+        for name, digest, json in tqdm(
+            replay_dir(group_dirs, memo, max_workers, parser_backend),
+            total=len(group_dirs),
+        ):
+            if json is None:
+                n_skipped += 1
+                continue
+            save_json(results_path / f"{name}.json", json)
+            memo[name] = digest
+    finally:
+        save_json(memo_path, memo)
+    LOGGER.info(f"skipped {n_skipped} unchanged groups")
+
+
+@app.command()
+def export(dest_dir: str, db_path: str):
+    """
+    Exports the groups in dest_dir (json files and results.jsonl) to a SQLite
+    database. Only new or changed groups are written.
+    """
+    counts = export_dir(Path(dest_dir), db_path)
+    LOGGER.info(f"exported groups: {dict(counts)}")
+
+
+@app.command("filter")
+def filter_groups(
+    db_path: str,
+    output_path: str,
+    group_filter_loc: Optional[str] = typer.Option(None),
+):
+    """
+    Applies a group filter to the groups of an export database and writes the
+    links that pass it to output_path, one per line, as input for scrape
+    """
+    columns = read_result_columns(db_path)
+    mask = get_batch_filter_func(group_filter_loc)(columns)
+    links = [columns.links[i] for i in np.flatnonzero(mask)]
+    with open(output_path, "w") as f:
+        f.write("".join(f"{link}\n" for link in links))
+    LOGGER.info(f"{len(links)} of {len(columns)} groups passed the filter")
+
+
 if __name__ == "__main__":
-    typer.run(main)
+    app()
@@ -1,9 +1,16 @@
 import re
+from os import environ
 from typing import Optional
 
-FB_PREFIX = "https://www.facebook.com/"
+DEFAULT_FB_PREFIX = "https://www.facebook.com/"
+# points the scraper at another server, e.g. benchmarks/fake_facebook.py
+BASE_URL_ENV = "FB_SCRAPER_BASE_URL"
+FB_PREFIX = environ.get(BASE_URL_ENV, DEFAULT_FB_PREFIX).rstrip("/") + "/"
 FB_GROUP_PREFIX = f"{FB_PREFIX}groups/"
-FB_GROUP_REGEX = re.compile(r"(https?://)?(www)?facebook.com/groups/(?P<name>[^/)]*)/?")
+FB_GROUP_REGEX = re.compile(
+    rf"((https?://)?(www)?facebook.com/groups/|{re.escape(FB_GROUP_PREFIX)})"
+    r"(?P<name>[^/)]*)/?"
+)
 CATEGORY = "category"
 
 
@@ -0,0 +1,111 @@
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+from os import cpu_count
+from pathlib import Path
+from typing import Iterator
+
+from enums import GroupInfoKeys, Sections
+from fb_scrape_lib.advanced_scrape import (
+    get_admin_link,
+    parse_admin,
+    parse_featured,
+    parse_topics,
+)
+from fb_scrape_lib.mutual import EXTRACTOR_VERSION, AdminInfo
+from fb_scrape_lib.parser_backend import DEFAULT_PARSER_BACKEND, set_parser_backend
+from fb_scrape_lib.scrape_about import parse_about
+from normalization import FB_GROUP_PREFIX
+
+HTML_SUFFIX = ".html"
+ADMINS_DIR = "admins"
+CHUNK_SIZE = 8
+
+
+def get_section_path(group_dir: Path, section: Sections) -> Path:
+    return group_dir / (section.value + HTML_SUFFIX)
+
+
+def get_group_files(group_dir: Path) -> list[Path]:
+    files = [
+        get_section_path(group_dir, section)
+        for section in (Sections.ABOUT, Sections.TOPICS, Sections.FEATURED)
+    ]
+    files += sorted((group_dir / ADMINS_DIR).glob("*" + HTML_SUFFIX))
+    return [x for x in files if x.exists()]
+
+
+def get_group_digest(group_dir: Path, files: list[Path]) -> str:
+    """Hash of the extractor version and the name and content of every input file"""
+    h = sha256(str(EXTRACTOR_VERSION).encode())
+    for path in files:
+        h.update(str(path.relative_to(group_dir)).encode())
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def read_html(path: Path) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def replay_admins(group_dir: Path, admins: list[dict]) -> list[dict]:
+    res = []
+    for admin in admins:
+        path = group_dir / ADMINS_DIR / (admin[AdminInfo.ID] + HTML_SUFFIX)
+        if path.exists():
+            admin = admin | parse_admin(read_html(path))
+        res.append(admin)
+    return res
+
+
+def replay_group(group_dir: Path) -> dict:
+    link = FB_GROUP_PREFIX + group_dir.name + "/"
+    json = parse_about(read_html(get_section_path(group_dir, Sections.ABOUT)))
+    json[GroupInfoKeys.NAME] = group_dir.name
+    json[GroupInfoKeys.LINK] = link
+    if (path := get_section_path(group_dir, Sections.TOPICS)).exists():
+        json[GroupInfoKeys.TOPICS] = parse_topics(read_html(path))
+    if (path := get_section_path(group_dir, Sections.FEATURED)).exists():
+        json[GroupInfoKeys.FEATURED] = parse_featured(read_html(path))
+    if (group_dir / ADMINS_DIR).exists() and json.get(GroupInfoKeys.ADMINS):
+        json[GroupInfoKeys.ADMINS] = replay_admins(
+            group_dir, json[GroupInfoKeys.ADMINS]
+        )
+    return json
+
+
+def replay_task(task: tuple[Path, str | None]) -> tuple[str, str, dict | None]:
+    """
+    Returns the group's name, its input digest and its parsed json. The json is
+    None when the digest equals the memoized one, as the result can't change.
+    """
+    group_dir, memoized_digest = task
+    digest = get_group_digest(group_dir, get_group_files(group_dir))
+    if digest == memoized_digest:
+        return group_dir.name, digest, None
+    return group_dir.name, digest, replay_group(group_dir)
+
+
+def get_group_dirs(html_dir: Path) -> list[Path]:
+    return sorted(
+        x for x in html_dir.iterdir() if get_section_path(x, Sections.ABOUT).exists()
+    )
+
+
+def replay_dir(
+    group_dirs: list[Path],
+    memo: dict[str, str],
+    max_workers: int | None = None,
+    parser_backend: str = DEFAULT_PARSER_BACKEND,
+) -> Iterator[tuple[str, str, dict | None]]:
+    """
+    Runs the extractors over every group directory in a process pool.
+    See replay_task for the yielded values.
+    """
+    tasks = [(x, memo.get(x.name)) for x in group_dirs]
+    with ProcessPoolExecutor(
+        max_workers=max_workers or cpu_count(),
+        initializer=set_parser_backend,
+        initargs=(parser_backend,),
+    ) as executor:
+        yield from executor.map(replay_task, tasks, chunksize=CHUNK_SIZE)
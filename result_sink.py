@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import date, datetime
+from json import dumps, loads
+from logging import getLogger
+from os import SEEK_END, getpid, replace
+from pathlib import Path
+
+from enums import GroupInfoKeys, SinkMode
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LOGGER = getLogger("result_sink")
+JSONL_NAME = "results.jsonl"
+FLUSH_EVERY = 100
+DATE_FORMAT = "%d/%m/%Y"
+
+
+def json_serial(obj):
+    """JSON serializer for objects not serializable by default json code"""
+
+    if isinstance(obj, (datetime, date)):
+        return obj.strftime(DATE_FORMAT)
+    raise TypeError("Type %s not serializable" % type(obj))
+
+
+if orjson is not None:
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def dumps_line(json: dict) -> str:
+        return orjson.dumps(json, default=json_serial, option=ORJSON_OPTIONS).decode()
+
+else:
+
+    def dumps_line(json: dict) -> str:
+        # without indent the json module uses its C encoder
+        return dumps(json, default=json_serial, ensure_ascii=False)
+
+
+def write_json_atomic(path: Path, json: dict):
+    """Writes an indented json file through a temp file, so it's never partial"""
+    tmp_path = path.with_name(f".{path.name}.{getpid()}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(dumps(json, indent=4, default=json_serial))
+        replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def ends_with_newline(path: Path) -> bool:
+    with open(path, "rb") as f:
+        if f.seek(0, SEEK_END) == 0:
+            return True
+        f.seek(-1, SEEK_END)
+        return f.read(1) == b"\n"
+
+
+class ResultSink(ABC):
+    """
+    Where the json of every scraped group is written, once per group. A write
+    may be buffered, the items whose json already reached the output are
+    handed out by pop_saved.
+    """
+
+    def __init__(self):
+        # appended to by the thread that writes, popped by the one that records
+        self._saved: deque[dict] = deque()
+
+    @abstractmethod
+    def write(self, item: dict, json: dict):
+        ...
+
+    @abstractmethod
+    def exists(self, item: dict) -> bool:
+        ...
+
+    def pop_saved(self) -> list[dict]:
+        """The items written to the output since the last call"""
+        res = []
+        while self._saved:
+            res.append(self._saved.popleft())
+        return res
+
+    def close(self):
+        pass
+
+
+class JsonFileSink(ResultSink):
+    """A json file per group, at the item's local_path"""
+
+    def write(self, item: dict, json: dict):
+        write_json_atomic(item["local_path"], json)
+        self._saved.append(item)
+
+    def exists(self, item: dict) -> bool:
+        return item["local_path"].exists()
+
+
+class JsonlSink(ResultSink):
+    """
+    One json line per group appended to a single file. Lines are buffered and
+    written every flush_every groups, a group is only saved once its line is
+    flushed. When a group appears more than once, its last line wins.
+    """
+
+    def __init__(self, path: str | Path, flush_every: int = FLUSH_EVERY):
+        super().__init__()
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self._buffer: list[str] = []
+        self._buffered_items: list[dict] = []
+        self._links: set[str] | None = None
+        self._file = open(self.path, "a", encoding="utf-8")
+        if not ends_with_newline(self.path):
+            # the previous run crashed in the middle of a line
+            self._file.write("\n")
+
+    def write(self, item: dict, json: dict):
+        self._buffer.append(dumps_line(json) + "\n")
+        self._buffered_items.append(item)
+        if self._links is not None:
+            self._links.add(item["link"])
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("".join(self._buffer))
+            self._file.flush()
+            self._buffer = []
+            self._saved.extend(self._buffered_items)
+            self._buffered_items = []
+
+    def _load_links(self) -> set[str]:
+        links = set()
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    links.add(loads(line)[GroupInfoKeys.LINK])
+                except (ValueError, KeyError):
+                    LOGGER.warning(f"ignoring a truncated line in {self.path}")
+        return links
+
+    def exists(self, item: dict) -> bool:
+        if self._links is None:
+            self.flush()
+            self._links = self._load_links()
+        return item["link"] in self._links
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def get_result_sink(mode: SinkMode, results_path: Path) -> ResultSink:
+    if mode == SinkMode.JSONL:
+        return JsonlSink(results_path / JSONL_NAME)
+    return JsonFileSink()
@@ -0,0 +1,141 @@
+from collections import Counter
+from contextlib import contextmanager
+from json import loads
+from logging import getLogger
+from pathlib import Path
+from time import time
+from typing import Any
+
+from enums import JobState, Stage
+from result_sink import dumps_line, ends_with_newline
+
+LOGGER = getLogger("run_journal")
+JOURNAL_NAME = ".run_journal.jsonl"
+LINK = "link"
+STAGE = "stage"
+STATE = "state"
+TIME = "time"
+ERROR = "error"
+RECORD = "record"
+
+
+class RunJournal:
+    """
+    An append-only log of every stage of every group. It's loaded at startup
+    into an index of the latest state of each (group, stage), so resuming a
+    run doesn't need to check the output of every group. When the advanced
+    stage fails, the group's basic record is kept so only that stage is
+    retried.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._index: dict[str, dict[Stage, dict[str, Any]]] = {}
+        if self.path.exists():
+            self._load()
+            newline = not ends_with_newline(self.path)
+        else:
+            newline = False
+        self._file = open(self.path, "a", encoding="utf-8")
+        if newline:
+            # the previous run was killed in the middle of a line
+            self._file.write("\n")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    LOGGER.warning(f"ignoring a truncated line in {self.path}")
+                    continue
+                self._index.setdefault(entry[LINK], {})[Stage(entry[STAGE])] = entry
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self):
+        self._file.close()
+
+    def record(
+        self,
+        link: str,
+        stage: Stage,
+        state: JobState,
+        error: str | None = None,
+        record: dict | None = None,
+    ):
+        entry = {LINK: link, STAGE: stage, STATE: state, TIME: time()}
+        if error is not None:
+            entry[ERROR] = error
+        if record is not None:
+            entry[RECORD] = record
+        self._file.write(dumps_line(entry) + "\n")
+        self._file.flush()
+        self._index.setdefault(link, {})[stage] = entry
+
+    @contextmanager
+    def stage(
+        self,
+        link: str,
+        stage: Stage,
+        resume_record: dict | None = None,
+        done: bool = True,
+    ):
+        """
+        Journals the stage as in progress, then as done or failed. A failed
+        stage keeps resume_record, to resume the group from this stage. With
+        done=False a stage that succeeds stays in progress, for a stage whose
+        result is only durable later (a buffered save).
+        """
+        self.record(link, stage, JobState.IN_PROGRESS)
+        try:
+            yield
+        except Exception as e:
+            record = None if resume_record is None else dict(resume_record)
+            self.record(link, stage, JobState.FAILED, type(e).__name__, record)
+            raise
+        if done:
+            self.record(link, stage, JobState.DONE)
+
+    def get_state(self, link: str, stage: Stage) -> JobState | None:
+        entry = self._index.get(link, {}).get(stage)
+        return None if entry is None else JobState(entry[STATE])
+
+    def is_saved(self, link: str) -> bool:
+        return self.get_state(link, Stage.SAVE) == JobState.DONE
+
+    def get_resume_record(self, link: str) -> dict | None:
+        """The basic record of a group whose advanced stage failed last"""
+        stages = self._index.get(link, {})
+        if Stage.SAVE in stages and stages[Stage.SAVE][STATE] == JobState.DONE:
+            return None
+        entry = stages.get(Stage.ADVANCED)
+        if entry is None or entry[STATE] != JobState.FAILED:
+            return None
+        return entry.get(RECORD)
+
+    def get_interrupted(self) -> dict[str, Stage]:
+        """Groups whose latest stage started but never finished"""
+        res = {}
+        for link, stages in self._index.items():
+            latest = max(stages.values(), key=lambda x: x[TIME])
+            if latest[STATE] == JobState.IN_PROGRESS:
+                res[link] = Stage(latest[STAGE])
+        return res
+
+    def summary(self) -> dict[str, int]:
+        counts = Counter(
+            f"{stage}:{entry[STATE]}"
+            for stages in self._index.values()
+            for stage, entry in stages.items()
+        )
+        return dict(sorted(counts.items()))
+
+
+def report_interrupted(journal: RunJournal):
+    interrupted = journal.get_interrupted()
+    if interrupted:
+        LOGGER.info(f"{len(interrupted)} groups were interrupted by the last run")
+        for link, stage in interrupted.items():
+            LOGGER.debug(f"{link} stopped during its {stage} stage")
@@ -0,0 +1,59 @@
+import asyncio
+from unittest import mock
+
+import pytest
+
+from enums import AdminInfo
+from fb_scrape_lib import advanced_scrape
+from fb_scrape_lib.admin_cache import (
+    AdminCache,
+    close_admin_cache,
+    configure_admin_cache,
+)
+
+PAGE = {AdminInfo.ID: "100063499185654", AdminInfo.NAME: "Lifeimpactmedia.com"}
+PROFILE = {AdminInfo.ID: "pfbid02L14GFHsLDfAV6Qov", AdminInfo.NAME: "Mary Weston"}
+ENRICHED = {AdminInfo.SCORE: 4.7, AdminInfo.N_REVIEWS: 36}
+
+
+@pytest.fixture
+def admin_cache(tmp_path):
+    yield configure_admin_cache(tmp_path / "admins.db")
+    close_admin_cache()
+
+
+@pytest.mark.parametrize("ttl_seconds, hit", [(60, True), (-1, False)])
+def test_cache_persists_with_ttl(tmp_path, ttl_seconds: float, hit: bool):
+    AdminCache(tmp_path / "admins.db").put(PAGE[AdminInfo.ID], ENRICHED)
+    cache = AdminCache(tmp_path / "admins.db", ttl_seconds)
+    assert (cache.get(PAGE[AdminInfo.ID]) == ENRICHED) == hit
+
+
+def test_enrich_fetches_each_admin_once(admin_cache):
+    with mock.patch.object(
+        advanced_scrape, "enrich_admin", return_value=ENRICHED
+    ) as enrich_admin:
+        for _ in range(3):
+            res = advanced_scrape.enrich([PAGE, PROFILE])
+            assert res == [PAGE | ENRICHED, PROFILE]
+    enrich_admin.assert_called_once()
+    assert admin_cache.stats() == {"hits": 2, "misses": 1, "skipped": 3}
+
+
+def test_enrich_async_shares_concurrent_fetches(admin_cache):
+    async def enrich_admin_async(link: str, deadline: float | None = None):
+        await asyncio.sleep(0.01)
+        return ENRICHED
+
+    async def enrich_groups():
+        return await asyncio.gather(
+            *[advanced_scrape.enrich_async([PAGE, PROFILE]) for _ in range(3)]
+        )
+
+    with mock.patch.object(
+        advanced_scrape, "enrich_admin_async", side_effect=enrich_admin_async
+    ) as m:
+        res = asyncio.run(enrich_groups())
+    assert res == [[PAGE | ENRICHED, PROFILE]] * 3
+    m.assert_called_once()
+    assert advanced_scrape.ADMIN_FETCHES == {}
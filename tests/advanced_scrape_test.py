@@ -0,0 +1,93 @@
+import asyncio
+from time import perf_counter
+from unittest import mock
+
+import pytest
+from conftest import run_async
+
+from enums import AdminInfo, GroupInfoKeys
+from fb_scrape_lib import advanced_scrape
+from fb_scrape_lib.admin_cache import AdminCache
+from fb_scrape_lib.rate_limiter import BlockedError
+
+LINK = "https://www.facebook.com/groups/cheapmealideas/"
+PAGE = {AdminInfo.ID: "100063499185654", AdminInfo.NAME: "Lifeimpactmedia.com"}
+ENRICHED = {AdminInfo.SCORE: 4.7, AdminInfo.N_REVIEWS: 36}
+TOPICS = [{"tag": "recipes", "tagged_post_count": 3}]
+FEATURED = [{"user_name": "Mary Weston"}]
+PAGE_SECONDS = 0.2
+
+
+def run(coroutine):
+    async def run_with_cache():
+        # sqlite connections are used only by the thread that made them
+        cache = AdminCache()
+        with mock.patch.object(advanced_scrape, "get_admin_cache", return_value=cache):
+            return await coroutine
+
+    return run_async(run_with_cache())
+
+
+def slow(res, seconds: float = PAGE_SECONDS):
+    async def load(link: str, deadline: float | None = None):
+        await asyncio.sleep(seconds)
+        if isinstance(res, Exception):
+            raise res
+        return res
+
+    return load
+
+
+def patch_pages(topics=slow(TOPICS), featured=slow(FEATURED), admin=slow(ENRICHED)):
+    return mock.patch.multiple(
+        advanced_scrape,
+        get_topics_async=topics,
+        get_featured_async=featured,
+        enrich_admin_async=admin,
+    )
+
+
+def test_advanced_json_loads_pages_concurrently():
+    with patch_pages():
+        start = perf_counter()
+        res = run(advanced_scrape.get_advanced_json_async(LINK, [PAGE]))
+        seconds = perf_counter() - start
+    assert res == {
+        GroupInfoKeys.TOPICS: TOPICS,
+        GroupInfoKeys.FEATURED: FEATURED,
+        GroupInfoKeys.ADMINS: [PAGE | ENRICHED],
+    }
+    assert seconds < 2 * PAGE_SECONDS
+
+
+@pytest.mark.parametrize("error", [BlockedError("login wall"), TimeoutError()])
+@pytest.mark.parametrize("branch", ["featured", "admin"])
+def test_failed_branch_cancels_the_rest(branch: str, error: Exception):
+    loader = mock.AsyncMock()
+
+    async def wait_then_load(link: str, deadline: float | None = None):
+        await asyncio.sleep(PAGE_SECONDS)
+        return await loader(link)
+
+    async def scrape():
+        with pytest.raises(type(error)):
+            await advanced_scrape.get_advanced_json_async(LINK, [PAGE])
+        # the loop outlives the failure, so a sibling left running would load
+        await asyncio.sleep(2 * PAGE_SECONDS)
+
+    with patch_pages(topics=slow(error, 0), **{branch: wait_then_load}):
+        run(scrape())
+    loader.assert_not_called()
+    assert advanced_scrape.ADMIN_FETCHES == {} == advanced_scrape.ADMIN_WAITERS
+
+
+def test_shared_admin_fetch_outlives_one_cancelled_group():
+    async def scrape():
+        first = asyncio.create_task(advanced_scrape.enrich_async([PAGE]))
+        second = asyncio.create_task(advanced_scrape.enrich_async([PAGE]))
+        await asyncio.sleep(PAGE_SECONDS / 2)
+        first.cancel()
+        return await second
+
+    with patch_pages():
+        assert run(scrape()) == [PAGE | ENRICHED]
@@ -0,0 +1,63 @@
+from unittest import mock
+
+import pytest
+
+from fb_scrape_lib.browser_pool import BrowserPool
+
+
+@pytest.fixture
+def playwright_mock():
+    with mock.patch("fb_scrape_lib.browser_pool.sync_playwright") as m:
+        browser = m.return_value.start.return_value.chromium.launch.return_value
+        browser.is_connected.return_value = True
+        page = browser.new_context.return_value.new_page.return_value
+        page.is_closed.return_value = False
+        page.evaluate.return_value = 0
+        yield m
+
+
+def test_pool_reuses_page(playwright_mock):
+    pool = BrowserPool(max_navigations=10)
+    pages = [pool.get_page() for _ in range(5)]
+    assert len(set(map(id, pages))) == 1
+    assert pool.stats() == {"launches": 1, "contexts": 1, "reuses": 4, "recycles": 0}
+
+
+@pytest.mark.parametrize(
+    "max_navigations, heap_size, n_calls, recycles",
+    [
+        (2, 0, 5, 2),
+        (100, 2**30, 3, 2),
+        (100, 0, 3, 0),
+    ],
+)
+def test_pool_recycles_context(
+    playwright_mock, max_navigations: int, heap_size: int, n_calls: int, recycles: int
+):
+    page = playwright_mock.return_value.start.return_value.chromium.launch.return_value
+    page = page.new_context.return_value.new_page.return_value
+    page.evaluate.return_value = heap_size
+    pool = BrowserPool(max_navigations=max_navigations, max_heap_mb=512)
+    for _ in range(n_calls):
+        pool.get_page()
+    assert pool.recycles == recycles
+    assert pool.launches == 1
+
+
+def test_pool_close_stops_playwright(playwright_mock):
+    pool = BrowserPool()
+    pool.get_page()
+    pool.close()
+    playwright_mock.return_value.start.return_value.stop.assert_called_once()
+    pool.get_page()
+    assert pool.launches == 2
+
+
+def test_failed_launch_stops_playwright(playwright_mock):
+    playwright = playwright_mock.return_value.start.return_value
+    playwright.chromium.launch.side_effect = RuntimeError("no browser")
+    pool = BrowserPool()
+    with pytest.raises(RuntimeError):
+        pool.get_page()
+    playwright.stop.assert_called_once()
+    assert pool._playwright is None
@@ -0,0 +1,8 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def run_async(coroutine):
+    """Runs coroutine on a thread of its own, in case a loop is already running"""
+    with ThreadPoolExecutor(1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
@@ -0,0 +1,60 @@
+from datetime import datetime
+from unittest import mock
+
+import pytest
+from dateparser import parse
+
+from fb_scrape_lib.dates import (
+    FALLBACK,
+    FAST_PATH,
+    get_date_parser_stats,
+    parse_date,
+    parse_fast,
+)
+
+NOW = datetime(2026, 10, 18, 12, 30)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("April 8, 2014", datetime(2014, 4, 8)),
+        ("Nov 28, 2010", datetime(2010, 11, 28)),
+        ("March 2", datetime(2026, 3, 2)),
+        ("February 26 at 3:15 PM", datetime(2026, 2, 26, 15, 15)),
+        ("Yesterday at 12:05 AM", datetime(2026, 10, 17, 0, 5)),
+        ("3d", datetime(2026, 10, 15, 12, 30)),
+        ("5h", datetime(2026, 10, 18, 7, 30)),
+        ("12m", datetime(2026, 10, 18, 12, 18)),
+        ("1w", datetime(2026, 10, 11, 12, 30)),
+        ("February 30", None),
+        ("Monday at 2:00 PM", None),
+        ("Shared with Public group", None),
+    ],
+)
+def test_parse_fast(text: str, expected: datetime | None):
+    assert parse_fast(text, NOW) == expected
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "April 8, 2014",
+        "November 28, 2010",
+        "Yesterday at 3:15 PM",
+        "March 2 at 9:00 AM",
+    ],
+)
+def test_fast_path_agrees_with_dateparser(text: str):
+    assert parse_date(text) == parse(text)
+
+
+def test_parse_date_counts_fallbacks():
+    before = get_date_parser_stats()
+    with mock.patch("fb_scrape_lib.dates.parse_fallback", return_value=NOW) as m:
+        assert parse_date("\n  March 2, 2020\n ") == datetime(2020, 3, 2)
+        assert parse_date("Monday at 2:00 PM") == NOW
+    m.assert_called_once_with("Monday at 2:00 PM")
+    after = get_date_parser_stats()
+    assert after[FAST_PATH] - before[FAST_PATH] == 1
+    assert after[FALLBACK] - before[FALLBACK] == 1
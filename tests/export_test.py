@@ -0,0 +1,105 @@
+import sqlite3
+from json import dumps, loads
+from pathlib import Path
+
+import numpy as np
+
+from enums import GroupInfoKeys
+from export import CHANGED, NEW, UNCHANGED, export_dir, read_result_columns
+from group_filter import filter_json_2_batch_filter_function
+from result_sink import JSONL_NAME
+
+
+def get_group_json(name: str) -> dict:
+    json = loads(Path(f"example_groups/{name}.json").read_text())
+    json[GroupInfoKeys.NAME] = name
+    json[GroupInfoKeys.LINK] = f"https://www.facebook.com/groups/{name}/"
+    return json
+
+
+def write_groups(results_path: Path) -> dict:
+    cheap = get_group_json("cheapmealideas")
+    cheap[GroupInfoKeys.TOPICS] = loads(
+        Path("example_groups/cheapmealideas_topics.json").read_text()
+    )
+    cheap[GroupInfoKeys.FEATURED] = loads(
+        Path("example_groups/cheapmealideas_featured.json").read_text()
+    )
+    (results_path / "cheapmealideas.json").write_text(dumps(cheap, indent=4))
+    (results_path / ".replay_memo.json").write_text("{}")
+    makeup = get_group_json("makeupartistsgroup")
+    with open(results_path / JSONL_NAME, "w") as f:
+        f.write(dumps(makeup | {GroupInfoKeys.MEMBERS: 1}) + "\n")
+        f.write(dumps(makeup) + "\n")
+    return cheap
+
+
+def count(conn: sqlite3.Connection, table: str) -> int:
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_export_is_incremental(tmp_path):
+    results_path = tmp_path / "results"
+    results_path.mkdir()
+    db_path = tmp_path / "groups.db"
+    cheap = write_groups(results_path)
+    assert export_dir(results_path, db_path) == {NEW: 2}
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT group_name, creation_date FROM groups WHERE n_members > 100000 "
+        "ORDER BY group_name"
+    ).fetchall()
+    assert rows == [
+        ("cheapmealideas", "2010-11-28"),
+        ("makeupartistsgroup", "2017-08-10"),
+    ]
+    n_topics = count(conn, "topics")
+    assert n_topics == len(cheap[GroupInfoKeys.TOPICS])
+    assert count(conn, "featured_posts") == len(cheap[GroupInfoKeys.FEATURED])
+    assert count(conn, "admins") == 12
+
+    assert export_dir(results_path, db_path) == {UNCHANGED: 2}
+    cheap[GroupInfoKeys.TOPICS] = cheap[GroupInfoKeys.TOPICS][:1]
+    (results_path / "cheapmealideas.json").write_text(dumps(cheap))
+    assert export_dir(results_path, db_path) == {CHANGED: 1, UNCHANGED: 1}
+    assert count(conn, "topics") == 1
+    assert count(conn, "admins") == 12
+
+
+def test_group_in_both_formats_is_exported_once(tmp_path):
+    results_path = tmp_path / "results"
+    results_path.mkdir()
+    db_path = tmp_path / "groups.db"
+    write_groups(results_path)
+    makeup = get_group_json("makeupartistsgroup")
+    (results_path / "makeupartistsgroup.json").write_text(
+        dumps(makeup | {GroupInfoKeys.MEMBERS: 1}, indent=4)
+    )
+    assert export_dir(results_path, db_path) == {NEW: 2}
+    assert export_dir(results_path, db_path) == {UNCHANGED: 2}
+    conn = sqlite3.connect(db_path)
+    assert count(conn, "admins") == 12
+    n_members = conn.execute(
+        "SELECT n_members FROM groups WHERE group_name = 'makeupartistsgroup'"
+    ).fetchone()[0]
+    assert n_members == makeup[GroupInfoKeys.MEMBERS]
+
+
+def test_filter_exported_groups(tmp_path):
+    results_path = tmp_path / "results"
+    results_path.mkdir()
+    write_groups(results_path)
+    odd = get_group_json("makeupartistsgroup") | {GroupInfoKeys.NAME: "odd"}
+    with open(results_path / JSONL_NAME, "a") as f:
+        # a date that wasn't parsed is exported as it was scraped
+        f.write(dumps(odd | {GroupInfoKeys.CREATION_DATE: "last year"}) + "\n")
+    export_dir(results_path, tmp_path / "groups.db")
+    columns = read_result_columns(tmp_path / "groups.db")
+    assert np.isnat(columns.creation_date).tolist() == [False, False, True]
+    batch_filter_func = filter_json_2_batch_filter_function(
+        [{"info_key": GroupInfoKeys.CREATION_DATE, "min_val": "2015-01-01"}]
+    )
+    mask = batch_filter_func(columns)
+    assert [x for i, x in enumerate(columns.links) if mask[i]] == [
+        "https://www.facebook.com/groups/makeupartistsgroup/"
+    ]
@@ -0,0 +1,100 @@
+import subprocess
+import sys
+from threading import Thread
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from benchmarks.extractors import read_fixture
+from benchmarks.fake_facebook import (
+    ABOUT_FIXTURES,
+    ADMIN_FIXTURE,
+    POSTS_PER_LOAD,
+    TOPICS_FIXTURE,
+    FakeFacebook,
+    FakeFacebookServer,
+)
+from enums import BlockReason, Sections
+from fb_scrape_lib.advanced_scrape import parse_admin, parse_featured, parse_topics
+from fb_scrape_lib.post_collector import wrap_posts
+from fb_scrape_lib.rate_limiter import detect_block
+from fb_scrape_lib.scrape_about import parse_about
+from normalization import BASE_URL_ENV
+
+POSTS_PER_GROUP = 12
+
+
+@pytest.fixture(scope="module")
+def site() -> FakeFacebook:
+    return FakeFacebook(posts_per_group=POSTS_PER_GROUP)
+
+
+@pytest.fixture
+def server(site: FakeFacebook):
+    server = FakeFacebookServer(("127.0.0.1", 0), site)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    site.login_wall_rate = 0.0
+
+
+def get(url: str) -> tuple[str, str]:
+    with urlopen(url) as res:
+        return res.read().decode(), res.url
+
+
+@pytest.mark.parametrize(
+    "path, fixtures, parse",
+    [
+        ("groups/a/about", ABOUT_FIXTURES, parse_about),
+        ("groups/a/hashtags", [TOPICS_FIXTURE], parse_topics),
+        ("100064717394937/about", [ADMIN_FIXTURE], parse_admin),
+    ],
+)
+def test_pages_parse_like_the_fixtures(server, path: str, fixtures: list[str], parse):
+    html, _ = get(server.base_url + path)
+    assert parse(html) in [parse(read_fixture(x)) for x in fixtures]
+
+
+def test_feed_appends_posts_until_the_group_has_no_more(server):
+    link = server.base_url + "groups/a/" + Sections.FEATURED.value
+    html, _ = get(link)
+    assert len(parse_featured(html)) == POSTS_PER_LOAD
+    chunks = []
+    for offset in range(
+        POSTS_PER_LOAD, POSTS_PER_GROUP + POSTS_PER_LOAD, POSTS_PER_LOAD
+    ):
+        chunks.append(get(f"{link}/more?offset={offset}")[0])
+    assert chunks[-1] == ""
+    assert len(parse_featured(wrap_posts(chunks))) == POSTS_PER_GROUP - POSTS_PER_LOAD
+
+
+def test_login_wall(server, site):
+    site.login_wall_rate = 1.0
+    html, url = get(server.base_url + "groups/a/about")
+    assert detect_block(html, url) == BlockReason.LOGIN_WALL
+
+
+def test_unknown_page(server):
+    with pytest.raises(HTTPError):
+        get(server.base_url + "a/b/c")
+
+
+def test_base_url_is_configurable():
+    script = (
+        "from normalization import fix_link, get_group_name;"
+        "link = fix_link('https://www.facebook.com/groups/abc/posts/1/');"
+        "print(link, get_group_name(link))"
+    )
+    env = {BASE_URL_ENV: "http://127.0.0.1:8000"}
+    res = subprocess.run(
+        [sys.executable, "-c", script],
+        env=env,
+        cwd="..",
+        capture_output=True,
+        text=True,
+    )
+    assert res.stdout.split() == ["http://127.0.0.1:8000/groups/abc/", "abc"]
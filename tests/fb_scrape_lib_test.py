@@ -4,24 +4,40 @@ from typing import Callable
 from unittest import mock
 
 import pytest
+from conftest import run_async
 
 from enums import AdminInfo
 from fb_scrape_lib.advanced_scrape import (
     enrich_admin,
+    enrich_admin_async,
     get_featured,
+    get_featured_async,
     get_rating,
     get_topics,
+    get_topics_async,
     is_mail,
     is_phone,
     is_website,
+    parse_admin,
+    parse_featured,
 )
+from fb_scrape_lib.browser_pool import close_browser_pool, get_browser_pool
 from fb_scrape_lib.mutual import (
     GroupInfoKeys,
     extract_first_json_object_in_string,
     get_area_around_kw,
     number_string_2_int,
 )
-from fb_scrape_lib.scrape_about import get_info_from_about
+from fb_scrape_lib.parser_backend import (
+    PARSER_BACKENDS,
+    get_parser_backend,
+    set_parser_backend,
+)
+from fb_scrape_lib.scrape_about import (
+    get_info_from_about,
+    get_info_from_about_async,
+    parse_about,
+)
 
 
 def get_html_and_results_json_from_path(local_path: str) -> (str, dict):
@@ -35,7 +51,7 @@ def get_html_and_results_json_from_path(local_path: str) -> (str, dict):
 def get_mock_result_for_html(html: str, func: Callable, mocker) -> dict:
     module = getmodule(func).__name__
     with mock.patch(f"{module}.get_html", return_value=html):
-        res = func("", 2)
+        res = func("")
     return res
 
 
@@ -51,6 +67,12 @@ def test_number_string_2_int(text: str, output: str):
     assert number_string_2_int(text) == output
 
 
+@pytest.fixture
+def browser_pool():
+    yield get_browser_pool()
+    close_browser_pool()
+
+
 # testing on 3 biggest fb groups
 @pytest.mark.parametrize(
     "link",
@@ -60,8 +82,8 @@ def test_number_string_2_int(text: str, output: str):
         "https://www.facebook.com/groups/cheapmealideas/",
     ],
 )
-def test_get_info_from_about_manages_to_handle_links(link: str):
-    res = get_info_from_about(link, 2)
+def test_get_info_from_about_manages_to_handle_links(link: str, browser_pool):
+    res = get_info_from_about(link)
     assert res[GroupInfoKeys.MEMBERS] > 0
     assert len(res[GroupInfoKeys.ADMINS]) > 0
     assert len(res[GroupInfoKeys.DESCRIPTION]) > 0
@@ -83,6 +105,77 @@ def test_page_scraper(local_path: str, func: Callable, mocker):
     assert res == json
 
 
+@pytest.mark.parametrize("local_path", ["makeupartistsgroup", "cheapmealideas"])
+def test_parse_about(local_path: str):
+    html, json = get_html_and_results_json_from_path(local_path)
+    res = parse_about(html)
+    res[GroupInfoKeys.CREATION_DATE] = res[GroupInfoKeys.CREATION_DATE].strftime(
+        "%d/%m/%Y"
+    )
+    assert res == json
+
+
+@pytest.mark.parametrize(
+    "html, description",
+    [
+        ('<meta name="description" content="a &amp; b"/>', "a & b"),
+        (
+            '<meta content="short" name="description">'
+            "<meta property='og:image:alt' content='the longer one'>",
+            "the longer one",
+        ),
+        ('<meta name="keywords" content="nothing">', ""),
+        ("<html></html>", ""),
+    ],
+)
+def test_parse_about_description_of_private_group(html: str, description: str):
+    assert parse_about(html) == {
+        GroupInfoKeys.DESCRIPTION: description,
+        GroupInfoKeys.IS_PRIVATE: True,
+    }
+
+
+@pytest.mark.parametrize("backend", list(PARSER_BACKENDS))
+@pytest.mark.parametrize(
+    "local_path, func",
+    [
+        ("cheapmealideas_featured", parse_featured),
+        ("makeupartistsgroup_admin", parse_admin),
+    ],
+)
+def test_parser_backends_give_identical_results(
+    local_path: str, func: Callable, backend: str
+):
+    html, _ = get_html_and_results_json_from_path(local_path)
+    default_backend = get_parser_backend().name
+    set_parser_backend("bs4")
+    expected = func(html)
+    set_parser_backend(backend)
+    try:
+        assert func(html) == expected
+    finally:
+        set_parser_backend(default_backend)
+
+
+@pytest.mark.parametrize(
+    "local_path, func, async_func",
+    [
+        ("makeupartistsgroup", get_info_from_about, get_info_from_about_async),
+        ("cheapmealideas_featured", get_featured, get_featured_async),
+        ("makeupartistsgroup_admin", enrich_admin, enrich_admin_async),
+        ("cheapmealideas_topics", get_topics, get_topics_async),
+    ],
+)
+def test_async_page_scraper_matches_sync(
+    local_path: str, func: Callable, async_func: Callable, mocker
+):
+    html, _ = get_html_and_results_json_from_path(local_path)
+    module = getmodule(async_func).__name__
+    with mock.patch(f"{module}.get_html_async", mock.AsyncMock(return_value=html)):
+        res = run_async(async_func(""))
+    assert res == get_mock_result_for_html(html, func, mocker)
+
+
 @pytest.mark.parametrize(
     "s, kw, margin, result",
     [
@@ -106,6 +199,9 @@ def test_get_area_around_kw(s: str, kw: str, margin: int, result: str):
             True,
             {"name": "test", "attributes": [1, 2, 3]},
         ),
+        ('x:{"name": "a}b{", "list": ["]"]}}', True, {"name": "a}b{", "list": ["]"]}),
+        ('x:[{"name": "[a]"}, "]"]', False, [{"name": "[a]"}, "]"]),
+        ("x:{not json}", True, {}),
     ],
 )
 def test_get_area_around_kw(s: str, is_curly: bool, result: dict):
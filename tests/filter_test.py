@@ -1,9 +1,16 @@
 from datetime import datetime
 
+import numpy as np
 import pytest
 
 from enums import GroupInfoKeys
-from group_filter import filter_json_2_filter_function, get_filter_func
+from group_filter import (
+    DATETIME_UNIT,
+    ResultColumns,
+    filter_json_2_batch_filter_function,
+    filter_json_2_filter_function,
+    get_filter_func,
+)
 
 TEST = [
     {GroupInfoKeys.IS_PRIVATE: True},
@@ -114,8 +121,34 @@ def test_get_filter_func(filter_json_indices: list[int], output_length: int):
     filter_list = [FILTER_LIST[i] for i in filter_json_indices]
     filter_func = filter_json_2_filter_function(filter_list)
     assert len(list(filter(filter_func, TEST))) == output_length
+    batch_filter_func = filter_json_2_batch_filter_function(filter_list)
+    mask = batch_filter_func(get_result_columns(TEST))
+    assert list(mask) == [filter_func(x) for x in TEST]
+
+
+def get_result_columns(jsons: list[dict]) -> ResultColumns:
+    return ResultColumns(
+        links=[str(i) for i in range(len(jsons))],
+        is_private=np.array([x[GroupInfoKeys.IS_PRIVATE] for x in jsons]),
+        n_members=np.array(
+            [x.get(GroupInfoKeys.MEMBERS, np.nan) for x in jsons], float
+        ),
+        creation_date=np.array(
+            [x.get(GroupInfoKeys.CREATION_DATE) for x in jsons], DATETIME_UNIT
+        ),
+        locations=[set(x.get(GroupInfoKeys.LOCATIONS, ())) for x in jsons],
+        description=[x.get(GroupInfoKeys.DESCRIPTION, "") for x in jsons],
+    )
 
 
 def test_get_filter_func_when_input_is_none():
     filter_func = get_filter_func(None)
     assert len(list(filter(filter_func, TEST))) == 6
+
+
+def test_checks_run_cheapest_first():
+    filter_func = filter_json_2_filter_function([FILTER_LIST[0], FILTER_LIST[6]])
+    # would raise a KeyError if the description was checked before n_members
+    assert not filter_func(
+        {GroupInfoKeys.IS_PRIVATE: False, GroupInfoKeys.MEMBERS: 100}
+    )
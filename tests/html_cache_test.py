@@ -0,0 +1,82 @@
+from unittest import mock
+
+import pytest
+
+from enums import CacheMode, Sections
+from fb_scrape_lib import mutual
+from fb_scrape_lib.html_cache import HtmlCache, close_html_cache, configure_html_cache
+
+LINK = "https://www.facebook.com/groups/test/"
+HTML = "<html>" + "test " * 1000 + "</html>"
+
+
+@pytest.mark.parametrize(
+    "mode, reads, writes",
+    [
+        (CacheMode.READ_WRITE, True, True),
+        (CacheMode.READ_ONLY, True, False),
+        (CacheMode.REFRESH, False, True),
+        (CacheMode.BYPASS, False, False),
+    ],
+)
+def test_cache_modes(tmp_path, mode: CacheMode, reads: bool, writes: bool):
+    cache = HtmlCache(tmp_path, mode)
+    cache.put(LINK, Sections.ABOUT, 1, HTML)
+    assert (HtmlCache(tmp_path).get(LINK, Sections.ABOUT, 1) == HTML) == writes
+    HtmlCache(tmp_path).put(LINK, Sections.TOPICS, 1, HTML)
+    assert (cache.get(LINK, Sections.TOPICS, 1) == HTML) == reads
+
+
+def test_cache_key_includes_section_scrolls_and_collect(tmp_path):
+    cache = HtmlCache(tmp_path)
+    cache.put(LINK, Sections.FEATURED, 50, HTML)
+    assert cache.get(LINK, Sections.FEATURED, 50) == HTML
+    assert cache.get(LINK, Sections.FEATURED, 1) is None
+    assert cache.get(LINK, Sections.ABOUT, 50) is None
+    assert cache.get(LINK, Sections.FEATURED, 50, "div.post") is None
+    cache.put(LINK, Sections.FEATURED, 50, "<div>posts</div>", "div.post")
+    assert cache.get(LINK, Sections.FEATURED, 50, "div.post") == "<div>posts</div>"
+    assert cache.get(LINK, Sections.FEATURED, 50) == HTML
+
+
+def test_cache_ttl(tmp_path):
+    cache = HtmlCache(tmp_path, ttl_seconds=60)
+    cache.put(LINK, Sections.ABOUT, 1, HTML)
+    with mock.patch("fb_scrape_lib.html_cache.time", return_value=10**10):
+        assert cache.get(LINK, Sections.ABOUT, 1) is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HtmlCache(tmp_path)
+    cache.put(LINK, Sections.ABOUT, 1, HTML)
+    cache.max_bytes = cache.size() * 2
+    with mock.patch.object(cache, "size", wraps=cache.size) as size:
+        cache.put(LINK, Sections.TOPICS, 1, HTML)
+        cache.put(LINK, Sections.TOPICS, 1, HTML)
+        cache.get(LINK, Sections.ABOUT, 1)
+        # the index is only summed once the running total crosses max_bytes
+        size.assert_not_called()
+        cache.put(LINK, Sections.FEATURED, 1, HTML)
+        size.assert_called_once()
+    assert cache._size == cache.size() == cache.max_bytes
+    assert cache.get(LINK, Sections.ABOUT, 1) == HTML
+    assert cache.get(LINK, Sections.TOPICS, 1) is None
+    assert cache.get(LINK, Sections.FEATURED, 1) == HTML
+
+
+def test_get_html_reads_through_cache(tmp_path):
+    configure_html_cache(tmp_path)
+    try:
+        with (
+            mock.patch.object(mutual, "BROWSER_POOL") as pool,
+            mock.patch.object(mutual, "get_rate_limiter"),
+            mock.patch.object(
+                mutual, "__scroll_till_html_does_not_change", return_value=HTML
+            ) as scroll,
+        ):
+            assert mutual.get_html(LINK, Sections.ABOUT) == HTML
+            assert mutual.get_html(LINK, Sections.ABOUT) == HTML
+        assert scroll.call_count == 1
+        assert pool.get_page.call_count == 1
+    finally:
+        close_html_cache()
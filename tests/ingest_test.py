@@ -0,0 +1,76 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from enums import DedupeMode
+from ingest import BloomFilter, estimate_n_links, iter_input_items, skip_existing
+from normalization import fix_link
+
+LINKS = [
+    "https://www.facebook.com/groups/washingtonprie/posts/889214298663124/",
+    "www.facebook.com/groups/WeldCountyGOP/permalink/10159805988203188/",
+    "https://www.facebook.com/groups/category/travel-and-leisure/4714802281875088/",
+    "not-a-link",
+    "https://www.facebook.com/groups/washingtonprie/",
+]
+EXPECTED = [
+    "https://www.facebook.com/groups/washingtonprie/",
+    "https://www.facebook.com/groups/WeldCountyGOP/",
+]
+
+
+def write_input(path: Path, text: str):
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt") as f:
+            f.write(text)
+    else:
+        path.write_text(text)
+
+
+@pytest.mark.parametrize(
+    "name, text",
+    [
+        ("links.txt", "\n".join(LINKS)),
+        ("links.txt.gz", " ".join(LINKS)),
+        ("links.csv", "\n".join(f'{i},"{x}"' for i, x in enumerate(LINKS))),
+        (
+            "links.csv.gz",
+            "id,link\n" + "\n".join(f"{i},{x}" for i, x in enumerate(LINKS)),
+        ),
+    ],
+)
+@pytest.mark.parametrize("dedupe", list(DedupeMode))
+def test_iter_input_items(tmp_path, name: str, text: str, dedupe: DedupeMode):
+    write_input(tmp_path / name, text)
+    items = list(iter_input_items(str(tmp_path / name), tmp_path, dedupe))
+    assert [x["link"] for x in items] == EXPECTED
+    assert [x["link"] for x in items] == [fix_link(x) for x in LINKS[:2]]
+    assert items[1]["local_path"] == tmp_path / "WeldCountyGOP.json"
+
+
+def test_single_link_input(tmp_path):
+    items = list(iter_input_items(LINKS[0], tmp_path))
+    assert [x["link"] for x in items] == EXPECTED[:1]
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(capacity=1000, error_rate=1e-3)
+    assert sum(bloom.add(str(i)) for i in range(1000)) > 990
+    assert not any(bloom.add(str(i)) for i in range(1000))
+    assert all(str(i) in bloom for i in range(1000))
+    false_positives = sum(f"new{i}" in bloom for i in range(10000))
+    assert false_positives < 50
+
+
+@pytest.mark.parametrize("name", ["links.txt", "links.txt.gz"])
+def test_estimate_n_links_is_an_upper_bound(tmp_path, name: str):
+    links = [f"https://www.facebook.com/groups/{i}/" for i in range(10000)]
+    write_input(tmp_path / name, "\n".join(links))
+    assert len(links) <= estimate_n_links(tmp_path / name) < 2 * len(links)
+
+
+@pytest.mark.parametrize("override, expected", [(False, [1, 3]), (True, [1, 2, 3])])
+def test_skip_existing(override: bool, expected: list[int]):
+    items = skip_existing(iter([1, 2, 3]), override, lambda x: x == 2)
+    assert list(items) == expected
@@ -0,0 +1,93 @@
+import asyncio
+from unittest import mock
+
+import pytest
+from conftest import run_async
+
+import main
+from enums import JobState, Stage
+from result_sink import JSONL_NAME, JsonFileSink, JsonlSink
+from run_journal import JOURNAL_NAME, RunJournal
+
+
+def test_failed_worker_cancels_the_others_before_closing_the_pool():
+    still_running = []
+
+    async def scrape_item_async(item, *args):
+        if item["link"] == "a":
+            raise RuntimeError()
+        try:
+            await asyncio.sleep(10)
+        finally:
+            still_running.append(item["link"])
+
+    async def close_async_browser_pool():
+        assert still_running == ["b"]
+
+    with (
+        mock.patch.object(main, "scrape_item_async", side_effect=scrape_item_async),
+        mock.patch.object(main, "get_async_browser_pool") as pool,
+        mock.patch.object(
+            main, "close_async_browser_pool", side_effect=close_async_browser_pool
+        ) as close,
+    ):
+        pool.return_value.start = mock.AsyncMock()
+        coroutine = main.scrape_items_async(
+            [{"link": "b"}, {"link": "a"}], 2, None, True, 2, 2, None, None
+        )
+        with pytest.raises(RuntimeError):
+            run_async(coroutine)
+    close.assert_called_once()
+
+
+def test_groups_are_saved_once_their_line_is_flushed(tmp_path):
+    sink = JsonlSink(tmp_path / JSONL_NAME, flush_every=2)
+    journal = RunJournal(tmp_path / JOURNAL_NAME)
+    queue = mock.MagicMock()
+    items = [{"link": link} for link in "abc"]
+    completed = []
+    queue.complete.side_effect = completed.append
+
+    def scrape_item(item, group_filter_func, advance_scrape, sink, journal):
+        with journal.stage(item["link"], Stage.SAVE, done=False):
+            sink.write(item, {"link": item["link"]})
+
+    with (
+        mock.patch.object(main, "scrape_item", side_effect=scrape_item),
+        mock.patch.object(main, "close_browser_pool"),
+    ):
+        main.scrape_items(items, 3, None, True, sink, journal, queue)
+    assert completed == ["a", "b"]
+    assert [journal.is_saved(x) for x in "abc"] == [True, True, False]
+    assert journal.get_interrupted() == {"c": Stage.SAVE}
+    sink.close()
+    main.record_saved(sink, journal, queue)
+    assert completed == ["a", "b", "c"]
+    assert journal.is_saved("c")
+
+
+def test_existing_output_is_skipped_on_every_resumed_run(tmp_path):
+    input_path = tmp_path / "links.txt"
+    input_path.write_text(
+        "https://www.facebook.com/groups/old/ https://www.facebook.com/groups/new/"
+    )
+    (tmp_path / "old.json").write_text("{}")
+    journal = RunJournal(tmp_path / JOURNAL_NAME)
+    journal.record("https://www.facebook.com/groups/other/", Stage.SAVE, JobState.DONE)
+    sink = JsonFileSink()
+    scraped = []
+
+    def scrape_item(item, group_filter_func, advance_scrape, sink, journal):
+        scraped.append(item["local_path"].stem)
+        with journal.stage(item["link"], Stage.SAVE, done=False):
+            sink.write(item, {})
+
+    for _ in range(2):
+        items = main.iter_input_items(str(input_path), tmp_path)
+        items = main.handle_override_for_list(items, False, sink, journal)
+        with (
+            mock.patch.object(main, "scrape_item", side_effect=scrape_item),
+            mock.patch.object(main, "close_browser_pool"),
+        ):
+            main.scrape_items(items, None, None, True, sink, journal, None)
+    assert scraped == ["new"]
@@ -0,0 +1,88 @@
+import asyncio
+from json import loads
+
+import pytest
+from conftest import run_async
+
+from enums import GroupInfoKeys, Timing
+from fb_scrape_lib import metrics as metrics_module
+from fb_scrape_lib.metrics import Histogram, Metrics, configure_metrics, get_metrics
+from fb_scrape_lib.scrape_about import parse_about
+
+
+@pytest.mark.parametrize(
+    "values, q, expected",
+    [
+        ([0.002, 0.003, 0.2, 2], 0.5, 0.005),
+        ([0.002, 0.003, 0.2, 2], 0.95, 2.5),
+        ([100.0], 0.5, 100.0),
+    ],
+)
+def test_histogram_quantile(values: list[float], q: float, expected: float):
+    histogram = Histogram()
+    for x in values:
+        histogram.observe(x)
+    assert histogram.quantile(q) == expected
+    assert histogram.count == len(values)
+
+
+def test_group_timings_are_streamed(tmp_path):
+    metrics = Metrics(jsonl_path=tmp_path / "stats.jsonl")
+    with metrics.group("a"):
+        metrics.observe(Timing.NAVIGATION, 1.0)
+        metrics.observe(Timing.NAVIGATION, 2.0)
+        metrics.observe(Timing.EXTRACT, 0.5, GroupInfoKeys.MEMBERS)
+    metrics.observe(Timing.NAVIGATION, 4.0)
+    metrics.close()
+    group, summary = [
+        loads(x) for x in (tmp_path / "stats.jsonl").read_text().splitlines()
+    ]
+    assert group["link"] == "a"
+    assert group["stages"] == {"navigation": 3.0, "extract:n_members": 0.5}
+    assert summary["summary"]["navigation"]["count"] == 3
+    assert summary["summary"]["group"]["count"] == 1
+
+
+def test_concurrent_groups_are_kept_apart():
+    metrics = Metrics()
+
+    async def scrape(link: str, seconds: float):
+        with metrics.group(link) as timings:
+            await asyncio.sleep(0)
+            metrics.observe(Timing.SCROLL, seconds)
+            await asyncio.sleep(0)
+            return timings
+
+    async def scrape_all():
+        return await asyncio.gather(scrape("a", 1.0), scrape("b", 2.0))
+
+    res = run_async(scrape_all())
+    assert res == [{"scroll": 1.0}, {"scroll": 2.0}]
+
+
+def test_prometheus_export(tmp_path):
+    metrics = Metrics(prometheus_path=tmp_path / "scraper.prom", flush_every=2)
+    metrics.observe(Timing.EXTRACT, 0.003, GroupInfoKeys.MEMBERS)
+    metrics.observe(Timing.EXTRACT, 0.2, GroupInfoKeys.MEMBERS)
+    for link in "ab":
+        with metrics.group(link):
+            pass
+    lines = (tmp_path / "scraper.prom").read_text().splitlines()
+    labels = 'stage="extract",detail="n_members"'
+    assert f'fb_scraper_seconds_bucket{{{labels},le="0.001"}} 0' in lines
+    assert f'fb_scraper_seconds_bucket{{{labels},le="0.005"}} 1' in lines
+    assert f'fb_scraper_seconds_bucket{{{labels},le="+Inf"}} 2' in lines
+    assert f"fb_scraper_seconds_count{{{labels}}} 2" in lines
+    assert 'fb_scraper_seconds_count{stage="group"} 2' in lines
+
+
+def test_about_extractions_are_timed():
+    with open("example_groups/cheapmealideas.html", "r") as f:
+        html = f.read()
+    configure_metrics()
+    try:
+        record = parse_about(html)
+        keys = set(get_metrics().summary())
+    finally:
+        metrics_module.close_metrics()
+    assert keys == {f"extract:{key}" for key in record}
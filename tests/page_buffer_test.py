@@ -0,0 +1,70 @@
+from unittest import mock
+
+import pytest
+
+from fb_scrape_lib import mutual
+from fb_scrape_lib.metrics import Metrics, get_peak_rss_mb
+from fb_scrape_lib.mutual import (
+    ADMINS_KEY,
+    LOCATIONS_KEY,
+    TOPICS_STR,
+    get_json_from_text_after,
+)
+from fb_scrape_lib.page_buffer import PageBuffer
+from fb_scrape_lib.scrape_about import parse_about
+
+HTML = '<p dir="auto">שלום 1,234 total members</p>'
+
+
+def read(name: str) -> str:
+    with open(f"example_groups/{name}.html", "r") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("spool_bytes, is_spooled", [(2**20, False), (16, True)])
+def test_buffer_finds_and_slices_by_byte_offsets(spool_bytes: int, is_spooled: bool):
+    with PageBuffer(spool_bytes=spool_bytes) as buffer:
+        for part in (HTML[:10], HTML[10:]):
+            buffer.append(part)
+        assert buffer.is_spooled == is_spooled
+        assert len(buffer) == len(HTML.encode())
+        ix = buffer.find(" total members")
+        assert buffer[ix - 5 : ix] == "1,234"
+        assert buffer.find("שלום") == HTML.encode().find("שלום".encode())
+        assert "members" in buffer and "missing" not in buffer
+        assert buffer.text() == HTML
+
+
+@pytest.mark.parametrize("name", ["cheapmealideas", "makeupartistsgroup"])
+def test_about_parses_from_a_spooled_buffer(name: str):
+    html = read(name)
+    with PageBuffer(html, spool_bytes=2**10) as buffer:
+        assert buffer.is_spooled
+        assert parse_about(buffer) == parse_about(html)
+
+
+@pytest.mark.parametrize(
+    "name, key, curly_brackets",
+    [
+        ("cheapmealideas", ADMINS_KEY, True),
+        ("cheapmealideas_topics", TOPICS_STR, True),
+        ("cheapmealideas_featured", LOCATIONS_KEY, False),
+    ],
+)
+def test_json_is_decoded_in_growing_windows(name: str, key: str, curly_brackets: bool):
+    html = read(name)
+    buffer = PageBuffer(html, spool_bytes=2**10)
+    with mock.patch.object(mutual, "JSON_WINDOW", 8), buffer:
+        res = get_json_from_text_after(buffer, key, curly_brackets)
+    assert res is not None
+    assert res == get_json_from_text_after(html, key, curly_brackets)
+
+
+def test_peak_rss_is_exported(tmp_path):
+    metrics = Metrics(prometheus_path=tmp_path / "scraper.prom")
+    metrics.observe_peak_rss("parse_worker", 100.0)
+    metrics.observe_peak_rss("parse_worker", 50.0)
+    metrics.close()
+    lines = (tmp_path / "scraper.prom").read_text().splitlines()
+    assert 'fb_scraper_peak_rss_bytes{process="parse_worker"} 104857600' in lines
+    assert get_peak_rss_mb() > 0
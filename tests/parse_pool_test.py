@@ -0,0 +1,74 @@
+import asyncio
+from pathlib import Path
+from time import sleep
+from typing import Callable
+
+import pytest
+from conftest import run_async
+
+from enums import GroupInfoKeys, Timing
+from fb_scrape_lib.advanced_scrape import parse_admin, parse_featured, parse_topics
+from fb_scrape_lib.dates import FALLBACK, FAST_PATH, get_date_parser_stats
+from fb_scrape_lib.metrics import configure_metrics
+from fb_scrape_lib.parse_pool import ParsePool, parse_async
+from fb_scrape_lib.parser_backend import DEFAULT_PARSER_BACKEND
+from fb_scrape_lib.scrape_about import parse_about
+
+EXAMPLES = Path(__file__).parent / "example_groups"
+PARSE_SECONDS = 0.2
+
+
+def read(name: str) -> str:
+    with open(EXAMPLES / f"{name}.html", "r") as f:
+        return f.read()
+
+
+def slow_len(html: str) -> int:
+    sleep(PARSE_SECONDS)
+    return len(html)
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ParsePool(2, DEFAULT_PARSER_BACKEND, max_pending=2)
+    yield pool
+    pool.close()
+
+
+def test_parse_async_is_inline_without_a_pool():
+    res = run_async(parse_async(parse_about, read("cheapmealideas")))
+    assert res == parse_about(read("cheapmealideas"))
+
+
+@pytest.mark.parametrize(
+    "name, func",
+    [
+        ("cheapmealideas", parse_about),
+        ("cheapmealideas_topics", parse_topics),
+        ("cheapmealideas_featured", parse_featured),
+        ("makeupartistsgroup_admin", parse_admin),
+    ],
+)
+def test_pool_parses_like_inline(pool: ParsePool, name: str, func: Callable):
+    html = read(name)
+    assert run_async(pool.parse(func, html)) == func(html)
+
+
+def test_pool_timings_are_merged(pool: ParsePool):
+    metrics = configure_metrics()
+    before = get_date_parser_stats()
+    run_async(pool.parse(parse_about, read("cheapmealideas")))
+    after = get_date_parser_stats()
+    assert after[FAST_PATH] + after[FALLBACK] > before[FAST_PATH] + before[FALLBACK]
+    summary = metrics.summary()
+    assert summary[f"{Timing.EXTRACT}:{GroupInfoKeys.MEMBERS}"]["count"] == 1
+    assert metrics.peak_rss_mb()["parse_worker"] == pool.worker_peak_rss_mb > 0
+
+
+def test_pool_applies_backpressure(pool: ParsePool):
+    async def parse_all():
+        return await asyncio.gather(*[pool.parse(slow_len, "x" * i) for i in range(4)])
+
+    waits = pool.waits
+    assert run_async(parse_all()) == [0, 1, 2, 3]
+    assert pool.waits - waits == 2
@@ -0,0 +1,43 @@
+from unittest import mock
+
+from bs4 import BeautifulSoup
+
+from fb_scrape_lib.advanced_scrape import DIV, POST_CLASS, POST_SELECTOR, parse_featured
+from fb_scrape_lib.post_collector import collect_posts_while_scrolling, wrap_posts
+
+
+def get_page_mock(drains: list[tuple[int, list[str]]]) -> mock.MagicMock:
+    page = mock.MagicMock()
+    results = [None] + [{"total": total, "html": html} for total, html in drains]
+    page.evaluate.side_effect = results
+    return page
+
+
+def test_collector_returns_drained_posts():
+    pace = mock.MagicMock()
+    page = get_page_mock([(1, []), (2, ["<p>1</p>"]), (2, ["<p>2</p>"])])
+    html = collect_posts_while_scrolling(page, "", POST_SELECTOR, 2, pace)
+    assert html == wrap_posts(["<p>1</p>", "<p>2</p>"])
+    assert page.mouse.wheel.call_count == 2
+    assert pace.call_count == 2
+
+
+def test_collector_stops_when_no_new_posts_arrive():
+    drains = [(1, []), (1, ["<p>1</p>"]), (1, []), (1, [])]
+    page = get_page_mock(drains)
+    pace = mock.MagicMock()
+    with mock.patch("fb_scrape_lib.post_collector.monotonic", side_effect=[0, 1, 2]):
+        html = collect_posts_while_scrolling(page, "", POST_SELECTOR, 50, pace, 0.5)
+    assert html == wrap_posts(["<p>1</p>"])
+    assert page.mouse.wheel.call_count == 2
+
+
+def test_collected_posts_parse_like_the_full_page():
+    with open("example_groups/cheapmealideas_featured.html", "r") as f:
+        html = f.read()
+    posts = BeautifulSoup(html, features="html.parser").find_all(DIV, POST_CLASS)
+    ids = {id(x) for x in posts}
+    outermost = [x for x in posts if not any(id(p) in ids for p in x.parents)]
+    assert parse_featured(wrap_posts([str(x) for x in outermost])) == parse_featured(
+        html
+    )
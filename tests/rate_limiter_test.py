@@ -0,0 +1,155 @@
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from unittest import mock
+
+import pytest
+from conftest import run_async
+
+from enums import BlockReason, Sections
+from fb_scrape_lib import mutual
+from fb_scrape_lib.rate_limiter import (
+    EMPTY_PAGE_BYTES,
+    BlockedError,
+    RateLimiter,
+    TokenBucket,
+    detect_block,
+)
+
+LINK = "https://www.facebook.com/groups/cheapmealideas/"
+PAGE = "x" * EMPTY_PAGE_BYTES
+
+
+@pytest.mark.parametrize(
+    "html, url, expected",
+    [
+        (PAGE, LINK + "about", None),
+        (PAGE, "https://www.facebook.com/login/?next=x", BlockReason.LOGIN_WALL),
+        (
+            PAGE,
+            "https://www.facebook.com/checkpoint/1501092823525282/",
+            BlockReason.CHECKPOINT,
+        ),
+        ("<html></html>", LINK + "about", BlockReason.EMPTY_PAGE),
+    ],
+)
+def test_detect_block(html: str, url: str, expected: BlockReason | None):
+    assert detect_block(html, url) == expected
+
+
+def test_bucket_spaces_out_requests():
+    bucket = TokenBucket(rate=2, burst=1)
+    bucket.updated = 0
+    assert bucket.reserve(1, 0) == 0
+    assert bucket.reserve(1, 0) == 0.5
+    assert bucket.reserve(1, 0) == 1
+    assert bucket.reserve(1, 10) == 0
+
+
+def test_rate_increases_while_healthy_and_backs_off_when_blocked():
+    limiter = RateLimiter(initial_rate=1, max_rate=1.05, increase_step=0.02)
+    host = "www.facebook.com"
+    for _ in range(5):
+        limiter.report(LINK, Sections.ABOUT, PAGE, LINK)
+    assert limiter.get_rate(host) == 1.05
+    with pytest.raises(BlockedError):
+        limiter.report(LINK, Sections.ABOUT, PAGE, "https://www.facebook.com/login/")
+    assert limiter.get_rate(host) == 0.525
+    assert limiter.stats()["blocks"] == {BlockReason.LOGIN_WALL: 1}
+
+
+def test_block_pauses_the_host():
+    limiter = RateLimiter(initial_rate=1, cooldown_seconds=60)
+    with pytest.raises(BlockedError):
+        limiter.report(LINK, Sections.ABOUT, "", LINK)
+    with mock.patch("fb_scrape_lib.rate_limiter.sleep") as sleep:
+        limiter.acquire(LINK, Sections.TOPICS)
+        limiter.acquire("https://example.com/", Sections.TOPICS)
+    assert sleep.call_count == 1
+    assert sleep.call_args.args[0] > 60
+
+
+def test_section_budgets():
+    limiter = RateLimiter(initial_rate=1, section_costs={Sections.FEATURED: 3})
+    with mock.patch("fb_scrape_lib.rate_limiter.sleep") as sleep:
+        limiter.acquire(LINK, Sections.FEATURED)
+        limiter.acquire(LINK, Sections.ABOUT, min_wait=0.5)
+    assert sleep.call_args.args[0] == pytest.approx(2, abs=0.01)
+    assert limiter.stats()["sections"]["featured"]["requests"] == 1
+
+
+@pytest.mark.parametrize("content, blocked", [("", True), (PAGE, False)])
+def test_collected_page_is_checked_for_blocks(content: str, blocked: bool):
+    limiter = RateLimiter()
+    with (
+        mock.patch.object(mutual, "BROWSER_POOL") as pool,
+        mock.patch.object(mutual, "get_rate_limiter", return_value=limiter),
+        mock.patch.object(
+            mutual, "collect_posts_while_scrolling", return_value="<html></html>"
+        ),
+    ):
+        page = pool.get_page.return_value
+        page.content.return_value = content
+        page.url = LINK + Sections.FEATURED.value
+        with mock.patch.object(limiter, "acquire"):
+            if blocked:
+                with pytest.raises(BlockedError):
+                    mutual.get_html(LINK, Sections.FEATURED, collect="div")
+            else:
+                assert mutual.get_html(LINK, Sections.FEATURED, collect="div")
+    assert limiter.stats()["blocks"] == ({BlockReason.EMPTY_PAGE: 1} if blocked else {})
+
+
+@contextmanager
+def patch_async_fetch(acquire_async, scroll, events: list | None = None):
+    """Fetches through a mocked async page, with acquire_async and scroll"""
+    limiter = RateLimiter()
+
+    @asynccontextmanager
+    async def get_page(section: Sections):
+        if events is not None:
+            events.append("page")
+        yield mock.MagicMock(url=LINK)
+
+    with (
+        mock.patch.object(mutual.ASYNC_BROWSER_POOL, "page", side_effect=get_page),
+        mock.patch.object(mutual, "get_rate_limiter", return_value=limiter),
+        mock.patch.object(limiter, "acquire_async", side_effect=acquire_async),
+        mock.patch.object(
+            mutual, "__scroll_till_html_does_not_change_async", side_effect=scroll
+        ),
+    ):
+        yield
+
+
+async def scroll_once(page, address: str, n: int, pace) -> str:
+    await pace()
+    return PAGE
+
+
+def test_async_page_is_taken_after_the_rate_limit_wait():
+    events = []
+
+    async def acquire_async(*args):
+        events.append("acquire")
+
+    with patch_async_fetch(acquire_async, scroll_once, events):
+        assert run_async(mutual.get_html_async(LINK, Sections.ABOUT)) == PAGE
+    assert events[:2] == ["acquire", "page"]
+
+
+@pytest.mark.parametrize("page_seconds, late", [(0, False), (0.2, True)])
+def test_deadline_does_not_count_rate_limit_waits(page_seconds: float, late: bool):
+    async def acquire_async(*args):
+        await asyncio.sleep(0.2)
+
+    async def scroll(page, address: str, n: int, pace) -> str:
+        await asyncio.sleep(page_seconds)
+        return await scroll_once(page, address, n, pace)
+
+    coroutine = mutual.get_html_async(LINK, Sections.ABOUT, deadline=0.1)
+    with patch_async_fetch(acquire_async, scroll):
+        if late:
+            with pytest.raises(TimeoutError):
+                run_async(coroutine)
+        else:
+            assert run_async(coroutine) == PAGE
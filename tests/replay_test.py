@@ -0,0 +1,60 @@
+from pathlib import Path
+from shutil import copy
+
+import pytest
+
+from enums import AdminInfo, GroupInfoKeys
+from fb_scrape_lib.advanced_scrape import parse_admin, parse_topics
+from fb_scrape_lib.scrape_about import parse_about
+from replay import get_group_dirs, replay_dir
+
+EXAMPLES = Path("example_groups")
+ADMIN_ID = "100063499185654"
+
+
+@pytest.fixture
+def html_dir(tmp_path) -> Path:
+    group_dir = tmp_path / "makeupartistsgroup"
+    (group_dir / "admins").mkdir(parents=True)
+    copy(EXAMPLES / "makeupartistsgroup.html", group_dir / "about.html")
+    copy(EXAMPLES / "cheapmealideas_topics.html", group_dir / "hashtags.html")
+    copy(
+        EXAMPLES / "makeupartistsgroup_admin.html",
+        group_dir / "admins" / f"{ADMIN_ID}.html",
+    )
+    copy(EXAMPLES / "cheapmealideas.html", tmp_path / "not_a_group.html")
+    return tmp_path
+
+
+def read(path: Path) -> str:
+    with open(path, "r") as f:
+        return f.read()
+
+
+def test_replay_matches_extractors(html_dir):
+    group_dirs = get_group_dirs(html_dir)
+    assert [x.name for x in group_dirs] == ["makeupartistsgroup"]
+    [(name, _, json)] = list(replay_dir(group_dirs, {}, max_workers=2))
+    assert name == "makeupartistsgroup"
+    expected = parse_about(read(EXAMPLES / "makeupartistsgroup.html"))
+    assert json[GroupInfoKeys.MEMBERS] == expected[GroupInfoKeys.MEMBERS]
+    assert json[GroupInfoKeys.TOPICS] == parse_topics(
+        read(EXAMPLES / "cheapmealideas_topics.html")
+    )
+    admins = {x[AdminInfo.ID]: x for x in json[GroupInfoKeys.ADMINS]}
+    enriched = parse_admin(read(EXAMPLES / "makeupartistsgroup_admin.html"))
+    assert admins[ADMIN_ID] == admins[ADMIN_ID] | enriched
+    assert len(admins) == len(expected[GroupInfoKeys.ADMINS])
+    assert GroupInfoKeys.FEATURED not in json
+
+
+def test_replay_skips_memoized_groups(html_dir):
+    group_dirs = get_group_dirs(html_dir)
+    [(name, digest, _)] = list(replay_dir(group_dirs, {}, max_workers=1))
+    [(_, same_digest, json)] = list(replay_dir(group_dirs, {name: digest}, 1))
+    assert json is None
+    assert same_digest == digest
+    (html_dir / name / "hashtags.html").unlink()
+    [(_, new_digest, json)] = list(replay_dir(group_dirs, {name: digest}, 1))
+    assert new_digest != digest
+    assert GroupInfoKeys.TOPICS not in json
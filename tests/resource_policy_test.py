@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from unittest import mock
+
+import pytest
+
+from enums import Sections
+from fb_scrape_lib.browser_pool import AsyncBrowserPool, BrowserPool
+from fb_scrape_lib.resource_policy import (
+    ESTIMATED_BYTES,
+    ResourcePolicy,
+    ResourceTracker,
+    sum_resource_stats,
+)
+
+
+@pytest.mark.parametrize(
+    "resource_type, url, section, expected",
+    [
+        ("document", "https://www.facebook.com/groups/x/about", Sections.ABOUT, False),
+        ("script", "https://static.xx.fbcdn.net/rsrc.php/a.js", Sections.ABOUT, False),
+        ("image", "https://scontent.xx.fbcdn.net/a.jpg", Sections.ABOUT, True),
+        ("font", "https://static.xx.fbcdn.net/a.woff2", Sections.FEATURED, True),
+        ("stylesheet", "https://static.xx.fbcdn.net/a.css", Sections.ABOUT, True),
+        ("stylesheet", "https://static.xx.fbcdn.net/a.css", Sections.FEATURED, False),
+        ("ping", "https://www.facebook.com/tr/?id=1", Sections.ABOUT, True),
+        ("script", "https://connect.facebook.net/sdk.js", None, True),
+    ],
+)
+def test_should_block(resource_type: str, url: str, section: Sections, expected: bool):
+    assert ResourcePolicy().should_block(resource_type, url, section) == expected
+
+
+def get_route_mock(resource_type: str) -> mock.MagicMock:
+    route = mock.MagicMock()
+    route.request.resource_type = resource_type
+    route.request.url = "https://www.facebook.com/groups/x"
+    return route
+
+
+def test_tracker_counts_requests():
+    tracker = ResourceTracker(ResourcePolicy())
+    tracker.start_page(Sections.ABOUT)
+    routes = [get_route_mock(x) for x in ("document", "image", "image", "font")]
+    for route in routes:
+        tracker.handle(route)
+    assert [x.abort.called for x in routes] == [False, True, True, True]
+    assert routes[0].continue_.called
+    assert tracker.stats() == {
+        "blocked_requests": 3,
+        "allowed_requests": 1,
+        "estimated_bytes_saved": 2 * ESTIMATED_BYTES["image"] + ESTIMATED_BYTES["font"],
+    }
+    tracker.start_page(Sections.FEATURED)
+    assert not tracker.page_blocked
+    assert sum_resource_stats([tracker, tracker])["blocked_requests"] == 6
+
+
+def test_last_page_is_reported_on_close(caplog):
+    with mock.patch("fb_scrape_lib.browser_pool.sync_playwright") as playwright:
+        browser = (
+            playwright.return_value.start.return_value.chromium.launch.return_value
+        )
+        browser.is_connected.return_value = True
+        pool = BrowserPool(resource_policy=ResourcePolicy())
+        pool.get_page(Sections.ABOUT)
+        pool._trackers[-1].handle(get_route_mock("image"))
+        with caplog.at_level(logging.INFO, logger="resource_policy"):
+            pool.close()
+    assert caplog.messages == [f"{Sections.ABOUT}: blocked 1 requests, ~30 KB saved"]
+
+
+def test_async_page_is_reported_on_release(caplog):
+    pool = AsyncBrowserPool(resource_policy=ResourcePolicy())
+    page = mock.MagicMock()
+    tracker = pool._trackers[page] = ResourceTracker(pool.resource_policy)
+
+    async def navigate():
+        async with pool.page(Sections.ABOUT):
+            tracker.handle(get_route_mock("image"))
+            assert not caplog.messages
+
+    with (
+        mock.patch.object(pool, "_acquire_page", return_value=page),
+        caplog.at_level(logging.INFO, logger="resource_policy"),
+    ):
+        asyncio.run(navigate())
+    assert caplog.messages == [f"{Sections.ABOUT}: blocked 1 requests, ~30 KB saved"]
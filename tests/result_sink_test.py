@@ -0,0 +1,71 @@
+from datetime import datetime
+from json import load, loads
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from enums import GroupInfoKeys, SinkMode
+from result_sink import (
+    JSONL_NAME,
+    JsonFileSink,
+    JsonlSink,
+    dumps_line,
+    get_result_sink,
+    json_serial,
+)
+
+LINK = "https://www.facebook.com/groups/test/"
+JSON = {
+    GroupInfoKeys.LINK: LINK,
+    GroupInfoKeys.CREATION_DATE: datetime(2010, 11, 28),
+    GroupInfoKeys.DESCRIPTION: "café",
+}
+EXPECTED = {"link": LINK, "creation_date": "28/11/2010", "description": "café"}
+
+
+def get_item(tmp_path: Path, name: str = "test") -> dict:
+    link = f"https://www.facebook.com/groups/{name}/"
+    return {"link": link, "local_path": tmp_path / f"{name}.json"}
+
+
+def test_dumps_line_matches_json_serial():
+    assert loads(dumps_line(JSON)) == EXPECTED
+    with pytest.raises(TypeError):
+        json_serial(object())
+
+
+def test_json_file_sink_writes_atomically(tmp_path):
+    item = get_item(tmp_path)
+    sink = get_result_sink(SinkMode.JSON, tmp_path)
+    assert isinstance(sink, JsonFileSink) and not sink.exists(item)
+    with mock.patch("result_sink.replace", side_effect=OSError):
+        with pytest.raises(OSError):
+            sink.write(item, JSON)
+    assert not sink.exists(item) and not list(tmp_path.iterdir())
+    assert sink.pop_saved() == []
+    sink.write(item, JSON)
+    assert sink.pop_saved() == [item]
+    with open(item["local_path"]) as f:
+        assert load(f) == EXPECTED
+    assert [x.name for x in tmp_path.iterdir()] == ["test.json"]
+
+
+def test_jsonl_sink_buffers_and_appends(tmp_path):
+    sink = JsonlSink(tmp_path / JSONL_NAME, flush_every=2)
+    items = [get_item(tmp_path, str(i)) for i in range(3)]
+    for item in items:
+        sink.write(item, JSON | {GroupInfoKeys.LINK: item["link"]})
+    assert len((tmp_path / JSONL_NAME).read_text().splitlines()) == 2
+    assert sink.pop_saved() == items[:2]
+    sink.close()
+    assert sink.pop_saved() == items[2:]
+    with open(tmp_path / JSONL_NAME, "a") as f:
+        f.write('{"link": "trunc')
+    sink = get_result_sink(SinkMode.JSONL, tmp_path)
+    assert [sink.exists(x) for x in items] == [True] * 3
+    assert not sink.exists(get_item(tmp_path, "other"))
+    sink.write(items[0], JSON)
+    sink.close()
+    with open(tmp_path / JSONL_NAME) as f:
+        assert loads(f.readlines()[-1]) == EXPECTED
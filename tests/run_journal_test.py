@@ -0,0 +1,68 @@
+from unittest import mock
+
+import pytest
+
+import main
+from enums import GroupInfoKeys, JobState, Stage
+from run_journal import JOURNAL_NAME, RunJournal
+
+LINK = "https://www.facebook.com/groups/test/"
+BASIC = {GroupInfoKeys.LINK: LINK, GroupInfoKeys.MEMBERS: 10}
+
+
+def test_journal_index_survives_restart(tmp_path):
+    journal = RunJournal(tmp_path / JOURNAL_NAME)
+    with journal.stage(LINK, Stage.BASIC):
+        pass
+    with pytest.raises(TimeoutError):
+        with journal.stage(LINK, Stage.ADVANCED, resume_record=BASIC):
+            raise TimeoutError()
+    journal.record("other", Stage.BASIC, JobState.IN_PROGRESS)
+    journal.close()
+    with open(tmp_path / JOURNAL_NAME, "a") as f:
+        f.write('{"link": "trunc')
+
+    journal = RunJournal(tmp_path / JOURNAL_NAME)
+    assert journal.get_state(LINK, Stage.BASIC) == JobState.DONE
+    assert journal.get_state(LINK, Stage.ADVANCED) == JobState.FAILED
+    assert journal.get_resume_record(LINK) == BASIC
+    assert journal.get_interrupted() == {"other": Stage.BASIC}
+    assert journal.summary() == {
+        "advanced:failed": 1,
+        "basic:done": 1,
+        "basic:in_progress": 1,
+    }
+    with journal.stage(LINK, Stage.SAVE):
+        pass
+    assert journal.is_saved(LINK) and journal.get_resume_record(LINK) is None
+    journal.close()
+    assert len(RunJournal(tmp_path / JOURNAL_NAME)) == 2
+
+
+def test_resume_retries_only_the_failed_stage(tmp_path):
+    journal = RunJournal(tmp_path / JOURNAL_NAME)
+    sink = mock.MagicMock()
+    item = {"link": LINK, "local_path": tmp_path / "test.json"}
+    with (
+        mock.patch.object(main, "item_to_basic_info_json", return_value=dict(BASIC)),
+        mock.patch.object(main, "item_to_advance_info_json", side_effect=TimeoutError),
+        pytest.raises(TimeoutError),
+    ):
+        main.scrape_item(item, lambda x: True, True, sink, journal)
+    sink.write.assert_not_called()
+
+    def advance(json: dict):
+        json[GroupInfoKeys.TOPICS] = []
+
+    with (
+        mock.patch.object(main, "item_to_basic_info_json") as basic,
+        mock.patch.object(main, "item_to_advance_info_json", side_effect=advance),
+    ):
+        main.scrape_item(item, lambda x: False, True, sink, journal)
+    basic.assert_not_called()
+    sink.write.assert_called_once_with(item, BASIC | {GroupInfoKeys.TOPICS: []})
+    # saved once the sink reports the write reached its output
+    assert not journal.is_saved(LINK)
+    sink.pop_saved.return_value = [item]
+    main.record_saved(sink, journal, None)
+    assert list(main.handle_override_for_list([item], False, sink, journal)) == []
@@ -0,0 +1,83 @@
+from pathlib import Path
+from unittest import mock
+
+import pytest
+
+from enums import JobState
+from work_queue import WorkQueue
+
+ITEMS = [{"link": f"link_{i}", "local_path": Path(f"{i}.json")} for i in range(5)]
+
+
+@pytest.fixture
+def db_path(tmp_path) -> Path:
+    return tmp_path / "queue.db"
+
+
+def test_add_ignores_known_links(db_path):
+    queue = WorkQueue(db_path)
+    assert queue.add(ITEMS) == 5
+    assert queue.add(ITEMS[:3]) == 0
+    assert queue.counts()[JobState.PENDING] == 5
+
+
+def test_workers_claim_disjoint_batches(db_path):
+    first = WorkQueue(db_path, worker_id="first")
+    second = WorkQueue(db_path, worker_id="second")
+    first.add(ITEMS)
+    first_batch = first.claim(3)
+    second_batch = second.claim(3)
+    assert len(first_batch) == 3
+    assert len(second_batch) == 2
+    assert not {x["link"] for x in first_batch} & {x["link"] for x in second_batch}
+    assert second.claim(3) == []
+
+
+def test_complete_and_fail(db_path):
+    queue = WorkQueue(db_path, max_retries=2)
+    queue.add(ITEMS[:2])
+    done, failed = queue.claim(2)
+    queue.complete(done["link"])
+    queue.fail(failed["link"], "error")
+    assert queue.counts()[JobState.PENDING] == 1
+    assert queue.claim(2) == [failed]
+    queue.fail(failed["link"], "error")
+    counts = queue.counts()
+    assert counts[JobState.DONE] == 1
+    assert counts[JobState.FAILED] == 1
+
+
+def test_expired_leases_return_to_queue(db_path):
+    crashed = WorkQueue(db_path, lease_seconds=10, worker_id="crashed")
+    crashed.add(ITEMS)
+    crashed.claim(5)
+    alive = WorkQueue(db_path, worker_id="alive")
+    assert alive.claim(5) == []
+    with mock.patch("work_queue.time", return_value=10**10):
+        assert len(alive.claim(5)) == 5
+
+
+def test_iter_items_drains_queue(db_path):
+    queue = WorkQueue(db_path)
+    queue.add(ITEMS)
+    links = []
+    for item in queue.iter_items(batch_size=2):
+        links.append(item["link"])
+        queue.complete(item["link"])
+    assert sorted(links) == [x["link"] for x in ITEMS]
+    assert queue.counts()[JobState.DONE] == 5
+
+
+@pytest.mark.parametrize("finish", ["complete", "fail"])
+def test_lost_lease_is_not_updated(db_path, finish: str):
+    slow = WorkQueue(db_path, lease_seconds=10, worker_id="slow")
+    slow.add(ITEMS[:1])
+    (item,) = slow.claim(1)
+    other = WorkQueue(db_path, worker_id="other")
+    with mock.patch("work_queue.time", return_value=10**10):
+        assert other.claim(1) == [item]
+    args = ("error",) if finish == "fail" else ()
+    assert not getattr(slow, finish)(item["link"], *args)
+    assert slow.counts()[JobState.IN_PROGRESS] == 1
+    assert other.complete(item["link"])
+    assert other.counts()[JobState.DONE] == 1
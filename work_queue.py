@@ -0,0 +1,188 @@
+import sqlite3
+from logging import getLogger
+from os import getpid
+from pathlib import Path
+from socket import gethostname
+from time import time
+from typing import Iterable, Iterator
+
+from enums import JobState
+
+LOGGER = getLogger("work_queue")
+LEASE_SECONDS = 30 * 60
+MAX_RETRIES = 3
+BATCH_SIZE = 20
+BUSY_TIMEOUT_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    link TEXT PRIMARY KEY,
+    local_path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    retries INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state_lease ON jobs (state, lease_expires);
+"""
+
+
+def get_worker_id() -> str:
+    return f"{gethostname()}-{getpid()}"
+
+
+class WorkQueue:
+    """
+    A job table in a SQLite file that several worker processes lease groups
+    from. Leases that are not completed before they expire (e.g. because the
+    worker crashed) go back to the queue and count as a retry.
+    The default rollback journal is used rather than WAL, as WAL does not work
+    over network filesystems.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        lease_seconds: int = LEASE_SECONDS,
+        max_retries: int = MAX_RETRIES,
+        worker_id: str | None = None,
+    ):
+        self.lease_seconds = lease_seconds
+        self.max_retries = max_retries
+        self.worker_id = worker_id or get_worker_id()
+        self._conn = sqlite3.connect(
+            path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None
+        )
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _transaction(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def add(self, items: Iterable[dict]) -> int:
+        """Adds new links as pending jobs, links that are already known are ignored"""
+        now = time()
+        rows = ((x["link"], str(x["local_path"]), JobState.PENDING, now) for x in items)
+        conn = self._transaction()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (link, local_path, state, updated) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return conn.total_changes - before
+
+    def _release_expired(self, conn: sqlite3.Connection, now: float):
+        conn.execute(
+            "UPDATE jobs SET state = CASE WHEN retries + 1 >= ? THEN ? ELSE ? END, "
+            "retries = retries + 1, worker = NULL, lease_expires = NULL, "
+            "error = 'lease expired', updated = ? "
+            "WHERE state = ? AND lease_expires < ?",
+            (
+                self.max_retries,
+                JobState.FAILED,
+                JobState.PENDING,
+                now,
+                JobState.IN_PROGRESS,
+                now,
+            ),
+        )
+
+    def claim(self, batch_size: int = BATCH_SIZE) -> list[dict]:
+        now = time()
+        conn = self._transaction()
+        try:
+            self._release_expired(conn, now)
+            rows = conn.execute(
+                "SELECT link, local_path FROM jobs WHERE state = ? LIMIT ?",
+                (JobState.PENDING, batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, updated = ? "
+                "WHERE link = ?",
+                [
+                    (
+                        JobState.IN_PROGRESS,
+                        self.worker_id,
+                        now + self.lease_seconds,
+                        now,
+                        link,
+                    )
+                    for link, _ in rows
+                ],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [{"link": link, "local_path": Path(path)} for link, path in rows]
+
+    def renew(self, links: Iterable[str]):
+        expires = time() + self.lease_seconds
+        self._conn.executemany(
+            "UPDATE jobs SET lease_expires = ? "
+            "WHERE link = ? AND worker = ? AND state = ?",
+            [(expires, x, self.worker_id, JobState.IN_PROGRESS) for x in links],
+        )
+
+    def _check_lease(self, cursor: sqlite3.Cursor, link: str) -> bool:
+        if cursor.rowcount == 0:
+            LOGGER.warning(f"{link}: lease was lost to another worker, not updated")
+        return cursor.rowcount > 0
+
+    def complete(self, link: str) -> bool:
+        """Marks a leased job done, returns False if the lease was lost meanwhile"""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET state = ?, lease_expires = NULL, error = NULL, "
+            "updated = ? WHERE link = ? AND worker = ? AND state = ?",
+            (JobState.DONE, time(), link, self.worker_id, JobState.IN_PROGRESS),
+        )
+        return self._check_lease(cursor, link)
+
+    def fail(self, link: str, error: str) -> bool:
+        """Releases a leased job for a retry, returns False if the lease was lost"""
+        cursor = self._conn.execute(
+            "UPDATE jobs SET state = CASE WHEN retries + 1 >= ? THEN ? ELSE ? END, "
+            "retries = retries + 1, worker = NULL, lease_expires = NULL, "
+            "error = ?, updated = ? WHERE link = ? AND worker = ? AND state = ?",
+            (
+                self.max_retries,
+                JobState.FAILED,
+                JobState.PENDING,
+                error,
+                time(),
+                link,
+                self.worker_id,
+                JobState.IN_PROGRESS,
+            ),
+        )
+        return self._check_lease(cursor, link)
+
+    def counts(self) -> dict[JobState, int]:
+        rows = self._conn.execute(
+            "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+        ).fetchall()
+        counts = {state: 0 for state in JobState}
+        counts |= {JobState(state): n for state, n in rows}
+        return counts
+
+    def iter_items(self, batch_size: int = BATCH_SIZE) -> Iterator[dict]:
+        """
+        Yields leased items batch after batch until the queue is drained.
+        The leases of the items that are still waiting in the batch are renewed
+        before each item is handed out.
+        """
+        while batch := self.claim(batch_size):
+            for i, item in enumerate(batch):
+                self.renew(x["link"] for x in batch[i:])
+                yield item